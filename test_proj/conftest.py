@@ -1,6 +1,7 @@
 import enum
 import os
 import shutil
+import subprocess
 from pathlib import Path
 from typing import IO, Any, Generator
 
@@ -11,6 +12,7 @@ from django.core.files.storage import FileSystemStorage
 
 from test_proj.media_library.models import Format, Video
 from video_encoding.backends.ffmpeg import FFmpegBackend
+from video_encoding.config import settings
 
 
 class StorageType(enum.Enum):
@@ -29,6 +31,38 @@ def ffmpeg():
     return FFmpegBackend()
 
 
+@pytest.fixture
+def mocked_ffmpeg(mocker):
+    """
+    Return a backend, which does not require ffmpeg to be installed, to be
+    used with mocked processes. Other tools are looked up as usual.
+    """
+    mocker.patch(
+        'video_encoding.backends.ffmpeg.which',
+        side_effect=lambda name: shutil.which(name) or '/' + name,
+    )
+    return FFmpegBackend()
+
+
+@pytest.fixture
+def scratch_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, 'VIDEO_ENCODING_SCRATCH_DIR', str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def audio_path(ffmpeg, tmp_path) -> str:
+    """
+    Return the path of a generated audio file without video.
+    """
+    path = str(tmp_path / 'tone.m4a')
+    subprocess.check_call(
+        [ffmpeg.ffmpeg_path, '-v', 'error', '-f', 'lavfi', '-i', 'sine=duration=2']
+        + ['-codec:a', 'aac', path]
+    )
+    return path
+
+
 @pytest.fixture
 def local_video(video_path) -> Generator[Video, None, None]:
     """
@@ -1,14 +1,14 @@
 from django.contrib import admin
 
-from video_encoding.admin import FormatInline
+from video_encoding.admin import FormatInline, FormatStatusAdminMixin
 
 from .models import Video
 
 
 @admin.register(Video)
-class VideoAdmin(admin.ModelAdmin):
+class VideoAdmin(FormatStatusAdminMixin, admin.ModelAdmin):
     inlines = (FormatInline,)
 
-    list_dispaly = ('get_filename', 'width', 'height', 'duration')
+    list_display = ('pk', 'file', 'width', 'height', 'duration', 'format_status')
     fields = ('file', 'width', 'height', 'duration')
     readonly_fields = fields
@@ -1,6 +1,11 @@
 import pytest
+from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 
+from video_encoding.backends.ffmpeg import FFmpegBackend
+
+from ..models import Format, Video
+
 
 @pytest.fixture()
 def admin_client(client, admin_user):
@@ -11,3 +16,75 @@ def admin_client(client, admin_user):
 def test_format_inline(admin_client, video):
     url = reverse('admin:media_library_video_change', args=(video.pk,))
     admin_client.get(url)
+
+
+def test_format_inline__no_probing(mocker, admin_client, video, video_format):
+    """
+    Rendering the admin must not probe any video file.
+    """
+    Video.objects.filter(pk=video.pk).update(width=None, height=None)
+    Format.objects.filter(pk=video_format.pk).update(width=None, height=None)
+    get_media_info = mocker.spy(FFmpegBackend, 'get_media_info')
+
+    url = reverse('admin:media_library_video_change', args=(video.pk,))
+    response = admin_client.get(url)
+
+    assert response.status_code == 200
+    assert get_media_info.call_count == 0
+
+
+def test_format_inline__max_rows(monkeypatch, admin_client):
+    video = Video.objects.create()
+    content_type = ContentType.objects.get_for_model(video)
+    for index in range(3):
+        Format.objects.create(
+            object_id=video.pk,
+            content_type=content_type,
+            field_name='file',
+            format='format_{}'.format(index),
+        )
+    monkeypatch.setattr('video_encoding.admin.FormatInline.max_rows', 2)
+
+    url = reverse('admin:media_library_video_change', args=(video.pk,))
+    response = admin_client.get(url)
+
+    assert response.status_code == 200
+    assert b'format_1' in response.content
+    assert b'format_2' not in response.content
+
+
+def test_changelist__format_status(django_assert_max_num_queries, admin_client):
+    videos = [Video.objects.create() for _ in range(3)]
+    content_type = ContentType.objects.get_for_model(Video)
+    for video in videos:
+        Format.objects.create(
+            object_id=video.pk,
+            content_type=content_type,
+            field_name='file',
+            format='webm_sd',
+            progress=100,
+        )
+
+    url = reverse('admin:media_library_video_changelist')
+    with django_assert_max_num_queries(10):
+        response = admin_client.get(url)
+
+    assert response.status_code == 200
+    assert response.content.count(b'1/1') == 3
+
+
+@pytest.mark.parametrize('count', (2, 10))
+def test_format_inline__num_queries(django_assert_num_queries, admin_client, count):
+    video = Video.objects.create()
+    content_type = ContentType.objects.get_for_model(video)
+    for index in range(count):
+        Format.objects.create(
+            object_id=video.pk,
+            content_type=content_type,
+            field_name='file',
+            format='format_{}'.format(index),
+        )
+
+    url = reverse('admin:media_library_video_change', args=(video.pk,))
+    with django_assert_num_queries(6):
+        admin_client.get(url)
@@ -0,0 +1,170 @@
+import os
+import time
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from video_encoding import cache, tasks, utils
+from video_encoding.backends.base import EncodingProgress
+from video_encoding.signals import ConversionResult
+
+from ..models import Format, Video
+
+OPTIONS = {'name': 'mp4_sd', 'extension': 'mp4', 'params': ['-b:v', '1000k']}
+
+
+@pytest.fixture
+def local_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_ENCODE_CACHE',
+        'video_encoding.cache.LocalEncodeCache',
+    )
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_ENCODE_CACHE_PARAMS',
+        {'directory': str(tmp_path / 'cache')},
+    )
+    monkeypatch.setattr(utils, '_instances', {})
+    return cache.get_encode_cache()
+
+
+@pytest.fixture
+def video_format():
+    return Format.objects.create(
+        object_id=1,
+        content_type=ContentType.objects.get_for_model(Video),
+        field_name='file',
+        format='mp4_sd',
+    )
+
+
+def test_hash_file(tmp_path):
+    path = tmp_path / 'video.mp4'
+    path.write_bytes(b'video')
+
+    assert cache.hash_file(str(path)) == (
+        '0cab1c9617404faf2b24e221e189ca5945813e14d3f766345b09ca13bbe28ffc'
+    )
+
+
+def test_get_key():
+    encode_cache = cache.LocalEncodeCache('/cache')
+    key = encode_cache.get_key('source', 'FFmpeg', OPTIONS)
+
+    assert key == encode_cache.get_key('source', 'FFmpeg', dict(OPTIONS))
+    assert key != encode_cache.get_key('other', 'FFmpeg', OPTIONS)
+    assert key != encode_cache.get_key(
+        'source', 'FFmpeg', {**OPTIONS, 'params': ['-b:v', '500k']}
+    )
+    assert key != cache.LocalEncodeCache('/cache', namespace='ci').get_key(
+        'source', 'FFmpeg', OPTIONS
+    )
+
+
+def test_local_cache(tmp_path):
+    encode_cache = cache.LocalEncodeCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'encoded.mp4'
+    source.write_bytes(b'encoded')
+    target = tmp_path / 'target.mp4'
+
+    assert not encode_cache.get('a' * 64, str(target))
+
+    encode_cache.put('a' * 64, str(source))
+    assert encode_cache.get('a' * 64, str(target))
+    assert target.read_bytes() == b'encoded'
+
+
+def test_local_cache__eviction(tmp_path):
+    encode_cache = cache.LocalEncodeCache(str(tmp_path / 'cache'), max_size=20)
+    source = tmp_path / 'encoded.mp4'
+    source.write_bytes(b'0123456789')
+    target = str(tmp_path / 'target.mp4')
+
+    encode_cache.put('a' * 64, str(source))
+    encode_cache.put('b' * 64, str(source))
+    # mark the first one as least recently used
+    past = time.time() - 60
+    os.utime(encode_cache._get_path('a' * 64), (past, past))
+    encode_cache.get('b' * 64, target)
+
+    encode_cache.put('c' * 64, str(source))
+
+    assert not encode_cache.get('a' * 64, target)
+    assert encode_cache.get('b' * 64, target)
+    assert encode_cache.get('c' * 64, target)
+
+
+def test_storage_cache(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    encode_cache = cache.StorageEncodeCache(
+        storage='django.core.files.storage.FileSystemStorage'
+    )
+    source = tmp_path / 'encoded.mp4'
+    source.write_bytes(b'encoded')
+    target = tmp_path / 'target.mp4'
+
+    assert not encode_cache.get('a' * 64, str(target))
+
+    encode_cache.put('a' * 64, str(source))
+    encode_cache.put('a' * 64, str(source))  # stored only once
+    assert encode_cache.get('a' * 64, str(target))
+    assert target.read_bytes() == b'encoded'
+    assert len(os.listdir(str(tmp_path / 'media/video_encoding/cache/aa'))) == 1
+
+
+@pytest.mark.django_db
+def test_convert_format__cache(mocker, local_cache, video_format):
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+    backend.encode.return_value = iter([EncodingProgress(percent=100)])
+    replace_file = mocker.patch.object(tasks, '_replace_file')
+
+    # the first conversion is stored in the cache
+    result, format_metrics = tasks._convert_format(
+        '/video.mp4', 10, video_format, backend, OPTIONS, None, 'source'
+    )
+    assert result == ConversionResult.SUCCEEDED
+    assert format_metrics['cache_hit'] == 0
+    assert backend.encode.call_count == 1
+
+    # the second one is restored
+    result, format_metrics = tasks._convert_format(
+        '/video.mp4', 10, video_format, backend, OPTIONS, None, 'source'
+    )
+    assert result == ConversionResult.SUCCEEDED
+    assert format_metrics['cache_hit'] == 1
+    assert backend.encode.call_count == 1
+    assert replace_file.call_count == 2
+    assert video_format.progress == 100
+
+
+@pytest.mark.django_db
+def test_convert_format__cache_unavailable(mocker, local_cache, video_format):
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+    backend.encode.return_value = iter([EncodingProgress(percent=100)])
+    mocker.patch.object(tasks, '_replace_file')
+    mocker.patch.object(local_cache, 'get', side_effect=OSError('unreachable'))
+
+    result, format_metrics = tasks._convert_format(
+        '/video.mp4', 10, video_format, backend, OPTIONS, None, 'source'
+    )
+
+    # encoded instead
+    assert result == ConversionResult.SUCCEEDED
+    assert format_metrics['cache_hit'] == 0
+    assert backend.encode.call_count == 1
+
+
+@pytest.mark.django_db
+def test_convert_format__no_source_hash(mocker, local_cache, video_format):
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+    backend.encode.side_effect = lambda *args: iter([EncodingProgress(percent=100)])
+    mocker.patch.object(tasks, '_replace_file')
+
+    for _ in range(2):
+        tasks._convert_format('/video.mp4', 10, video_format, backend, OPTIONS, None)
+
+    assert backend.encode.call_count == 2
@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+
+from video_encoding import cleanup
+from video_encoding.scratch import TEMP_PREFIX
+
+from ..models import Format, Video
+
+
+class BatchStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def delete_many(self, names):
+        self.batches.append(names)
+        for name in names:
+            self.delete(name)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = BatchStorage(location=str(tmp_path))
+    for name in (
+        'formats/mp4_sd/video.mp4',
+        'formats/mp4_sd/orphaned.mp4',
+        'formats/webm_sd/nested/orphaned.webm',
+        'videos/orphaned.mp4',  # not a format
+    ):
+        storage.save(name, ContentFile(b'video'))
+
+    Format.objects.create(
+        object_id=1,
+        content_type=ContentType.objects.get_for_model(Video),
+        field_name='file',
+        format='mp4_sd',
+        file='formats/mp4_sd/video.mp4',
+    )
+    return storage
+
+
+@pytest.mark.django_db
+def test_find_orphaned_files(storage):
+    orphaned_files = cleanup.find_orphaned_files(storage, min_age=0, batch_size=2)
+
+    assert sorted(orphaned_files) == [
+        'formats/mp4_sd/orphaned.mp4',
+        'formats/webm_sd/nested/orphaned.webm',
+    ]
+
+
+@pytest.mark.django_db
+def test_find_orphaned_files__min_age(storage):
+    assert list(cleanup.find_orphaned_files(storage)) == []
+
+
+@pytest.mark.django_db
+def test_delete_files(storage):
+    names = cleanup.find_orphaned_files(storage, min_age=0)
+
+    assert cleanup.delete_files(names, storage, batch_size=1) == 2
+    assert len(storage.batches) == 2
+    assert storage.exists('formats/mp4_sd/video.mp4')
+    assert not storage.exists('formats/mp4_sd/orphaned.mp4')
+
+
+def test_find_stale_temp_files(tmp_path):
+    stale_file = tmp_path / '{}stale.mp4'.format(TEMP_PREFIX)
+    stale_file.write_bytes(b'video')
+    stale_directory = tmp_path / '{}stale'.format(TEMP_PREFIX)
+    stale_directory.mkdir()
+    (stale_directory / 'pass0-0.log').write_text('log')
+    (tmp_path / '{}recent.mp4'.format(TEMP_PREFIX)).write_bytes(b'video')
+    (tmp_path / 'other.mp4').write_bytes(b'video')
+
+    past = time.time() - 2 * 86400
+    for path in (stale_file, stale_directory):
+        os.utime(str(path), (past, past))
+
+    stale_files = list(cleanup.find_stale_temp_files(str(tmp_path)))
+
+    assert sorted(stale_files) == sorted([str(stale_file), str(stale_directory)])
+    assert cleanup.delete_temp_files(stale_files) == 2
+    assert sorted(os.listdir(str(tmp_path))) == [
+        'other.mp4',
+        '{}recent.mp4'.format(TEMP_PREFIX),
+    ]
+
+
+@pytest.mark.django_db
+def test_command(mocker, capsys):
+    collect_garbage = mocker.patch.object(
+        cleanup,
+        'collect_garbage',
+        return_value={'orphaned_files': 3, 'temp_files': 1},
+    )
+
+    call_command('collect_video_garbage', '--dry-run', '--min-age', '60')
+
+    collect_garbage.assert_called_once_with(
+        dry_run=True, min_age=60, temp_max_age=86400, batch_size=1000
+    )
+    assert 'Found 3 orphaned files' in capsys.readouterr().out
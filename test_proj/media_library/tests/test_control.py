@@ -0,0 +1,252 @@
+import subprocess
+import time
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from video_encoding import control, signals, tasks
+from video_encoding.backends.ffmpeg import ProcessWatcher, Watchdog
+from video_encoding.control import ControlState, EncodingControl
+from video_encoding.models import Format
+
+from ..models import Video
+
+
+@pytest.fixture
+def control_cache(monkeypatch):
+    monkeypatch.setattr(control.settings, 'VIDEO_ENCODING_CONTROL_CACHE', 'default')
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.fixture
+def create_format():
+    def create(video, name='mp4_sd'):
+        return Format.objects.create(
+            object_id=video.pk,
+            content_type=ContentType.objects.get_for_model(video),
+            field_name='file',
+            format=name,
+        )
+
+    return create
+
+
+@pytest.mark.django_db
+def test_disabled(monkeypatch, create_format):
+    monkeypatch.setattr(control.settings, 'VIDEO_ENCODING_CONTROL_CACHE', None)
+    video_format = create_format(Video.objects.create())
+
+    for func in (control.cancel, control.suspend, control.resume):
+        with pytest.raises(ImproperlyConfigured):
+            func(video_format)
+    with pytest.raises(ImproperlyConfigured):
+        control.preempt(1)
+
+
+@pytest.mark.django_db
+def test_cancel(control_cache, create_format):
+    video = Video.objects.create()
+    video_format = create_format(video)
+    other_format = create_format(video, name='mp4_hd')
+    encoding_control = EncodingControl(video_format, started_at=time.time() - 1)
+    other_control = EncodingControl(other_format, started_at=time.time() - 1)
+
+    control.cancel(video_format)
+
+    assert encoding_control.get_state() == ControlState.CANCELLED
+    assert other_control.get_state() == ControlState.RUNNING
+
+    control.cancel(video)
+
+    assert other_control.get_state() == ControlState.CANCELLED
+
+
+@pytest.mark.django_db
+def test_cancel__later_encodings(control_cache, create_format):
+    video = Video.objects.create()
+    video_format = create_format(video)
+
+    control.cancel(video)
+
+    # e.g. the conversion of a replaced video
+    encoding_control = EncodingControl(video_format, started_at=time.time() + 1)
+    assert encoding_control.get_state() == ControlState.RUNNING
+
+
+@pytest.mark.django_db
+def test_suspend(control_cache, create_format):
+    video = Video.objects.create()
+    encoding_control = EncodingControl(create_format(video), started_at=time.time())
+
+    control.suspend(video)
+    assert encoding_control.get_state() == ControlState.SUSPENDED
+
+    control.resume(video)
+    assert encoding_control.get_state() == ControlState.RUNNING
+
+
+@pytest.mark.django_db
+def test_preempting(monkeypatch, control_cache, create_format):
+    monkeypatch.setattr(
+        control.settings, 'VIDEO_ENCODING_PRIORITIES', {'media_library.Video': 5}
+    )
+    video_format = create_format(Video.objects.create())
+    encoding_control = EncodingControl(video_format, started_at=time.time())
+
+    assert control.preempt(5) == []
+
+    with control.preempting(10):
+        assert encoding_control.get_state() == ControlState.SUSPENDED
+
+    assert encoding_control.get_state() == ControlState.RUNNING
+
+
+@pytest.mark.django_db
+def test_preempting__suspended(monkeypatch, control_cache, create_format):
+    video_format = create_format(Video.objects.create())
+    encoding_control = EncodingControl(video_format, started_at=time.time())
+    control.suspend(video_format)
+
+    with control.preempting(10):
+        assert encoding_control.get_state() == ControlState.SUSPENDED
+
+    # suspended explicitly, not by the preemption
+    assert encoding_control.get_state() == ControlState.SUSPENDED
+
+
+@pytest.mark.django_db
+def test_preempting__suspended_meanwhile(monkeypatch, control_cache, create_format):
+    video_format = create_format(Video.objects.create())
+    encoding_control = EncodingControl(video_format, started_at=time.time())
+
+    with control.preempting(10):
+        control.suspend(video_format)
+
+    assert encoding_control.get_state() == ControlState.SUSPENDED
+
+
+def test_get_control(monkeypatch):
+    monkeypatch.setattr(control.settings, 'VIDEO_ENCODING_CONTROL_CACHE', None)
+
+    assert control.get_control(Format(), time.time()) is None
+
+
+class FakeControl:
+    interval = 0.01
+
+    def __init__(self, state):
+        self.state = state
+
+    def get_state(self):
+        return self.state
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _get_process_state(process):
+    with open('/proc/{}/stat'.format(process.pid)) as file_handler:
+        return file_handler.read().rsplit(')', 1)[1].split()[0]
+
+
+def test_process_watcher(ffmpeg):
+    process = subprocess.Popen(['sleep', '10'])
+    encoding_control = FakeControl(ControlState.SUSPENDED)
+    watcher = ProcessWatcher(process, encoding_control, ffmpeg._terminate)
+    watcher.start()
+    try:
+        _wait_for(lambda: _get_process_state(process) == 'T')
+
+        encoding_control.state = ControlState.RUNNING
+        _wait_for(lambda: _get_process_state(process) == 'S')
+
+        encoding_control.state = ControlState.CANCELLED
+        _wait_for(lambda: process.poll() is not None)
+        assert watcher.cancelled
+    finally:
+        watcher.stop()
+        process.kill()
+        process.wait()
+
+
+@pytest.mark.django_db
+def test_convert_format__cancelled(mocker, control_cache, create_format):
+    video = Video.objects.create()
+    video_format = create_format(video)
+    encoding_backend = mocker.Mock()
+    control.cancel(video)
+
+    with tasks.PassLogs() as passlogs:
+        result, format_metrics = tasks._convert_format(
+            '/video.mp4',
+            2.0,
+            video_format,
+            encoding_backend,
+            {'name': 'mp4_sd', 'extension': 'mp4', 'params': []},
+            passlogs,
+            encoding_control=EncodingControl(video_format, time.time() - 1),
+        )
+
+    assert result == signals.ConversionResult.CANCELLED
+    assert encoding_backend.encode.call_count == 0
+
+
+def test_watchdog__paused():
+    process = subprocess.Popen(['sleep', '10'])
+    terminate = []
+    watchdog = Watchdog(process, 0.2, terminate.append)
+    watchdog.pause()
+    watchdog.start()
+    try:
+        # the time, in which the process is suspended, is not counted
+        time.sleep(0.4)
+        assert not terminate
+
+        watchdog.resume()
+        _wait_for(lambda: terminate)
+        assert terminate == [process]
+        assert watchdog.expired
+    finally:
+        watchdog.stop()
+        process.kill()
+        process.wait()
+
+
+def test_watchdog__stopped():
+    process = subprocess.Popen(['sleep', '10'])
+    terminate = []
+    watchdog = Watchdog(process, 5, terminate.append)
+    watchdog.start()
+    try:
+        watchdog.stop()
+        watchdog.join(timeout=5)
+        assert not watchdog.is_alive()
+        assert not watchdog.expired
+        assert not terminate
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_process_watcher__watchdog(mocker):
+    process = subprocess.Popen(['sleep', '10'])
+    encoding_control = FakeControl(ControlState.SUSPENDED)
+    watchdog = mocker.Mock()
+    watcher = ProcessWatcher(process, encoding_control, mocker.Mock(), watchdog)
+    watcher.start()
+    try:
+        _wait_for(lambda: watchdog.pause.called)
+        encoding_control.state = ControlState.RUNNING
+        _wait_for(lambda: watchdog.resume.called)
+    finally:
+        watcher.stop()
+        process.kill()
+        process.wait()
@@ -1,7 +1,20 @@
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse
+
 import pytest
 from django.conf import settings
+from django.core.files import File
+
+from video_encoding import tasks, utils
+from video_encoding.backends.ffmpeg import FFmpegBackend
+from video_encoding.exceptions import VideoEncodingError
+from video_encoding.tasks import convert_all_videos, convert_video, create_previews
+from video_encoding.utils import get_source
 
-from video_encoding.tasks import convert_all_videos, convert_video
+from ..models import Video
+
+AUDIO_PARAMS = ['-codec:a', 'aac', '-b:a', '128k']
 
 
 @pytest.mark.django_db
@@ -22,6 +35,28 @@ def test_encoding(video):
         assert f.progress == 100
 
 
+@pytest.mark.django_db
+def test_create_previews(monkeypatch, video):
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_PREVIEWS',
+        [
+            {'name': 'preview', 'extension': 'mp4'},
+            {'name': 'preview_webp', 'extension': 'webp', 'segments': 2},
+        ],
+    )
+
+    create_previews(video.file)
+
+    previews = {f.format: f for f in video.format_set.all()}
+    assert set(previews) == {'preview', 'preview_webp'}
+    for name, extension in (('preview', 'mp4'), ('preview_webp', 'webp')):
+        assert previews[name].file.name.endswith('_{}.{}'.format(name, extension))
+        assert previews[name].progress == 100
+        assert previews[name].is_preview
+    assert not video.format_set.complete().exists()
+
+
 @pytest.mark.django_db
 def test_encoding_auto_fields(video):
     assert video.format_set.count() == 0
@@ -33,3 +68,231 @@ def test_encoding_auto_fields(video):
     )
 
     assert video.format_set.count() == 4
+
+
+@pytest.mark.django_db
+def test_encoding__two_pass(monkeypatch, mocker, local_video):
+    first_pass = ['-codec:v', 'libx264', '-b:v', '500k', '-vf', 'scale=-2:240']
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {
+            'FFmpeg': [
+                {
+                    'name': 'mp4_{}'.format(bitrate),
+                    'extension': 'mp4',
+                    'first_pass': first_pass,
+                    'params': [
+                        '-codec:v',
+                        'libx264',
+                        '-b:v',
+                        bitrate,
+                        '-vf',
+                        'scale=-2:240',
+                    ],
+                }
+                for bitrate in ('300k', '500k')
+            ]
+        },
+    )
+    analyse = mocker.spy(FFmpegBackend, 'analyse')
+
+    convert_video(local_video.file)
+
+    assert analyse.call_count == 1
+    assert local_video.format_set.complete().count() == 2
+
+
+@pytest.mark.django_db
+def test_encoding__force_replaces_file(local_video):
+    convert_video(local_video.file)
+    old_names = set(local_video.format_set.values_list('file', flat=True))
+
+    convert_video(local_video.file, force=True)
+
+    storage = local_video.file.storage
+    for video_format in local_video.format_set.all():
+        assert storage.exists(video_format.file.name)
+    for name in old_names - set(local_video.format_set.values_list('file', flat=True)):
+        assert not storage.exists(name)
+
+
+@pytest.mark.django_db
+def test_encoding__audio_only(monkeypatch, audio_path):
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {
+            'FFmpeg': [
+                *tasks.settings.VIDEO_ENCODING_FORMATS['FFmpeg'],
+                {
+                    'name': 'm4a',
+                    'extension': 'm4a',
+                    'audio_only': True,
+                    'params': [],
+                    'audio_params': AUDIO_PARAMS,
+                },
+            ]
+        },
+    )
+    video = Video.objects.create()
+    with open(audio_path, 'rb') as file_handler:
+        video.file.save('tone.m4a', File(file_handler), save=True)
+    try:
+        convert_video(video.file)
+
+        formats = video.format_set.order_by('format')
+        assert list(
+            formats.filter(unsupported=False).values_list('format', 'progress')
+        ) == [('m4a', 100)]
+        # video formats are recorded as unsupported, so they are not planned again
+        assert set(
+            formats.filter(unsupported=True).values_list('format', flat=True)
+        ) == {
+            options['name']
+            for options in tasks.settings.VIDEO_ENCODING_FORMATS['FFmpeg']
+            if not options.get('audio_only')
+        }
+    finally:
+        for video_format in video.format_set.all():
+            video_format.file.delete()
+        video.file.delete()
+
+
+def test_get_params__shared_audio(monkeypatch, mocker):
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_SHARED_AUDIO', True)
+    backend = mocker.Mock()
+    backend.encode.return_value = iter([])
+
+    with tasks.AudioTracks() as audio_tracks:
+        results = [
+            tasks._get_params(
+                '/video.mp4',
+                backend,
+                {'params': ['-b:v', bitrate], 'audio_params': AUDIO_PARAMS},
+                tasks.PassLogs(),
+                audio_tracks,
+            )
+            for bitrate in ('500k', '1000k')
+        ]
+
+    assert backend.encode.call_count == 1
+    source_path, track_path, params = backend.encode.call_args[0]
+    assert params == ['-vn', *AUDIO_PARAMS, '-f', 'matroska']
+    assert results == [(['-b:v', '500k'], track_path), (['-b:v', '1000k'], track_path)]
+
+
+@pytest.mark.parametrize('shared_audio', (False, True))
+def test_get_params__not_shared(monkeypatch, mocker, shared_audio):
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_SHARED_AUDIO', shared_audio)
+    backend = mocker.Mock()
+    options = {'params': ['-b:v', '500k'], 'audio_params': AUDIO_PARAMS}
+
+    with tasks.AudioTracks() as audio_tracks:
+        params = tasks._get_params(
+            '/video.mp4', backend, options, tasks.PassLogs(), None
+        )
+        audio_only_params = tasks._get_params(
+            '/video.mp4',
+            backend,
+            {**options, 'audio_only': True},
+            tasks.PassLogs(),
+            audio_tracks,
+        )
+
+    assert backend.encode.call_count == 0
+    assert params == (['-b:v', '500k', *AUDIO_PARAMS], None)
+    assert audio_only_params == (['-vn', '-b:v', '500k', *AUDIO_PARAMS], None)
+
+
+def test_passlogs(mocker):
+    backend = mocker.Mock()
+    first_pass = ['-codec:v', 'libx264', '-b:v', '500k', '-vf', 'scale=-2:240']
+
+    with tasks.PassLogs() as passlogs:
+        params = [
+            passlogs.get_params(
+                '/video.mp4',
+                backend,
+                {
+                    'first_pass': first_pass,
+                    'params': ['-b:v', bitrate, '-vf', scale],
+                },
+            )
+            for bitrate, scale in (
+                ('300k', 'scale=-2:240'),
+                ('500k', 'scale=-2:240'),
+                ('1000k', 'scale=-2:480'),
+            )
+        ]
+
+    # the statistics are only valid for the same resolution
+    assert [call[0][2] for call in backend.analyse.call_args_list] == [
+        ['-codec:v', 'libx264', '-b:v', '500k', '-vf', 'scale=-2:240'],
+        ['-codec:v', 'libx264', '-b:v', '500k', '-vf', 'scale=-2:480'],
+    ]
+    assert params[0][-1] == params[1][-1] != params[2][-1]
+
+
+def test_passlogs__failed(mocker):
+    backend = mocker.Mock()
+    backend.analyse.side_effect = VideoEncodingError()
+    options = {'first_pass': ['-b:v', '500k'], 'params': ['-b:v', '500k']}
+
+    with tasks.PassLogs() as passlogs:
+        for _ in range(2):
+            with pytest.raises(VideoEncodingError):
+                passlogs.get_params('/video.mp4', backend, options)
+
+    assert backend.analyse.call_count == 1
+
+
+@pytest.fixture
+def http_video(remote_video):
+    """
+    Serve the remote video using a local http server.
+    """
+    root_path = remote_video.file.storage.root_path
+
+    class Handler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            return str(root_path / urlparse(path).path.lstrip('/'))
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    remote_video.file.storage.url = lambda name: base_url + name
+    try:
+        yield remote_video
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.django_db
+def test_get_source(monkeypatch, http_video):
+    with get_source(http_video.file) as source:
+        assert not source.startswith('http')
+
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_STREAM_SOURCE', True)
+    with get_source(http_video.file) as source:
+        assert source == http_video.file.url
+
+
+@pytest.mark.django_db
+def test_encoding__stream_source(monkeypatch, mocker, http_video):
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_STREAM_SOURCE', True)
+    get_local_path = mocker.spy(utils, 'get_local_path')
+    refresh_source = mocker.spy(tasks, 'refresh_source')
+
+    convert_video(http_video.file)
+
+    assert get_local_path.call_count == 0
+    # presigned urls may expire during long conversions
+    assert refresh_source.call_count == 4
+    assert http_video.format_set.complete().count() == 4
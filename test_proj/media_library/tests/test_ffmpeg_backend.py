@@ -1,17 +1,33 @@
 import os
 import tempfile
+import time
 
 import pytest
 from PIL import Image
 
 from video_encoding import exceptions
+from video_encoding.backends import get_backend
+from video_encoding.backends.base import EncodingProgress
 from video_encoding.backends.ffmpeg import FFmpegBackend
+from video_encoding.config import settings
 
 
 def test_get_media_info(ffmpeg, video_path):
     media_info = ffmpeg.get_media_info(video_path)
 
-    assert media_info == {'width': 1280, 'height': 720, 'duration': 2.022}
+    assert (
+        media_info.items()
+        >= {'width': 1280, 'height': 720, 'duration': 2.022, 'video': True}.items()
+    )
+
+
+def test_get_media_info__audio(ffmpeg, audio_path):
+    media_info = ffmpeg.get_media_info(audio_path)
+
+    assert media_info['width'] == 0
+    assert media_info['height'] == 0
+    assert media_info['video'] is False
+    assert media_info['audio'] is True
 
 
 def test_encode(ffmpeg, video_path):
@@ -21,19 +37,196 @@ def test_encode(ffmpeg, video_path):
         target_path,
         ['-vf', 'scale=-2:320', '-r', '90', '-codec:v', 'libx264'],
     )
-    percent = next(encoding)
-    assert 0 <= percent <= 100
-    while percent:
-        assert 0 <= percent <= 100
+    progress = next(encoding)
+    assert 0 <= progress.percent <= 100
+    while progress:
+        assert 0 <= progress.percent <= 100
         try:
-            percent = next(encoding)
+            progress = next(encoding)
         except StopIteration:
             break
 
-    assert percent == 100
+    assert progress.percent == 100
+    assert progress.eta == 0
     assert os.path.isfile(target_path)
     media_info = ffmpeg.get_media_info(target_path)
-    assert media_info == {'width': 568, 'height': 320, 'duration': 2.027}
+    assert (
+        media_info.items()
+        >= {'width': 568, 'height': 320, 'duration': 2.027, 'video': True}.items()
+    )
+
+
+def test_get_command__audio_path(ffmpeg):
+    cmd = ffmpeg._get_command(
+        '/video.mp4', ['-codec:v', 'libx264'], '/video_sd.mp4', '/audio.mka'
+    )
+
+    assert cmd[1:5] == ['-i', '/video.mp4', '-i', '/audio.mka']
+    assert cmd[-9:] == [
+        '-map',
+        '0:v:0',
+        '-map',
+        '1:a:0',
+        '-codec:v',
+        'libx264',
+        '-codec:a',
+        'copy',
+        '/video_sd.mp4',
+    ]
+
+
+def test_encode__error(ffmpeg, video_path):
+    __, target_path = tempfile.mkstemp(suffix='.mp4')
+    encoding = ffmpeg.encode(video_path, target_path, ['-codec:v', 'invalid'])
+
+    with pytest.raises(exceptions.FFmpegError) as excinfo:
+        list(encoding)
+
+    assert excinfo.value.stderr
+    assert len(excinfo.value.stderr) <= 20
+
+
+def test_encode__timeout(video_path):
+    ffmpeg = FFmpegBackend(timeout=0.01)
+    __, target_path = tempfile.mkstemp(suffix='.mp4')
+    encoding = ffmpeg.encode(video_path, target_path, ['-codec:v', 'libx264'])
+
+    with pytest.raises(exceptions.FFmpegTimeoutError):
+        list(encoding)
+
+
+def test_encode__limits(mocker, video_path):
+    ffmpeg = FFmpegBackend(niceness=10, cpu_affinity=[0], memory_limit=2**31)
+    spawn = mocker.spy(ffmpeg, '_spawn')
+    __, target_path = tempfile.mkstemp(suffix='.mp4')
+
+    list(ffmpeg.encode(video_path, target_path, ['-vf', 'scale=-2:320']))
+
+    assert spawn.call_count == 1
+    assert os.path.getsize(target_path) > 0
+
+
+def test_encode__aborted(mocker, ffmpeg, video_path):
+    terminate = mocker.spy(ffmpeg, '_terminate')
+    __, target_path = tempfile.mkstemp(suffix='.mp4')
+    encoding = ffmpeg.encode(video_path, target_path, ['-codec:v', 'libx264'])
+
+    next(encoding)
+    encoding.close()
+
+    (process,), _ = terminate.call_args
+    assert process.poll() is not None
+
+
+def test_limit_command(mocked_ffmpeg):
+    backend = FFmpegBackend(
+        niceness=10, cpu_affinity=[3, 1], memory_limit=2**31, cpu_time_limit=60
+    )
+
+    assert [os.path.basename(arg) for arg in backend.limit_command] == [
+        'prlimit',
+        '--as=2147483648',
+        '--cpu=60',
+        'nice',
+        '-n',
+        '10',
+        'taskset',
+        '-c',
+        '1,3',
+    ]
+    assert mocked_ffmpeg.limit_command == []
+
+
+def test_limit_command__applied(mocked_ffmpeg):
+    cpu = min(os.sched_getaffinity(0))
+    backend = FFmpegBackend(niceness=5, cpu_affinity=[cpu], memory_limit=2**31)
+
+    output = backend._check_output(
+        ['sh', '-c', 'nice; ulimit -v; grep Cpus_allowed_list /proc/self/status'],
+        'Error while testing',
+    )
+
+    niceness, memory_limit, cpus = output.decode().splitlines()
+    assert int(niceness) >= 5
+    assert memory_limit == str(2**31 // 1024)
+    assert cpus.split()[-1] == str(cpu)
+
+
+def test_get_backend__params(monkeypatch):
+    monkeypatch.setattr(
+        settings, 'VIDEO_ENCODING_BACKEND_PARAMS', {'niceness': 5, 'timeout': 10}
+    )
+
+    backend = get_backend(timeout=20)
+
+    assert backend.niceness == 5
+    assert backend.timeout == 20
+
+
+@pytest.mark.parametrize(
+    'threads, codec, expected',
+    (
+        (2, 'libx264', 2),
+        ('auto', 'libx264', 16),
+        ('auto', 'libvpx', 4),
+        ('auto', 'unknown', 8),
+    ),
+)
+def test_get_threads(monkeypatch, mocker, ffmpeg, threads, codec, expected):
+    monkeypatch.setattr(settings, 'VIDEO_ENCODING_THREADS', threads)
+    mocker.patch('video_encoding.backends.ffmpeg.get_available_cpus', return_value=32)
+
+    assert ffmpeg.get_threads(['-codec:v', codec]) == expected
+
+
+def test_get_threads__concurrency(monkeypatch, mocker, ffmpeg):
+    monkeypatch.setattr(settings, 'VIDEO_ENCODING_THREADS', 'auto')
+    monkeypatch.setattr(settings, 'VIDEO_ENCODING_CONCURRENCY', 3)
+    mocker.patch('video_encoding.backends.ffmpeg.get_available_cpus', return_value=8)
+
+    assert ffmpeg.get_threads(['-c:v', 'libx264']) == 2
+
+    ffmpeg.cpu_affinity = {0}
+    assert ffmpeg.get_threads(['-c:v', 'libx264']) == 1
+
+
+def test_parse_progress(ffmpeg):
+    line = (
+        'frame=   48 fps=24.0 q=28.0 size=     256kB time=00:00:01.50 '
+        'bitrate=1398.1kbits/s speed=1.5x'
+    )
+
+    progress = ffmpeg._parse_progress(line, total_time=3)
+
+    assert progress == EncodingProgress(
+        percent=50,
+        time=1.5,
+        frame=48,
+        fps=24.0,
+        bitrate=1398.1,
+        speed=1.5,
+        eta=1.0,
+    )
+
+
+def test_parse_progress__not_available(ffmpeg):
+    line = 'frame=    0 fps=0.0 q=0.0 size=0kB time=00:00:00.00 bitrate=N/A speed=N/A'
+
+    progress = ffmpeg._parse_progress(line, total_time=3)
+
+    assert progress.percent == 0
+    assert progress.bitrate is None
+    assert progress.speed is None
+    assert progress.eta is None
+    assert ffmpeg._parse_progress('Press [q] to stop', total_time=3) is None
+
+
+def test_analyse(ffmpeg, video_path):
+    with tempfile.TemporaryDirectory() as directory:
+        passlogfile = os.path.join(directory, 'pass')
+        ffmpeg.analyse(video_path, passlogfile, ['-codec:v', 'libx264'])
+
+        assert os.path.isfile('{}-0.log'.format(passlogfile))
 
 
 def test_get_thumbnail(ffmpeg, video_path):
@@ -51,6 +244,21 @@ def test_get_thumbnail__invalid_time(ffmpeg, video_path):
         ffmpeg.get_thumbnail(video_path, at_time=1000000)
 
 
+def test_get_thumbnail__cleanup(mocker, mocked_ffmpeg, scratch_dir):
+    mocker.patch.object(mocked_ffmpeg, 'get_media_info', return_value={'duration': 2})
+    check_output = mocker.patch.object(
+        mocked_ffmpeg, '_check_output', side_effect=exceptions.FFmpegError('failed')
+    )
+
+    with pytest.raises(exceptions.InvalidTimeError):
+        mocked_ffmpeg.get_thumbnail('/video.mp4', at_time=10)
+    with pytest.raises(exceptions.FFmpegError):
+        mocked_ffmpeg.get_thumbnail('/video.mp4', at_time=1)
+
+    assert check_output.call_count == 1
+    assert os.listdir(scratch_dir) == []
+
+
 @pytest.mark.parametrize(
     'offset',
     (0, 0.02),
@@ -69,6 +277,148 @@ def test_get_thumbnail__too_close_to_the_end(ffmpeg, video_path, offset):
         )
 
 
+def test_get_best_thumbnails(ffmpeg, video_path):
+    candidates = ffmpeg.get_best_thumbnails(video_path, count=2, samples=20)
+
+    try:
+        assert 1 <= len(candidates) <= 2
+        assert [c.score for c in candidates] == sorted(
+            (c.score for c in candidates), reverse=True
+        )
+        for candidate in candidates:
+            with Image.open(candidate.path) as im:
+                assert im.size == (1280, 720)
+    finally:
+        for candidate in candidates:
+            os.unlink(candidate.path)
+
+
+def test_get_complexity(ffmpeg, video_path):
+    bitrate = ffmpeg.get_complexity(video_path, segments=2, segment_duration=0.5)
+
+    assert bitrate > 0
+
+
+@pytest.mark.parametrize('extension', ('mp4', 'webp', 'gif'))
+def test_get_preview(ffmpeg, video_path, extension):
+    preview_path = ffmpeg.get_preview(
+        video_path, extension=extension, segments=2, segment_duration=0.5
+    )
+
+    try:
+        assert preview_path.endswith('.{}'.format(extension))
+        assert os.path.getsize(preview_path) > 0
+        if extension != 'mp4':
+            with Image.open(preview_path) as im:
+                assert im.size == (320, 180)
+                assert im.is_animated
+    finally:
+        os.unlink(preview_path)
+
+
+def test_get_preview__invalid_extension(ffmpeg, video_path):
+    with pytest.raises(ValueError):
+        ffmpeg.get_preview(video_path, extension='avi')
+
+
+def test_get_preview__too_short(ffmpeg, video_path):
+    # the segment is shortened to the duration of the video
+    preview_path = ffmpeg.get_preview(
+        video_path, extension='mp4', segments=1, segment_duration=1000000
+    )
+
+    try:
+        duration = ffmpeg.get_media_info(preview_path)['duration']
+        assert 0 < duration <= ffmpeg.get_media_info(video_path)['duration'] + 0.1
+    finally:
+        os.unlink(preview_path)
+
+
+def test_get_preview__clamped(mocker, mocked_ffmpeg, scratch_dir):
+    mocker.patch.object(mocked_ffmpeg, 'get_media_info', return_value={'duration': 2})
+    check_output = mocker.patch.object(mocked_ffmpeg, '_check_output')
+
+    preview_path = mocked_ffmpeg.get_preview('/video.mp4', segments=4)
+
+    os.unlink(preview_path)
+    cmd = check_output.call_args[0][0]
+    assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == '-t'] == ['0.5'] * 4
+
+
+def test_get_preview__no_duration(mocker, mocked_ffmpeg, scratch_dir):
+    mocker.patch.object(mocked_ffmpeg, 'get_media_info', return_value={'duration': 0})
+
+    with pytest.raises(exceptions.InvalidTimeError):
+        mocked_ffmpeg.get_preview('/video.mp4')
+    assert os.listdir(scratch_dir) == []
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """
+    Return the path of a script, which writes `output` to stdout and an error
+    to stderr, then exits with `exit_code` after `delay` seconds.
+    """
+
+    def create(output='', exit_code=0, delay=0):
+        path = tmp_path / 'ffmpeg'
+        # `exec` replaces the shell, which is terminated on timeouts
+        path.write_text(
+            '#!/bin/sh\nprintf "{}"\necho error >&2\n{}exit {:d}\n'.format(
+                output, 'exec sleep {}\n'.format(delay) if delay else '', exit_code
+            )
+        )
+        path.chmod(0o755)
+        return str(path)
+
+    return create
+
+
+def test_get_complexity__spawned(mocker, mocked_ffmpeg, fake_ffmpeg):
+    mocker.patch.object(mocked_ffmpeg, 'get_media_info', return_value={'duration': 6})
+    spawn = mocker.spy(mocked_ffmpeg, '_spawn')
+    mocked_ffmpeg.ffmpeg_path = fake_ffmpeg(output='x' * 30)
+
+    # 30 bytes within 3 segments of 2 seconds
+    assert mocked_ffmpeg.get_complexity('/video.mp4') == 40
+    assert spawn.call_count == 1
+
+
+def test_check_output__failed(mocked_ffmpeg, fake_ffmpeg):
+    with pytest.raises(exceptions.FFmpegError) as excinfo:
+        mocked_ffmpeg._check_output([fake_ffmpeg(exit_code=1)], 'Error while testing')
+
+    assert excinfo.value.stderr == ['error']
+    assert not isinstance(excinfo.value, exceptions.FFmpegTimeoutError)
+
+
+def test_check_output__timeout(mocked_ffmpeg, fake_ffmpeg):
+    mocked_ffmpeg.timeout = 0.2
+
+    start_time = time.monotonic()
+    with pytest.raises(exceptions.FFmpegTimeoutError):
+        mocked_ffmpeg._check_output([fake_ffmpeg(delay=30)], 'Error while testing')
+    assert time.monotonic() - start_time < 10
+
+
+def test_run__redacted(tmp_path, mocked_ffmpeg):
+    # ffmpeg reports failing inputs including their url
+    script = tmp_path / 'ffmpeg'
+    script.write_text(
+        '#!/bin/sh\necho "$2: Server returned 403 Forbidden" >&2\nexit 1\n'
+    )
+    script.chmod(0o755)
+    url = 'https://bucket.example.com/video.mp4?X-Amz-Signature=secret'
+
+    with pytest.raises(exceptions.FFmpegError) as excinfo:
+        list(mocked_ffmpeg._run([str(script), '-i', url], 10, None))
+
+    assert 'secret' not in str(excinfo.value)
+    assert excinfo.value.stderr == [
+        'https://bucket.example.com/video.mp4?<redacted> Server returned 403 Forbidden'
+    ]
+
+
 def test_check():
     assert FFmpegBackend.check() == []
 
@@ -1,6 +1,7 @@
 import os
 
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
 
 from video_encoding.backends.ffmpeg import FFmpegBackend
 
@@ -16,6 +17,51 @@ def test_info_forward(ffmpeg, video, video_path):
     assert video.height == media_info['height']
 
 
+@pytest.fixture
+def temporary_uploaded_file(video_path):
+    with open(video_path, 'rb') as f:
+        data = f.read()
+
+    uploaded_file = TemporaryUploadedFile('upload.mp4', 'video/mp4', len(data), None)
+    uploaded_file.write(data)
+    uploaded_file.seek(0)
+    yield uploaded_file
+    uploaded_file.close()
+
+
+@pytest.fixture
+def in_memory_uploaded_file(video_path):
+    with open(video_path, 'rb') as f:
+        return SimpleUploadedFile('upload.mp4', f.read(), content_type='video/mp4')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'uploaded_file', ('temporary_uploaded_file', 'in_memory_uploaded_file')
+)
+def test_info_forward__upload(request, mocker, ffmpeg, video_path, uploaded_file):
+    """
+    Uploads are probed before they are saved to the storage.
+    """
+    uploaded_file = request.getfixturevalue(uploaded_file)
+    media_info = ffmpeg.get_media_info(video_path)
+    get_media_info = mocker.spy(FFmpegBackend, 'get_media_info')
+
+    video = Video(file=uploaded_file)
+    assert video.duration == media_info['duration']
+    assert video.width == media_info['width']
+    assert video.height == media_info['height']
+
+    video.save()
+    try:
+        assert get_media_info.call_count == 1
+        video = Video.objects.get(pk=video.pk)
+        assert video.duration == media_info['duration']
+    finally:
+        video.file.delete()
+        video.delete()
+
+
 @pytest.mark.django_db
 def test_delete(ffmpeg, video):
     video.file.delete()
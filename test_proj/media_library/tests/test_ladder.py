@@ -0,0 +1,88 @@
+import pytest
+
+from video_encoding import exceptions, ladder, tasks
+
+
+def test_get_complexity_factor():
+    assert ladder.get_complexity_factor(200000, reference_bitrate=400000) == 0.5
+    # the factor is clamped
+    assert ladder.get_complexity_factor(10000) == 0.25
+    assert ladder.get_complexity_factor(800000) == 1.0
+    assert ladder.get_complexity_factor(800000, max_factor=1.5) == 1.5
+
+
+def test_scale_params():
+    params = ['-b:v', '1000k', '-maxrate', '1M', '-bufsize', '2000k', '-crf', '23']
+
+    assert ladder.scale_params(params, 0.5) == [
+        '-b:v',
+        '500k',
+        '-maxrate',
+        '500k',
+        '-bufsize',
+        '1000k',
+        '-crf',
+        '23',
+    ]
+    assert params[1] == '1000k'  # not modified
+
+
+def test_adapt_format():
+    options = {
+        'name': 'mp4_sd',
+        'extension': 'mp4',
+        'params': ['-b:v', '1000k'],
+        'first_pass': ['-b:v', '1000k', '-pass', '1'],
+    }
+
+    adapted = ladder.adapt_format(options, 0.3)
+    assert adapted['params'] == ['-b:v', '300k']
+    assert adapted['first_pass'] == ['-b:v', '300k', '-pass', '1']
+
+    assert ladder.adapt_format(options, 1) is options
+    options['adapt_bitrate'] = False
+    assert ladder.adapt_format(options, 0.3) is options
+
+
+def test_analyse_complexity(monkeypatch, mocker):
+    backend = mocker.Mock()
+    backend.get_complexity.return_value = 100000
+    source_metrics = {}
+
+    assert tasks._analyse_complexity(backend, '/video.mp4', source_metrics) == 1.0
+    assert not backend.get_complexity.called
+
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_COMPLEXITY_ANALYSIS', True)
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_COMPLEXITY_ANALYSIS_PARAMS',
+        {'segments': 2, 'reference_bitrate': 200000},
+    )
+
+    assert tasks._analyse_complexity(backend, '/video.mp4', source_metrics) == 0.5
+    backend.get_complexity.assert_called_once_with(
+        '/video.mp4', segments=2, segment_duration=2.0
+    )
+    assert source_metrics['complexity'] == 0.5
+
+
+@pytest.mark.parametrize(
+    'error', (exceptions.InvalidTimeError(), NotImplementedError())
+)
+def test_analyse_complexity__failed(monkeypatch, mocker, error):
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_COMPLEXITY_ANALYSIS', True)
+    backend = mocker.Mock()
+    backend.get_complexity.side_effect = error
+
+    assert tasks._analyse_complexity(backend, '/video.mp4', {}) == 1.0
+
+
+def test_get_formats(mocker):
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+
+    formats = tasks._get_formats(backend, ['webm_sd'], factor=0.5)
+
+    assert len(formats) == 1
+    params = formats[0]['params']
+    assert params[params.index('-b:v') + 1] == '500k'
@@ -0,0 +1,268 @@
+import functools
+import time
+
+import pytest
+from django.core.cache import cache
+from django.core.files import File
+
+from video_encoding import control, exceptions, locks, signals, tasks
+from video_encoding.backends.base import EncodingProgress
+from video_encoding.fields import VideoField
+from video_encoding.locks import CacheLock, LocalLock
+from video_encoding.models import Format
+
+from ..models import Video
+
+
+@pytest.fixture
+def lock_cache(monkeypatch):
+    monkeypatch.setattr(locks.settings, 'VIDEO_ENCODING_LOCK_CACHE', 'default')
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def test_local_lock():
+    lock = LocalLock('key')
+    assert lock.acquire()
+    try:
+        assert not LocalLock('key').acquire()
+        assert LocalLock('other').acquire()
+    finally:
+        lock.release()
+        LocalLock('other').release()
+
+    assert lock.acquire()
+    lock.release()
+
+
+def test_cache_lock(lock_cache):
+    lock = CacheLock('key')
+    other_lock = CacheLock('key')
+
+    assert lock.acquire()
+    assert not other_lock.acquire()
+    assert lock.refresh()
+    assert not other_lock.refresh()
+
+    # only the holder releases the lease
+    other_lock.release()
+    assert not other_lock.acquire()
+
+    lock.release()
+    assert other_lock.acquire()
+    assert not lock.refresh()
+
+
+def test_cache_lock__expired(lock_cache):
+    lock = CacheLock('key', timeout=60)
+    assert lock.acquire()
+
+    # e.g. the worker has been killed
+    cache.delete('key')
+
+    other_lock = CacheLock('key')
+    assert other_lock.acquire()
+    assert not lock.refresh()
+    lock.release()
+    assert cache.get('key') == other_lock.token
+
+
+def test_get_lock(monkeypatch, lock_cache):
+    monkeypatch.setattr(locks.settings, 'VIDEO_ENCODING_LOCK_TIMEOUT', 60)
+    lock = locks.get_lock('key')
+    assert isinstance(lock, CacheLock)
+    assert lock.timeout == 60
+
+    monkeypatch.setattr(locks.settings, 'VIDEO_ENCODING_LOCK_CACHE', None)
+    assert isinstance(locks.get_lock('key'), LocalLock)
+
+
+def test_lease(lock_cache):
+    with locks.lease('key') as acquired:
+        assert acquired
+        with locks.lease('key') as acquired_again:
+            assert not acquired_again
+
+    with locks.lease('key') as acquired:
+        assert acquired
+
+
+def test_lease__wait(monkeypatch, mocker, lock_cache):
+    monkeypatch.setattr(locks, 'POLL_INTERVAL', 0.01)
+    lock = CacheLock('key')
+    lock.acquire()
+    release = mocker.patch.object(
+        locks.time, 'sleep', side_effect=lambda seconds: lock.release()
+    )
+
+    with locks.lease('key', wait=5) as acquired:
+        assert acquired
+        assert release.call_count == 1
+
+
+def test_heartbeat(lock_cache):
+    lock = CacheLock('key', timeout=60)
+    lock.acquire()
+    heartbeat = locks.Heartbeat(lock, interval=0.01)
+    heartbeat.start()
+
+    # stops once the lease has been lost
+    cache.delete('key')
+    heartbeat.join(timeout=5)
+    assert not heartbeat.is_alive()
+
+
+def test_lease__stale(lock_cache, mocker):
+    on_stale = mocker.Mock()
+
+    with locks.lease('key', on_stale=on_stale) as lock:
+        # e.g. a forced conversion of the replaced video
+        with locks.lease('key', mark_stale=True) as other_lock:
+            assert other_lock is None
+        assert on_stale.call_count == 0
+
+    on_stale.assert_called_once_with()
+    assert not lock.pop_stale()
+
+
+def test_lease__stale_released(lock_cache, mocker):
+    lock = CacheLock('key')
+    lock.acquire()
+    # released before the lease is marked as stale
+    mocker.patch.object(CacheLock, 'mark_stale', side_effect=lambda: lock.release())
+
+    with locks.lease('key', mark_stale=True) as other_lock:
+        assert other_lock is not None
+
+
+def test_lease__lost(monkeypatch, lock_cache):
+    monkeypatch.setattr(locks.settings, 'VIDEO_ENCODING_LOCK_TIMEOUT', 0.03)
+
+    with locks.lease('key') as lock:
+        cache.delete('key')
+        assert lock.lost.wait(timeout=5)
+
+
+@pytest.mark.django_db
+def test_get_control__lease(monkeypatch, lock_cache):
+    monkeypatch.setattr(control.settings, 'VIDEO_ENCODING_CONTROL_CACHE', None)
+    video_format = Format(object_id=1, content_type_id=1)
+
+    # leases held within the process do not expire
+    assert control.get_control(video_format, time.time(), LocalLock('key')) is None
+
+    lock = CacheLock('key')
+    encoding_control = control.get_control(video_format, time.time(), lock)
+    assert encoding_control.get_state() == control.ControlState.RUNNING
+
+    lock.lost.set()
+    assert encoding_control.get_state() == control.ControlState.CANCELLED
+
+
+@pytest.mark.django_db
+def test_encoding__forced_locked(monkeypatch, mocker, lock_cache):
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_LOCK_WAIT', 0)
+    mocker.patch.object(VideoField, 'update_dimension_fields')
+    get_source = mocker.patch.object(tasks, 'get_source')
+    get_source.return_value.__enter__.return_value = '/video.mp4'
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+    backend.get_media_info.return_value = {'duration': 1.0, 'width': 1, 'height': 1}
+    mocker.patch.object(tasks, 'get_backend', return_value=backend)
+    mocker.patch.object(tasks, '_hash_source', return_value=None)
+    convert_format = mocker.patch.object(tasks, '_convert_format')
+    enqueue = mocker.Mock()
+    mocker.patch.object(tasks, 'get_enqueue', return_value=enqueue)
+    video = Video.objects.create(file='videos/video.mp4')
+
+    # e.g. the conversion of the previous video
+    with locks.lease(
+        locks.get_format_key(video, 'file', 'mp4_sd'),
+        on_stale=functools.partial(tasks._enqueue_conversion, video, 'file', 'mp4_sd'),
+    ):
+        tasks.convert_video(video.file, force=True, formats=['mp4_sd'])
+        assert convert_format.call_count == 0
+
+    enqueue.assert_called_once_with(
+        tasks.convert_field,
+        'media_library',
+        'video',
+        video.pk,
+        'file',
+        ['mp4_sd'],
+        True,
+    )
+
+
+@pytest.mark.django_db
+def test_encoding__lease_lost(monkeypatch, mocker, lock_cache, scratch_dir):
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {'FFmpeg': [{'name': 'mp4_sd', 'extension': 'mp4', 'params': []}]},
+    )
+    mocker.patch.object(VideoField, 'update_dimension_fields')
+    get_source = mocker.patch.object(tasks, 'get_source')
+    get_source.return_value.__enter__.return_value = '/video.mp4'
+    mocker.patch.object(tasks, '_hash_source', return_value=None)
+    video = Video.objects.create(file='videos/video.mp4')
+    lock_key = locks.get_format_key(video, 'file', 'mp4_sd')
+
+    def encode(source_path, target_path, params, control):
+        # the lease expires and is taken over by another worker
+        lock_cache.set(lock_key, 'other')
+        control.lease.lost.set()
+        yield EncodingProgress(percent=50)
+        raise exceptions.EncodingCancelledError()
+
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+    backend.get_media_info.return_value = {'duration': 1.0, 'width': 1, 'height': 1}
+    backend.encode.side_effect = encode
+    mocker.patch.object(tasks, 'get_backend', return_value=backend)
+    format_finished = mocker.Mock()
+    signals.format_finished.connect(format_finished)
+    try:
+        tasks.convert_video(video.file)
+    finally:
+        signals.format_finished.disconnect(format_finished)
+
+    # the format of the new holder is kept
+    assert video.format_set.get().format == 'mp4_sd'
+    assert lock_cache.get(lock_key) == 'other'
+    assert format_finished.call_args[1]['result'] == signals.ConversionResult.LEASE_LOST
+
+
+@pytest.mark.django_db
+def test_encoding__locked(monkeypatch, lock_cache, audio_path):
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {
+            'FFmpeg': [
+                {
+                    'name': 'm4a',
+                    'extension': 'm4a',
+                    'audio_only': True,
+                    'params': [],
+                    'audio_params': ['-codec:a', 'aac'],
+                },
+            ]
+        },
+    )
+    video = Video.objects.create()
+    with open(audio_path, 'rb') as file_handler:
+        video.file.save('tone.m4a', File(file_handler), save=True)
+    try:
+        # converted by another worker
+        with locks.lease(locks.get_format_key(video, 'file', 'm4a')):
+            tasks.convert_video(video.file)
+        assert not video.format_set.exists()
+
+        tasks.convert_video(video.file)
+        assert video.format_set.get().format == 'm4a'
+    finally:
+        for video_format in video.format_set.all():
+            video_format.file.delete()
+        video.file.delete()
@@ -1,7 +1,7 @@
 import pytest
 from django.contrib.contenttypes.models import ContentType
 
-from ..models import Format
+from ..models import Format, Video
 
 
 @pytest.fixture
@@ -36,3 +36,96 @@ def test_complete(video_format):
     assert Format.objects.in_progress().count() == 0
     assert Format.objects.complete().count() == 1
     assert Format.objects.complete()[0].progress == 100
+
+
+@pytest.fixture
+def videos():
+    content_type = ContentType.objects.get_for_model(Video)
+    videos = [Video.objects.create() for _ in range(3)]
+    for video, progress in zip(videos, ((100, 100), (100, 30), ())):
+        for name, percent in zip(('webm_sd', 'webm_hd'), progress):
+            Format.objects.create(
+                object_id=video.pk,
+                content_type=content_type,
+                field_name='file',
+                format=name,
+                progress=percent,
+            )
+    return videos
+
+
+@pytest.mark.django_db
+def test_annotate_status(django_assert_num_queries, videos):
+    queryset = Format.objects.annotate_status(Video.objects.order_by('pk'))
+
+    with django_assert_num_queries(1):
+        status = [
+            (v.formats_count, v.formats_complete, v.formats_min_progress)
+            for v in queryset
+        ]
+
+    assert status == [(2, 2, 100), (2, 1, 30), (0, 0, None)]
+
+
+@pytest.mark.django_db
+def test_annotate_status__filtered(videos):
+    queryset = Format.objects.filter(format='webm_hd').annotate_status(
+        Video.objects.order_by('pk')
+    )
+
+    status = [
+        (v.formats_count, v.formats_complete, v.formats_min_progress) for v in queryset
+    ]
+    assert status == [(1, 1, 100), (1, 0, 30), (0, 0, None)]
+
+
+@pytest.mark.django_db
+def test_prefetch_for(django_assert_num_queries, videos):
+    queryset = Format.objects.prefetch_for(Video.objects.order_by('pk'), 'file')
+
+    with django_assert_num_queries(2):
+        formats = [sorted(f.format for f in video.file_formats) for video in queryset]
+
+    assert formats == [['webm_hd', 'webm_sd'], ['webm_hd', 'webm_sd'], []]
+
+
+@pytest.mark.django_db
+def test_unsupported(videos):
+    # e.g. an audio format of a video without audio
+    Format.objects.create(
+        object_id=videos[2].pk,
+        content_type=ContentType.objects.get_for_model(Video),
+        field_name='file',
+        format='m4a',
+        unsupported=True,
+    )
+
+    assert not Format.objects.in_progress().filter(format='m4a').exists()
+    assert not Format.objects.complete().filter(format='m4a').exists()
+
+    queryset = Format.objects.annotate_status(Video.objects.order_by('pk'))
+    assert queryset[2].formats_count == 0
+    queryset = Format.objects.prefetch_for(Video.objects.order_by('pk'), 'file')
+    assert queryset[2].file_formats == []
+
+
+@pytest.mark.django_db
+def test_previews(videos):
+    Format.objects.create(
+        object_id=videos[2].pk,
+        content_type=ContentType.objects.get_for_model(Video),
+        field_name='file',
+        format='preview',
+        progress=100,
+        is_preview=True,
+    )
+
+    assert list(Format.objects.previews().values_list('format', flat=True)) == [
+        'preview'
+    ]
+    assert not Format.objects.complete().filter(format='preview').exists()
+
+    queryset = Format.objects.annotate_status(Video.objects.order_by('pk'))
+    assert queryset[2].formats_count == 0
+    queryset = Format.objects.prefetch_for(Video.objects.order_by('pk'), 'file')
+    assert queryset[2].file_formats == []
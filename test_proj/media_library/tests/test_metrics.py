@@ -0,0 +1,86 @@
+import socket
+
+import pytest
+
+from video_encoding import metrics, tasks, utils
+
+from .. import models
+
+
+def test_measure():
+    with metrics.measure() as result:
+        pass
+
+    assert result['wall_time'] >= 0
+    assert result['cpu_time'] >= 0
+
+
+def test_get_output_metrics():
+    assert metrics.get_output_metrics(1.0, 2.0, 1000) == {
+        'speed': 2.0,
+        'size': 1000,
+        'bitrate': 4000.0,
+    }
+    assert metrics.get_output_metrics(1.0, 2.0, None) == {'speed': 2.0}
+
+
+def test_in_memory_sink():
+    sink = metrics.InMemoryMetricsSink()
+    metrics.report(sink, {'wall_time': 1.5}, {'format': 'webm_sd'})
+
+    assert sink.metrics == [('wall_time', 1.5, {'format': 'webm_sd'})]
+    assert sink.values('wall_time') == [1.5]
+
+
+def test_statsd_sink():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    server.settimeout(5)
+    try:
+        sink = metrics.StatsdMetricsSink(port=server.getsockname()[1])
+        sink.emit('wall_time', 1.5, {'result': 'success', 'format': 'webm_sd'})
+
+        data, _ = server.recvfrom(1024)
+    finally:
+        server.close()
+
+    assert data == b'video_encoding.wall_time:1.5|g|#format:webm_sd,result:success'
+
+
+def test_get_metrics_sink(monkeypatch):
+    monkeypatch.setattr(utils, '_instances', {})
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_METRICS_SINK', None)
+    assert metrics.get_metrics_sink() is None
+
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_METRICS_SINK',
+        'video_encoding.metrics.InMemoryMetricsSink',
+    )
+    sink = metrics.get_metrics_sink()
+    assert isinstance(sink, metrics.InMemoryMetricsSink)
+    # reused by all conversions
+    assert metrics.get_metrics_sink() is sink
+
+
+@pytest.mark.django_db
+def test_convert_video__metrics(monkeypatch, mocker, local_video: models.Video):
+    encoding_format = tasks.settings.VIDEO_ENCODING_FORMATS['FFmpeg'][0]
+    monkeypatch.setattr(
+        tasks.settings, 'VIDEO_ENCODING_FORMATS', {'FFmpeg': [encoding_format]}
+    )
+    mocker.patch.object(tasks, '_encode')  # don't encode anything
+
+    sink = metrics.InMemoryMetricsSink()
+    mocker.patch.object(metrics, 'get_metrics_sink', return_value=sink)
+
+    tasks.convert_video(local_video.file)
+
+    names = {name for name, _, _ in sink.metrics}
+    assert {'download_time', 'probe_time', 'wall_time', 'cpu_time', 'speed'} <= names
+    _, _, tags = sink.metrics[-1]
+    assert tags == {
+        'field': 'file',
+        'format': encoding_format['name'],
+        'result': 'success',
+    }
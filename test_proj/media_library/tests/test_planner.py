@@ -0,0 +1,191 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+
+from video_encoding import planner, signals, tasks
+from video_encoding.fields import VideoField
+from video_encoding.models import Format
+from video_encoding.planner import MissingFormats
+
+from ..models import Video
+
+
+@pytest.fixture
+def backend(mocker):
+    # do not probe the (non-existing) videos
+    mocker.patch.object(VideoField, 'update_dimension_fields')
+    backend = mocker.Mock()
+    backend.name = 'FFmpeg'
+    mocker.patch.object(planner, 'get_backend', return_value=backend)
+    return backend
+
+
+def _create_format(video, name, progress=100):
+    return Format.objects.create(
+        object_id=video.pk,
+        content_type=ContentType.objects.get_for_model(video),
+        field_name='file',
+        format=name,
+        progress=progress,
+    )
+
+
+def test_get_video_models():
+    assert planner.get_video_models() == [Video]
+
+
+@pytest.mark.django_db
+def test_find_missing_formats(backend):
+    complete = Video.objects.create(file='videos/complete.mp4')
+    for name in planner.get_format_names():
+        _create_format(complete, name)
+    partial = Video.objects.create(file='videos/partial.mp4')
+    _create_format(partial, 'mp4_sd')
+    # e.g. a failed encoding
+    _create_format(partial, 'mp4_hd', progress=50)
+    new = Video.objects.create(file='videos/new.mp4')
+    Video.objects.create()
+
+    missing = list(planner.find_missing_formats(Video.objects.all()))
+
+    assert missing == [
+        MissingFormats(
+            'media_library',
+            'video',
+            partial.pk,
+            'file',
+            ['webm_sd', 'webm_hd', 'mp4_hd'],
+        ),
+        MissingFormats(
+            'media_library',
+            'video',
+            new.pk,
+            'file',
+            ['webm_sd', 'webm_hd', 'mp4_sd', 'mp4_hd'],
+        ),
+    ]
+
+
+@pytest.mark.django_db
+def test_find_missing_formats__unsupported(backend):
+    video = Video.objects.create(file='videos/silent.mp4')
+    for name in planner.get_format_names():
+        _create_format(video, name)
+    Format.objects.create(
+        object_id=video.pk,
+        content_type=ContentType.objects.get_for_model(video),
+        field_name='file',
+        format='m4a',
+        unsupported=True,
+    )
+
+    # the video has no audio, it is never converted into the audio format
+    missing = planner.find_missing_formats(Video.objects.all(), ['m4a', 'mp4_sd'])
+    assert list(missing) == []
+
+
+@pytest.mark.django_db
+def test_convert_video__unsupported(monkeypatch, mocker, backend):
+    monkeypatch.setattr(
+        planner.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {
+            'FFmpeg': [
+                {'name': 'mp4', 'extension': 'mp4', 'params': []},
+                {'name': 'm4a', 'extension': 'm4a', 'audio_only': True, 'params': []},
+            ]
+        },
+    )
+    get_source = mocker.patch.object(tasks, 'get_source')
+    get_source.return_value.__enter__.return_value = '/silent.mp4'
+    backend.get_media_info.return_value = {
+        'duration': 1.0,
+        'width': 1280,
+        'height': 720,
+        'video': True,
+        'audio': False,
+    }
+    mocker.patch.object(tasks, 'get_backend', return_value=backend)
+    mocker.patch.object(tasks, '_hash_source', return_value=None)
+    convert_format = mocker.patch.object(
+        tasks,
+        '_convert_format',
+        return_value=(signals.ConversionResult.SUCCEEDED, {}),
+    )
+    video = Video.objects.create(file='videos/silent.mp4')
+
+    tasks.convert_video(video.file)
+
+    assert convert_format.call_count == 1
+    assert video.format_set.get(format='m4a').unsupported
+    assert list(planner.find_missing_formats(Video.objects.all(), ['m4a'])) == []
+
+
+@pytest.mark.django_db
+def test_find_missing_formats__new_format(monkeypatch, backend):
+    video = Video.objects.create(file='videos/video.mp4')
+    for name in planner.get_format_names():
+        _create_format(video, name)
+    assert list(planner.find_missing_formats(Video.objects.all())) == []
+
+    monkeypatch.setattr(
+        planner.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {
+            'FFmpeg': [
+                *planner.settings.VIDEO_ENCODING_FORMATS['FFmpeg'],
+                {'name': 'av1', 'extension': 'mkv', 'params': []},
+            ]
+        },
+    )
+
+    missing = list(planner.find_missing_formats(Video.objects.all(), ['av1', 'mp4_sd']))
+    assert missing == [
+        MissingFormats('media_library', 'video', video.pk, 'file', ['av1'])
+    ]
+    assert list(planner.find_missing_formats(Video.objects.all(), ['unknown'])) == []
+
+
+@pytest.mark.django_db
+def test_schedule_missing_formats(backend, mocker):
+    video = Video.objects.create(file='videos/video.mp4')
+    enqueue = mocker.Mock()
+
+    count = planner.schedule_missing_formats(
+        Video.objects.all(), ['mp4_sd'], enqueue=enqueue
+    )
+
+    assert count == 1
+    enqueue.assert_called_once_with(
+        tasks.convert_field, 'media_library', 'video', video.pk, 'file', ['mp4_sd']
+    )
+
+
+@pytest.mark.django_db
+def test_convert_field(backend, mocker):
+    convert_video = mocker.patch('video_encoding.tasks.convert_video')
+    video = Video.objects.create(file='videos/video.mp4')
+
+    tasks.convert_field('media_library', 'video', video.pk, 'file', ['mp4_sd'])
+    convert_video.assert_called_once_with(video.file, force=False, formats=['mp4_sd'])
+
+    # deleted in the meantime
+    tasks.convert_field('media_library', 'video', 0, 'file', ['mp4_sd'])
+    assert convert_video.call_count == 1
+
+
+@pytest.mark.django_db
+def test_command(backend, mocker, capsys):
+    video = Video.objects.create(file='videos/video.mp4')
+    enqueue = mocker.Mock()
+    mocker.patch.object(planner, 'get_enqueue', return_value=enqueue)
+
+    call_command('convert_missing_formats', '--dry-run', '--format', 'mp4_sd')
+    assert enqueue.call_count == 0
+    out = capsys.readouterr().out
+    assert 'media_library.video {} file: mp4_sd'.format(video.pk) in out
+    assert 'Found 1 videos' in out
+
+    call_command('convert_missing_formats', 'media_library.Video')
+    assert enqueue.call_count == 1
+    assert 'Scheduled 1 videos' in capsys.readouterr().out
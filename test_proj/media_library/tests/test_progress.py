@@ -0,0 +1,126 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from video_encoding import progress, tasks, utils
+from video_encoding.backends.base import EncodingProgress
+
+from ..models import Format, Video
+
+
+@pytest.fixture
+def progress_channel(monkeypatch):
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_PROGRESS_CHANNEL',
+        'video_encoding.progress.InMemoryProgressChannel',
+    )
+    monkeypatch.setattr(utils, '_instances', {})
+    return progress.get_progress_channel()
+
+
+@pytest.fixture
+def formats():
+    content_type = ContentType.objects.get_for_model(Video)
+    return [
+        Format.objects.create(
+            object_id=1,
+            content_type=content_type,
+            field_name='file',
+            format=name,
+            progress=percent,
+        )
+        for name, percent in (('webm_sd', 100), ('webm_hd', 30), ('mp4_sd', 0))
+    ]
+
+
+@pytest.mark.parametrize(
+    'channel',
+    (progress.InMemoryProgressChannel(), progress.CacheProgressChannel()),
+)
+def test_channel(channel):
+    channel.publish(1, 50.5)
+    channel.publish(2, 100)
+
+    assert channel.get_many([1, 2, 3]) == {1: 50.5, 2: 100}
+
+
+def test_get_progress_channel(monkeypatch, progress_channel):
+    assert isinstance(progress_channel, progress.InMemoryProgressChannel)
+    # the channel is reused
+    assert progress.get_progress_channel() is progress_channel
+
+    monkeypatch.setattr(tasks.settings, 'VIDEO_ENCODING_PROGRESS_CHANNEL', None)
+    assert progress.get_progress_channel() is None
+
+
+@pytest.mark.django_db
+def test_live_progress(formats):
+    assert Format.objects.live_progress() == {
+        formats[0].pk: 100,
+        formats[1].pk: 30,
+        formats[2].pk: 0,
+    }
+
+
+@pytest.mark.django_db
+def test_live_progress__channel(django_assert_num_queries, progress_channel, formats):
+    progress_channel.publish(formats[1].pk, 55.5)
+    progress_channel.publish(formats[2].pk, 10)
+
+    with django_assert_num_queries(1):
+        live_progress = Format.objects.filter(format__startswith='webm').live_progress()
+
+    assert live_progress == {formats[0].pk: 100, formats[1].pk: 55.5}
+
+
+@pytest.mark.django_db
+def test_encode__progress_channel(mocker, progress_channel, formats):
+    video_format = formats[2]
+    backend = mocker.MagicMock()
+    backend.encode.return_value = iter(
+        EncodingProgress(percent=percent) for percent in (10, 20, 35, 50, 70, 100)
+    )
+    mocker.patch.object(video_format.file, 'save')
+    update_progress = mocker.spy(video_format, 'update_progress')
+
+    tasks._encode(
+        '/video.mp4',
+        video_format,
+        backend,
+        {'name': 'mp4_sd', 'extension': 'mp4', 'params': []},
+    )
+
+    assert progress_channel.get_many([video_format.pk]) == {video_format.pk: 100}
+    # the database is only updated at milestones
+    assert [args for args, _ in update_progress.call_args_list] == [
+        (35,),
+        (70,),
+        (100,),
+        (100,),
+    ]
+
+
+@pytest.mark.django_db
+def test_encode__reencode(mocker, progress_channel, formats):
+    # encoded completely before
+    video_format = formats[0]
+    progress_channel.publish(video_format.pk, 100)
+    live_progress = []
+
+    def encode(*args, **kwargs):
+        queryset = Format.objects.filter(pk=video_format.pk)
+        live_progress.append(queryset.live_progress())
+        yield EncodingProgress(percent=10)
+
+    backend = mocker.MagicMock()
+    backend.encode.side_effect = encode
+    mocker.patch.object(video_format.file, 'save')
+
+    tasks._encode(
+        '/video.mp4',
+        video_format,
+        backend,
+        {'name': 'webm_sd', 'extension': 'webm', 'params': []},
+    )
+
+    assert live_progress == [{video_format.pk: 0}]
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+from PIL import Image
+
+from video_encoding import exceptions
+from video_encoding.backends import pyav
+from video_encoding.backends.pyav import PyAVBackend
+
+pytest.importorskip('av')
+
+
+@pytest.fixture
+def pyav_backend():
+    return PyAVBackend()
+
+
+def test_get_media_info(pyav_backend, ffmpeg, video_path):
+    media_info = pyav_backend.get_media_info(video_path)
+
+    assert media_info['width'] == 1280
+    assert media_info['height'] == 720
+    assert media_info['video'] is True
+    assert media_info['duration'] == pytest.approx(
+        ffmpeg.get_media_info(video_path)['duration'], abs=0.01
+    )
+
+
+def test_get_media_info__audio(pyav_backend, audio_path):
+    media_info = pyav_backend.get_media_info(audio_path)
+
+    assert media_info['width'] == 0
+    assert media_info['height'] == 0
+    assert media_info['video'] is False
+    assert media_info['audio'] is True
+    assert media_info['duration'] == pytest.approx(2, abs=0.1)
+
+
+def test_get_media_info__invalid(pyav_backend, tmp_path):
+    path = tmp_path / 'invalid.mp4'
+    path.write_bytes(b'no video')
+
+    with pytest.raises(exceptions.FFmpegError):
+        pyav_backend.get_media_info(str(path))
+
+
+def test_get_thumbnail(pyav_backend, video_path):
+    thumbnail_path = pyav_backend.get_thumbnail(video_path)
+
+    try:
+        with Image.open(thumbnail_path) as im:
+            assert im.size == (1280, 720)
+    finally:
+        os.unlink(thumbnail_path)
+
+
+@pytest.mark.parametrize('offset', (0, 0.02))
+def test_get_thumbnail__too_close_to_the_end(pyav_backend, video_path, offset):
+    duration = pyav_backend.get_media_info(video_path)['duration']
+
+    with pytest.raises(exceptions.InvalidTimeError):
+        pyav_backend.get_thumbnail(video_path, at_time=duration - offset)
+
+
+def test_check(monkeypatch):
+    assert PyAVBackend.check() == []
+
+    monkeypatch.setattr(pyav, 'av', None)
+    errors = PyAVBackend.check()
+    assert len(errors) == 1
+    assert errors[0].id == 'video_conversion.E002'
@@ -0,0 +1,140 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from video_encoding import scheduler, tasks
+from video_encoding.scheduler import ConversionScheduler
+
+from ..models import Video
+
+
+@pytest.fixture
+def create_video():
+    def create(duration):
+        return Video.objects.create(duration=duration)
+
+    return create
+
+
+@pytest.mark.django_db
+def test_shortest_job_first(create_video):
+    conversion_scheduler = ConversionScheduler()
+    long_video = conversion_scheduler.submit(create_video(300))
+    unknown_video = conversion_scheduler.submit(create_video(None))
+    short_video = conversion_scheduler.submit(create_video(10))
+
+    assert len(conversion_scheduler) == 3
+    assert conversion_scheduler.pop() == short_video
+    assert conversion_scheduler.pop() == long_video
+    assert conversion_scheduler.pop() == unknown_video
+    assert conversion_scheduler.pop() is None
+
+
+@pytest.mark.django_db
+def test_priority(create_video):
+    conversion_scheduler = ConversionScheduler(priorities={'media_library.Video': 5})
+    default_job = conversion_scheduler.submit(create_video(10))
+    low_job = conversion_scheduler.submit(create_video(1), priority=0)
+
+    assert default_job.priority == 5
+    assert conversion_scheduler.pop() == default_job
+    assert conversion_scheduler.pop() == low_job
+
+
+@pytest.mark.django_db
+def test_fair_share(create_video):
+    conversion_scheduler = ConversionScheduler(shares={'small': 2})
+    bulk_jobs = [
+        conversion_scheduler.submit(create_video(10), tenant='bulk') for _ in range(4)
+    ]
+    small_jobs = [
+        conversion_scheduler.submit(create_video(20), tenant='small') for _ in range(2)
+    ]
+
+    order = [conversion_scheduler.pop() for _ in range(6)]
+
+    # "small" has twice the share of "bulk"
+    assert order == [
+        bulk_jobs[0],
+        small_jobs[0],
+        bulk_jobs[1],
+        small_jobs[1],
+        bulk_jobs[2],
+        bulk_jobs[3],
+    ]
+
+
+@pytest.mark.django_db
+def test_fair_share__new_tenant(create_video):
+    """
+    A tenant becoming active does not get the resources of its idle time.
+    """
+    conversion_scheduler = ConversionScheduler()
+    for _ in range(3):
+        conversion_scheduler.submit(create_video(10), tenant='bulk')
+        conversion_scheduler.pop()
+    bulk_job = conversion_scheduler.submit(create_video(10), tenant='bulk')
+    conversion_scheduler.submit(create_video(10), tenant='bulk')
+
+    new_job = conversion_scheduler.submit(create_video(10), tenant='new')
+
+    assert conversion_scheduler.pop() == bulk_job
+    assert conversion_scheduler.pop() == new_job
+
+
+@pytest.mark.django_db
+def test_run(mocker, create_video):
+    convert_all_videos = mocker.patch.object(tasks, 'convert_all_videos')
+    conversion_scheduler = ConversionScheduler()
+    videos = [create_video(duration) for duration in (30, 10, 20)]
+    for video in videos:
+        conversion_scheduler.submit(video)
+
+    assert conversion_scheduler.run(max_jobs=2) == 2
+    assert conversion_scheduler.run() == 1
+
+    assert [args for args, _ in convert_all_videos.call_args_list] == [
+        ('media_library', 'video', videos[1].pk),
+        ('media_library', 'video', videos[2].pk),
+        ('media_library', 'video', videos[0].pk),
+    ]
+
+
+@pytest.mark.django_db
+def test_run__preempt(monkeypatch, mocker, create_video):
+    monkeypatch.setattr(scheduler.settings, 'VIDEO_ENCODING_CONTROL_CACHE', 'default')
+    convert_all_videos = mocker.patch.object(tasks, 'convert_all_videos')
+    preempting = mocker.patch.object(scheduler.control, 'preempting')
+    conversion_scheduler = ConversionScheduler()
+    conversion_scheduler.submit(create_video(10), priority=7)
+
+    assert conversion_scheduler.run(preempt=True) == 1
+
+    preempting.assert_called_once_with(7)
+    assert convert_all_videos.call_count == 1
+
+
+@pytest.mark.django_db
+def test_run__preempt_disabled(monkeypatch, mocker, create_video):
+    monkeypatch.setattr(scheduler.settings, 'VIDEO_ENCODING_CONTROL_CACHE', None)
+    convert_all_videos = mocker.patch.object(tasks, 'convert_all_videos')
+    conversion_scheduler = ConversionScheduler()
+    conversion_scheduler.submit(create_video(10), priority=7)
+
+    with pytest.raises(ImproperlyConfigured):
+        conversion_scheduler.run(preempt=True)
+
+    # the job is kept
+    assert convert_all_videos.call_count == 0
+    assert conversion_scheduler.run() == 1
+
+
+def test_settings(monkeypatch):
+    monkeypatch.setattr(
+        scheduler.settings, 'VIDEO_ENCODING_PRIORITIES', {'media_library.Video': 1}
+    )
+    monkeypatch.setattr(scheduler.settings, 'VIDEO_ENCODING_TENANT_SHARES', {'a': 2})
+
+    conversion_scheduler = ConversionScheduler()
+
+    assert conversion_scheduler.priorities == {'media_library.video': 1}
+    assert conversion_scheduler.shares == {'a': 2}
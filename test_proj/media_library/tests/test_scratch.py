@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from video_encoding import exceptions, scratch
+from video_encoding.config import settings
+
+
+def test_parse_bitrate():
+    assert scratch.parse_bitrate('1000k') == 1000000
+    assert scratch.parse_bitrate('1.5M') == 1500000
+    assert scratch.parse_bitrate('128000') == 128000
+    assert scratch.parse_bitrate('auto') is None
+
+
+def test_estimate_size():
+    params = ['-b:v', '1000k', '-maxrate', '2000k', '-b:a', '128k']
+    assert scratch.estimate_size(10, params) == int(2128000 * 10 / 8 * 1.2)
+    assert scratch.estimate_size(10, ['-b:v', '800k']) == int(800000 * 10 / 8 * 1.2)
+
+    # quality based encodings fall back to the default
+    assert scratch.estimate_size(10, ['-crf', '23'], default=1000) == 1000
+    assert scratch.estimate_size(None, params, default=1000) == 1000
+
+
+def test_scratch_file(scratch_dir):
+    with scratch.scratch_file(suffix='.mp4', size=1000) as path:
+        assert os.path.dirname(path) == scratch_dir
+        assert os.path.basename(path).startswith(scratch.TEMP_PREFIX)
+        assert path.endswith('.mp4')
+        assert scratch._reserved == 1000
+
+    assert not os.path.exists(path)
+    assert scratch._reserved == 0
+
+
+def test_reserve__insufficient_space(monkeypatch, mocker, scratch_dir):
+    monkeypatch.setattr(settings, 'VIDEO_ENCODING_SCRATCH_MIN_FREE', 500)
+    mocker.patch.object(scratch, 'get_free_space', return_value=1000)
+
+    with scratch.reserve(400):
+        # the reserved space is no longer available
+        with pytest.raises(exceptions.InsufficientScratchSpaceError):
+            with scratch.reserve(200):
+                pass
+
+    assert scratch._reserved == 0
+
+
+def test_reserve__wait(monkeypatch, mocker, scratch_dir):
+    monkeypatch.setattr(settings, 'VIDEO_ENCODING_SCRATCH_WAIT', 10)
+    mocker.patch.object(scratch, 'get_free_space', side_effect=[100, 100, 1000])
+    sleep = mocker.patch.object(scratch.time, 'sleep')
+
+    with scratch.reserve(500):
+        pass
+
+    assert sleep.call_count == 2
@@ -69,6 +69,7 @@ def test_signals(monkeypatch, mocker, local_video: models.Video) -> None:
             'instance': local_video,
             'format': ...,
             'result': signals.ConversionResult.SUCCEEDED,
+            'metrics': ...,
         },
     )
     assert isinstance(kwargs['format'], models.Format)
@@ -122,6 +123,7 @@ def test_signals__encoding_failed(
             'instance': local_video,
             'format': ...,
             'result': signals.ConversionResult.FAILED,
+            'metrics': ...,
         },
     )
     assert isinstance(kwargs['format'], models.Format)
@@ -168,7 +170,68 @@ def test_signals__encoding_skipped(
             'instance': local_video,
             'format': ...,
             'result': signals.ConversionResult.SKIPPED,
+            'metrics': ...,
         },
     )
     assert isinstance(kwargs['format'], models.Format)
     assert kwargs['format'].format == encoding_format['name']
+
+
+@pytest.mark.django_db
+def test_signals__video_playable(
+    monkeypatch, mocker, local_video: models.Video
+) -> None:
+    """
+    Make sure `fast_start` formats are encoded first and reported as playable.
+    """
+    webm_format, _, mp4_format, _ = tasks.settings.VIDEO_ENCODING_FORMATS['FFmpeg']
+    monkeypatch.setattr(
+        tasks.settings,
+        'VIDEO_ENCODING_FORMATS',
+        {'FFmpeg': [webm_format, {**mp4_format, 'fast_start': True}]},
+    )
+    mocker.patch.object(tasks, '_encode')  # don't encode anything
+
+    listener = mocker.MagicMock()
+    signals.format_started.connect(listener)
+    signals.video_playable.connect(listener)
+
+    tasks.convert_video(local_video.file)
+
+    assert listener.call_count == 3
+    _, kwargs = listener.call_args_list[0]
+    assert kwargs['signal'] == signals.format_started
+    assert kwargs['format'].format == mp4_format['name']
+
+    _, kwargs = listener.call_args_list[1]
+    assert matches(
+        kwargs,
+        {
+            'signal': signals.video_playable,
+            'sender': models.Video,
+            'instance': local_video,
+            'format': ...,
+        },
+    )
+    assert kwargs['format'].format == mp4_format['name']
+
+    _, kwargs = listener.call_args_list[2]
+    assert kwargs['signal'] == signals.format_started
+    assert kwargs['format'].format == webm_format['name']
+
+
+@pytest.mark.django_db
+def test_signals__selected_formats(mocker, local_video: models.Video) -> None:
+    """
+    Make sure only the requested formats are encoded.
+    """
+    mocker.patch.object(tasks, '_encode')  # don't encode anything
+
+    listener = mocker.MagicMock()
+    signals.format_started.connect(listener)
+
+    tasks.convert_video(local_video.file, formats=['webm_hd'])
+
+    assert listener.call_count == 1
+    _, kwargs = listener.call_args_list[0]
+    assert kwargs['format'].format == 'webm_hd'
@@ -0,0 +1,62 @@
+import pytest
+
+from video_encoding import thumbnails
+
+np = pytest.importorskip('numpy')
+
+
+def _frames():
+    random = np.random.RandomState(0)
+    detailed = random.randint(0, 256, size=(96, 96)).astype(np.uint8)
+    return np.stack(
+        [
+            np.zeros((96, 96), dtype=np.uint8),  # black
+            np.full((96, 96), 128, dtype=np.uint8),  # blank
+            detailed,
+            detailed,
+            np.tile(np.linspace(0, 255, 96, dtype=np.uint8), (96, 1)),  # gradient
+        ]
+    )
+
+
+def test_get_metrics():
+    metrics = thumbnails.get_metrics(_frames())
+
+    assert metrics['brightness'][0] == 0
+    assert metrics['contrast'][1] == 0
+    assert metrics['sharpness'].argmax() in (2, 3)
+    for values in metrics.values():
+        assert values.shape == (5,)
+        assert ((values >= 0) & (values <= 1)).all()
+
+
+def test_score_frames():
+    scores = thumbnails.score_frames(_frames())
+
+    # black and blank frames are never selected
+    assert scores[0] == 0
+    assert scores[1] == 0
+    assert scores[2] > scores[4]
+
+
+def test_score_frames__single_frame():
+    scores = thumbnails.score_frames(_frames()[2:3])
+
+    assert scores.shape == (1,)
+    assert scores[0] > 0
+
+
+def test_select_frames():
+    scores = np.array([0.0, 0.9, 0.8, 0.1, 0.7, 0.6])
+
+    assert thumbnails.select_frames(scores, count=3) == [1, 2, 4]
+    assert thumbnails.select_frames(scores, count=3, min_distance=2) == [1, 4]
+    # frames with a score of 0 are never selected
+    assert thumbnails.select_frames(scores, count=10) == [1, 2, 4, 5, 3]
+
+
+def test_frames_from_bytes():
+    size = thumbnails.SAMPLE_WIDTH * thumbnails.SAMPLE_HEIGHT
+    frames = thumbnails.frames_from_bytes(bytes(2 * size + 10))
+
+    assert frames.shape == (2, thumbnails.SAMPLE_HEIGHT, thumbnails.SAMPLE_WIDTH)
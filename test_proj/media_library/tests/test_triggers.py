@@ -0,0 +1,133 @@
+import pytest
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+
+from video_encoding import tasks, triggers
+from video_encoding.fields import VideoField
+
+from ..models import Video
+
+
+@pytest.fixture
+def enqueue(mocker):
+    # do not probe the (non-existing) videos
+    mocker.patch.object(VideoField, 'update_dimension_fields')
+    enqueue = mocker.Mock()
+    mocker.patch.object(triggers, 'get_enqueue', return_value=enqueue)
+
+    cache.clear()
+    triggers.register(Video)
+    yield enqueue
+
+    uid = 'video_encoding.triggers.media_library.video'
+    post_init.disconnect(sender=Video, dispatch_uid=uid)
+    post_save.disconnect(sender=Video, dispatch_uid=uid)
+    cache.clear()
+
+
+def _get_args(video, replaced=False):
+    return (triggers.convert, 'media_library', 'video', video.pk, {'file': replaced})
+
+
+@pytest.mark.django_db(transaction=True)
+def test_created(enqueue):
+    with transaction.atomic():
+        video = Video.objects.create(file='videos/video.mp4')
+        assert enqueue.call_count == 0
+
+    enqueue.assert_called_once_with(*_get_args(video))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_unchanged(enqueue):
+    video = Video.objects.create()
+
+    video.save()
+    Video.objects.get(pk=video.pk).save()
+
+    assert enqueue.call_count == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_saved_repeatedly(enqueue):
+    with transaction.atomic():
+        video = Video.objects.create(file='videos/video.mp4')
+        video.save()
+        video.file = 'videos/other.mp4'
+        video.save()
+
+    enqueue.assert_called_once_with(*_get_args(video))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replaced(mocker, enqueue):
+    mocker.patch.object(tasks, 'convert_video')
+    video = Video.objects.create(file='videos/video.mp4')
+    enqueue.reset_mock()
+    triggers.convert(*_get_args(video)[1:])
+
+    with transaction.atomic():
+        video.file = 'videos/other.mp4'
+        video.save()
+        video.save()
+
+    enqueue.assert_called_once_with(*_get_args(video, replaced=True))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back(mocker, enqueue):
+    mocker.patch.object(tasks, 'convert_video')
+    video = Video.objects.create(file='videos/video.mp4')
+    enqueue.reset_mock()
+    triggers.convert(*_get_args(video)[1:])
+
+    with pytest.raises(ValueError), transaction.atomic():
+        video.file = 'videos/other.mp4'
+        video.save()
+        raise ValueError()
+
+    with transaction.atomic():
+        video.file = 'videos/third.mp4'
+        video.save()
+
+    enqueue.assert_called_once_with(*_get_args(video, replaced=True))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_coalesced(mocker, enqueue):
+    convert_video = mocker.patch.object(tasks, 'convert_video')
+
+    video = Video.objects.create(file='videos/video.mp4')
+    video.file = 'videos/other.mp4'
+    video.save()
+
+    # the pending conversion converts the current video
+    enqueue.assert_called_once_with(*_get_args(video))
+
+    # and re-encodes the formats of the replaced video
+    triggers.convert(*_get_args(video)[1:])
+    convert_video.assert_called_once_with(video.file, force=True)
+
+    video.file = 'videos/video.mp4'
+    video.save()
+
+    assert enqueue.call_count == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replaced__cancel(monkeypatch, mocker, enqueue):
+    monkeypatch.setattr(triggers.settings, 'VIDEO_ENCODING_CONTROL_CACHE', 'default')
+    cancel = mocker.patch.object(triggers.control, 'cancel')
+    video = Video.objects.create(file='videos/video.mp4')
+    assert cancel.call_count == 0
+
+    video.file = 'videos/other.mp4'
+    video.save()
+
+    cancel.assert_called_once_with(video)
+
+
+@pytest.mark.django_db
+def test_convert__deleted():
+    triggers.convert('media_library', 'video', 0, {'file': False})
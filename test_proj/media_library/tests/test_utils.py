@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from test_proj.conftest import FakeRemoteStorage
+from video_encoding import utils
+
+from ..models import Video
+
+
+def test_get_available_cpus(mocker):
+    mocker.patch.object(utils, '_get_cgroup_cpu_quota', return_value=None)
+    mocker.patch.object(utils.os, 'sched_getaffinity', return_value={0, 1, 2, 3})
+
+    assert utils.get_available_cpus() == 4
+
+
+def test_get_available_cpus__cgroup_quota(mocker):
+    mocker.patch.object(utils, '_get_cgroup_cpu_quota', return_value=1.5)
+    mocker.patch.object(utils.os, 'sched_getaffinity', return_value={0, 1, 2, 3})
+
+    assert utils.get_available_cpus() == 1
+
+
+def test_get_cgroup_cpu_quota(mocker):
+    mocker.patch('builtins.open', mocker.mock_open(read_data='200000 100000\n'))
+    assert utils._get_cgroup_cpu_quota() == 2
+
+    mocker.patch('builtins.open', mocker.mock_open(read_data='max 100000\n'))
+    assert utils._get_cgroup_cpu_quota() is None
+
+
+def test_get_local_path__remote_without_size(tmp_path):
+    # `FileSystemStorage.size()` requires `path()`, which is not implemented
+    (tmp_path / 'video.mp4').write_bytes(b'video')
+    video = Video(file='video.mp4')
+    video.file.storage = FakeRemoteStorage(tmp_path)
+
+    with utils.get_local_path(video.file) as path:
+        with open(path, 'rb') as f:
+            assert f.read() == b'video'
+
+    assert not os.path.exists(path)
+
+
+def test_refresh_source(tmp_path):
+    video = Video(file='video.mp4')
+    video.file.storage = FakeRemoteStorage(tmp_path)
+    video.file.storage.url = lambda name: 'https://example.com/video.mp4?v=2'
+
+    assert utils.refresh_source(video.file, '/tmp/video.mp4') == '/tmp/video.mp4'
+    assert (
+        utils.refresh_source(video.file, 'https://example.com/video.mp4?v=1')
+        == 'https://example.com/video.mp4?v=2'
+    )
+
+
+def test_redact_urls():
+    assert (
+        utils.redact_urls("ffmpeg -i 'https://example.com/a.mp4?X-Amz-Signature=x' a")
+        == "ffmpeg -i 'https://example.com/a.mp4?<redacted>' a"
+    )
+    assert utils.redact_urls('/tmp/video?.mp4') == '/tmp/video?.mp4'
+
+
+def test_best_effort(caplog):
+    with utils.best_effort('Cannot reach the cache.', (OSError,)):
+        raise OSError('unreachable')
+    assert caplog.messages == ['Cannot reach the cache.']
+
+    with pytest.raises(ValueError):
+        with utils.best_effort('Cannot reach the cache.', (OSError,)):
+            raise ValueError
+
+
+def test_get_instance(monkeypatch):
+    monkeypatch.setattr(utils, '_instances', {})
+
+    instance = utils.get_instance('collections.OrderedDict', {'a': 1}, '{} {}')
+    assert instance == {'a': 1}
+    assert utils.get_instance('collections.OrderedDict', {}, '{} {}') is instance
+
+    with pytest.raises(ImproperlyConfigured, match='missing.Class'):
+        utils.get_instance('missing.Class', {}, "Cannot retrieve '{}': {}")
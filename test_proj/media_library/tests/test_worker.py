@@ -0,0 +1,125 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from video_encoding import exceptions
+from video_encoding.backends import pyav
+from video_encoding.backends import worker as worker_module
+from video_encoding.backends.worker import WorkerBackend
+from video_encoding.worker import WorkerServer, get_default_backend
+
+
+class ProbeBackend:
+    def __init__(self):
+        self.calls = []
+
+    def get_media_info(self, video_path):
+        self.calls.append(video_path)
+        return {'duration': 2.5, 'width': 1280, 'height': 720}
+
+    def get_thumbnail(self, video_path, at_time=0.5):
+        raise exceptions.InvalidTimeError()
+
+
+@pytest.fixture
+def worker(tmp_path):
+    backend = ProbeBackend()
+    server = WorkerServer(str(tmp_path / 'worker.sock'), backend, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def worker_backend(monkeypatch, worker):
+    monkeypatch.setattr(worker_module, '_pools', {})
+    backend = WorkerBackend(socket_path=worker.server_address)
+    yield backend
+    backend.close()
+
+
+def test_get_media_info(worker, worker_backend):
+    for index in range(3):
+        media_info = worker_backend.get_media_info('/video{}.mp4'.format(index))
+        assert media_info == {'duration': 2.5, 'width': 1280, 'height': 720}
+
+    assert worker.backend.calls == ['/video0.mp4', '/video1.mp4', '/video2.mp4']
+
+
+def test_errors(worker_backend):
+    with pytest.raises(exceptions.InvalidTimeError):
+        worker_backend.get_thumbnail('/video.mp4', at_time=100)
+
+    # not supported by the backend of the worker
+    with pytest.raises(exceptions.VideoEncodingError):
+        worker_backend.get_preview('/video.mp4')
+
+
+def test_reconnect(worker, worker_backend):
+    worker_backend.get_media_info('/video.mp4')
+    # simulate a connection closed by the worker
+    worker_backend.pool.idle[0].socket.shutdown(2)
+
+    assert worker_backend.get_media_info('/video.mp4')['duration'] == 2.5
+
+
+def test_shared_connections(worker, worker_backend):
+    other = WorkerBackend(socket_path=worker.server_address)
+
+    worker_backend.get_media_info('/video0.mp4')
+    other.get_media_info('/video1.mp4')
+
+    assert other.pool is worker_backend.pool
+    assert len(worker_backend.pool.idle) == 1
+
+    worker_backend.close()
+    assert worker_backend.pool.idle == []
+
+
+def test_socket_mode(worker):
+    mode = os.stat(worker.server_address).st_mode
+
+    assert stat.S_ISSOCK(mode)
+    assert stat.S_IMODE(mode) == 0o600
+
+
+def test_default_backend(mocker, monkeypatch):
+    ffmpeg_backend = mocker.patch('video_encoding.backends.ffmpeg.FFmpegBackend')
+    pyav_backend = mocker.patch.object(pyav, 'PyAVBackend')
+
+    monkeypatch.setattr(pyav, 'av', object())
+    assert get_default_backend() is pyav_backend.return_value
+
+    # probing requires ffprobe without PyAV
+    monkeypatch.setattr(pyav, 'av', None)
+    assert get_default_backend() is ffmpeg_backend.return_value
+
+
+def test_not_running(tmp_path):
+    backend = WorkerBackend(socket_path=str(tmp_path / 'missing.sock'))
+
+    with pytest.raises(exceptions.VideoEncodingError):
+        backend.get_media_info('/video.mp4')
+
+
+def test_encode_backend(mocker, tmp_path):
+    backend = WorkerBackend(
+        socket_path=str(tmp_path / 'worker.sock'),
+        encode_backend='video_encoding.backends.ffmpeg.FFmpegBackend',
+        niceness=10,
+    )
+    encode_backend_class = mocker.patch.object(backend, 'encode_backend_class')
+
+    backend.encode('/video.mp4', '/video.webm', ['-codec:v', 'libvpx'])
+
+    assert backend.name == 'FFmpeg'
+    encode_backend_class.assert_called_once_with(niceness=10)
+    encode_backend_class.return_value.encode.assert_called_once_with(
+        '/video.mp4', '/video.webm', ['-codec:v', 'libvpx']
+    )
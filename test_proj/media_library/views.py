@@ -1,6 +1,6 @@
 from django.views.generic import CreateView
 
-from .models import Video
+from .models import Format, Video
 
 
 class VideoFormView(CreateView):
@@ -12,5 +12,5 @@ class VideoFormView(CreateView):
 
     def get_context_data(self, *args, **kwargs):
         context = super(VideoFormView, self).get_context_data(*args, **kwargs)
-        context['videos'] = Video.objects.all()
+        context['videos'] = Format.objects.annotate_status(Video.objects.all())
         return context
@@ -1,17 +1,72 @@
 from django.contrib.contenttypes import admin
+from django.contrib.contenttypes.forms import BaseGenericInlineFormSet
+from django.utils.translation import gettext_lazy as _
 
 from .models import Format
 
 
+class FormatInlineFormSet(BaseGenericInlineFormSet):
+    max_rows = None
+
+    def get_queryset(self):
+        # forms access the queryset by index, it has to be evaluated only once
+        if not hasattr(self, '_queryset'):
+            queryset = super().get_queryset()
+            if self.max_rows is not None:
+                queryset = queryset[: self.max_rows]
+            self._queryset = queryset
+        return self._queryset
+
+
 class FormatInline(admin.GenericTabularInline):
     model = Format
+    formset = FormatInlineFormSet
     fields = ('format', 'progress', 'file', 'width', 'height', 'duration')
     readonly_fields = fields
     extra = 0
     max_num = 0
+    # maximum number of formats shown
+    max_rows = 20
 
     def has_add_permission(self, *args, **kwargs):
         return False
 
     def has_delete_permission(self, *args, **kwargs):
         return False
+
+    def get_queryset(self, request):
+        # only load persisted columns, which are shown
+        return (
+            super()
+            .get_queryset(request)
+            .filter(unsupported=False, is_preview=False)
+            .only('object_id', 'content_type', 'field_name', *self.fields)
+        )
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.max_rows = self.max_rows
+        return formset
+
+
+class FormatStatusAdminMixin:
+    """
+    Show the encoding status of all formats on the change list of a `ModelAdmin`.
+
+    The status is annotated using a single query.
+    """
+
+    # name of the `GenericRelation` to `Format`
+    format_relation = 'format_set'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)  # type: ignore
+        return Format.objects.annotate_status(
+            queryset, related_name=self.format_relation
+        )
+
+    def format_status(self, obj):
+        return '{}/{}'.format(obj.formats_complete, obj.formats_count)
+
+    format_status.short_description = _("Formats")  # type: ignore
+    format_status.admin_order_field = 'formats_complete'  # type: ignore
@@ -17,8 +17,13 @@ def get_backend_class():
     return cls
 
 
-def get_backend():
+def get_backend(**params):
+    """
+    Return an instance of the configured backend.
+
+    `params` override the ones defined in `VIDEO_ENCODING_BACKEND_PARAMS`.
+    """
     from ..config import settings
 
     cls = get_backend_class()
-    return cls(**settings.VIDEO_ENCODING_BACKEND_PARAMS)
+    return cls(**{**settings.VIDEO_ENCODING_BACKEND_PARAMS, **params})
@@ -1,8 +1,49 @@
 import abc
-from typing import Dict, Generator, List, Union
+from typing import Any, Dict, Generator, List, NamedTuple, Optional, Union
 
 from django.core import checks
 
+from ..control import EncodingControl
+
+
+class EncodingProgress(NamedTuple):
+    """
+    Progress of a running encoding, as reported by the encoder.
+    """
+
+    percent: float
+    time: float = 0  # seconds of the video which have been encoded
+    frame: Optional[int] = None
+    fps: Optional[float] = None
+    bitrate: Optional[float] = None  # kbit/s
+    speed: Optional[float] = None  # multiple of realtime
+    eta: Optional[float] = None  # estimated seconds until the encoding finishes
+
+
+class ThumbnailCandidate(NamedTuple):
+    """
+    Thumbnail selected by `get_best_thumbnails`.
+    """
+
+    path: str
+    time: float  # seconds
+    score: float  # within [0, 1], higher is better
+
+
+def get_encode_options(
+    audio_path: Optional[str] = None, control: Optional[EncodingControl] = None
+) -> Dict[str, Any]:
+    """
+    Return the optional arguments of `encode`, which are only passed on if
+    used, as they may not be supported by all backends.
+    """
+    options: Dict[str, Any] = {}
+    if audio_path:
+        options['audio_path'] = audio_path
+    if control:
+        options['control'] = control
+    return options
+
 
 class BaseEncodingBackend(metaclass=abc.ABCMeta):
     # used as key to get all defined formats from `VIDEO_ENCODING_FORMATS`
@@ -14,20 +55,42 @@ class BaseEncodingBackend(metaclass=abc.ABCMeta):
 
     @abc.abstractmethod
     def encode(
-        self, source_path: str, target_path: str, params: List[str]
-    ) -> Generator[float, None, None]:  # pragma: no cover
+        self,
+        source_path: str,
+        target_path: str,
+        params: List[str],
+        audio_path: Optional[str] = None,
+        control: Optional[EncodingControl] = None,
+    ) -> Generator[EncodingProgress, None, None]:  # pragma: no cover
+        """
+        Encode a video and continuously yield the progress.
+
+        All encoder specific options are passed in using `params`. If
+        `audio_path` is given, its audio is copied into the encoding instead
+        of encoding the audio of the source. If `control` is given, the
+        encoding is suspended while requested and an `EncodingCancelledError`
+        is raised once it is cancelled.
+        """
+
+    def analyse(
+        self, source_path: str, passlogfile: str, params: List[str]
+    ) -> None:  # pragma: no cover
         """
-        Encode a video.
+        Run the analysis pass of a two-pass encoding.
 
-        All encoder specific options are passed in using `params`.
+        The statistics are written to `passlogfile`.
         """
+        raise NotImplementedError(
+            "{} does not support two-pass encoding.".format(self.__class__.__name__)
+        )
 
     @abc.abstractmethod
     def get_media_info(
         self, video_path: str
     ) -> Dict[str, Union[int, float]]:  # pragma: no cover
         """
-        Return duration, width and height of the video.
+        Return duration, width and height of the video and whether it
+        contains `video` and `audio` streams.
         """
 
     @abc.abstractmethod
@@ -40,3 +103,48 @@ class BaseEncodingBackend(metaclass=abc.ABCMeta):
         If the requested thumbnail is not within the duration of the video
         an `InvalidTimeError` is thrown.
         """
+
+    def get_best_thumbnails(
+        self,
+        video_path: str,
+        count: int = 3,
+        samples: int = 100,
+        min_distance: Optional[float] = None,
+    ) -> List[ThumbnailCandidate]:  # pragma: no cover
+        """
+        Select the `count` best thumbnails of the video, best first.
+
+        Candidates are at least `min_distance` seconds apart.
+        """
+        raise NotImplementedError(
+            "{} does not support selecting thumbnails.".format(self.__class__.__name__)
+        )
+
+    def get_complexity(
+        self, video_path: str, segments: int = 3, segment_duration: float = 2.0
+    ) -> float:  # pragma: no cover
+        """
+        Estimate the complexity of the content of the video.
+
+        Returns the bitrate (bit/s) of a fast, low resolution constant quality
+        encoding of `segments` clips of the video.
+        """
+        raise NotImplementedError(
+            "{} does not support complexity analysis.".format(self.__class__.__name__)
+        )
+
+    def get_preview(
+        self,
+        video_path: str,
+        extension: str = 'webp',
+        segments: int = 4,
+        segment_duration: float = 1.0,
+        width: int = 320,
+        fps: int = 10,
+    ) -> str:  # pragma: no cover
+        """
+        Create a short preview of the video and return its path.
+        """
+        raise NotImplementedError(
+            "{} does not support previews.".format(self.__class__.__name__)
+        )
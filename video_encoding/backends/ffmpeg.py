@@ -1,32 +1,262 @@
+import collections
 import io
 import json
 import logging
 import os
 import re
+import signal
 import subprocess
-import tempfile
+import threading
+import time
 from shutil import which
-from typing import Dict, Generator, List, Union
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
 
 from django.core import checks
 
-from .. import exceptions
+from .. import exceptions, scratch, thumbnails
 from ..config import settings
-from .base import BaseEncodingBackend
+from ..control import ControlState, EncodingControl
+from ..utils import best_effort, get_available_cpus, redact_urls
+from .base import BaseEncodingBackend, EncodingProgress, ThumbnailCandidate
 
 logger = logging.getLogger(__name__)
 
-# regex to extract the progress (time) from ffmpeg
-RE_TIMECODE = re.compile(r'time=(\d+:\d+:\d+.\d+) ')
+# regex to extract the live stats (e.g. time, speed) from ffmpeg
+RE_STATS = re.compile(r'(frame|fps|time|bitrate|speed)=\s*(\S+)')
+# number of lines written to stderr, which are kept for error reports
+STDERR_TAIL_LENGTH = 20
+# seconds to wait for ffmpeg to exit gracefully before it is killed
+TERMINATE_TIMEOUT = 5
+
+# options used to define the video codec
+VIDEO_CODEC_OPTIONS = ('-codec:v', '-c:v', '-vcodec')
+# number of threads up to which the encoders scale reasonably
+CODEC_MAX_THREADS = {
+    'libvpx': 4,
+    'libvpx-vp9': 8,
+    'libaom-av1': 8,
+    'libx264': 16,
+    'libx265': 16,
+}
+DEFAULT_MAX_THREADS = 8
+
+# fast, low resolution constant quality encoding to estimate the complexity
+COMPLEXITY_FILTER = 'scale=-2:240'
+COMPLEXITY_PARAMS = [
+    '-codec:v',
+    'libx264',
+    '-preset',
+    'ultrafast',
+    '-crf',
+    '26',
+    '-f',
+    'matroska',
+]
+
+# filters and params used to create previews of each supported format
+PREVIEW_FILTERS = {
+    'mp4': '[preview]',
+    'webp': '[preview]',
+    # use a palette generated from the preview itself
+    'gif': ',split[a][b];[a]palettegen[palette];[b][palette]paletteuse[preview]',
+}
+PREVIEW_PARAMS = {
+    'mp4': [
+        '-codec:v',
+        'libx264',
+        '-preset',
+        'veryfast',
+        '-crf',
+        '30',
+        '-pix_fmt',
+        'yuv420p',
+        '-movflags',
+        '+faststart',
+    ],
+    'webp': ['-codec:v', 'libwebp', '-loop', '0', '-quality', '50'],
+    'gif': ['-loop', '0'],
+}
+
+
+def _get_option(params: List[str], options: Iterable[str]) -> Optional[str]:
+    """
+    Return the value of the last given option within `params`.
+    """
+    value = None
+    for option, option_value in zip(params, params[1:]):
+        if option in options:
+            value = option_value
+    return value
+
+
+def _parse_number(value: str, type_: Callable) -> Optional[float]:
+    """
+    Convert a stat value reported by ffmpeg, which may be `N/A`.
+    """
+    try:
+        return type_(value)
+    except ValueError:
+        return None
+
+
+def _format_command(args: Iterable) -> str:
+    """
+    Return a command for error messages, without the query strings of urls.
+    """
+    return redact_urls(' '.join(map(str, args)))
+
+
+def _redact_lines(lines: Iterable[str]) -> List[str]:
+    return [redact_urls(line) for line in lines]
+
+
+class Watchdog(threading.Thread):
+    """
+    Terminate a process once it has been running for `timeout` seconds.
+
+    Time, in which the process is paused (e.g. suspended using `SIGSTOP`),
+    is not counted.
+    """
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        timeout: float,
+        terminate: Callable[[subprocess.Popen], None],
+    ) -> None:
+        super().__init__(daemon=True)
+        self.process = process
+        self.terminate = terminate
+        self.remaining = timeout
+        self.condition = threading.Condition()
+        self.paused = False
+        self.stopped = False
+        self.expired = False
+
+    def run(self) -> None:
+        with self.condition:
+            while not self.stopped:
+                if self.paused:
+                    self.condition.wait()
+                    continue
+
+                start_time = time.monotonic()
+                self.condition.wait(self.remaining)
+                self.remaining -= time.monotonic() - start_time
+                if self.remaining <= 0 and not self.stopped:
+                    self.expired = True
+                    break
+
+        if self.expired:
+            self.terminate(self.process)
+
+    def _notify(self, **state: bool) -> None:
+        with self.condition:
+            for name, value in state.items():
+                setattr(self, name, value)
+            self.condition.notify()
+
+    def pause(self) -> None:
+        self._notify(paused=True)
+
+    def resume(self) -> None:
+        self._notify(paused=False)
+
+    def stop(self) -> None:
+        self._notify(stopped=True)
+
+
+class ProcessWatcher(threading.Thread):
+    """
+    Apply the state of an `EncodingControl` to a running ffmpeg process.
+
+    Suspended processes are stopped using `SIGSTOP` and continued using
+    `SIGCONT`, cancelled processes are terminated using `terminate`.
+    The `watchdog` is paused while the process is suspended.
+    """
+
+    def __init__(
+        self,
+        process: subprocess.Popen,
+        control: EncodingControl,
+        terminate: Callable[[subprocess.Popen], None],
+        watchdog: Optional[Watchdog] = None,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.process = process
+        self.control = control
+        self.terminate = terminate
+        self.watchdog = watchdog
+        self.stopped = threading.Event()
+        self.suspended = False
+        self.cancelled = False
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.control.interval):
+            state = None
+            with best_effort('Cannot retrieve the encoding state.'):
+                state = self.control.get_state()
+            if state is None:
+                continue
+
+            if state == ControlState.CANCELLED:
+                self.cancelled = True
+                self.terminate(self.process)
+                return
+
+            suspended = state == ControlState.SUSPENDED
+            if suspended != self.suspended and self.process.poll() is None:
+                if suspended:
+                    self._suspend()
+                else:
+                    self._continue()
+                self.suspended = suspended
+
+    def _suspend(self) -> None:
+        if self.watchdog:
+            self.watchdog.pause()
+        self.process.send_signal(signal.SIGSTOP)
+
+    def _continue(self) -> None:
+        self.process.send_signal(signal.SIGCONT)
+        if self.watchdog:
+            self.watchdog.resume()
+
+    def stop(self) -> None:
+        self.stopped.set()
 
 
 class FFmpegBackend(BaseEncodingBackend):
     name = 'FFmpeg'
+    # ffprobe is only used to retrieve information about videos
+    ffprobe_required = True
+
+    def __init__(
+        self,
+        niceness: Optional[int] = None,
+        cpu_affinity: Optional[Iterable[int]] = None,
+        memory_limit: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        # limits applied to each spawned ffmpeg process
+        self.niceness = niceness
+        self.cpu_affinity = set(cpu_affinity) if cpu_affinity else None
+        self.memory_limit = memory_limit  # bytes
+        self.cpu_time_limit = cpu_time_limit  # seconds
+        self.timeout = timeout  # seconds
+        self.limit_command = self._get_limit_command()
 
-    def __init__(self) -> None:
         self.params: List[str] = [
-            '-threads',
-            str(settings.VIDEO_ENCODING_THREADS),
             '-y',  # overwrite temporary created file
             '-strict',
             '-2',  # support aac codec (which is experimental)
@@ -44,7 +274,7 @@ class FFmpegBackend(BaseEncodingBackend):
                 "ffmpeg binary not found: {}".format(self.ffmpeg_path or '')
             )
 
-        if not self.ffprobe_path:
+        if not self.ffprobe_path and self.ffprobe_required:
             raise exceptions.FFmpegError(
                 "ffprobe binary not found: {}".format(self.ffmpeg_path or '')
             )
@@ -53,7 +283,7 @@ class FFmpegBackend(BaseEncodingBackend):
     def check(cls) -> List[checks.Error]:
         errors = super(FFmpegBackend, cls).check()
         try:
-            FFmpegBackend()
+            cls()
         except exceptions.FFmpegError as e:
             errors.append(
                 checks.Error(
@@ -65,70 +295,330 @@ class FFmpegBackend(BaseEncodingBackend):
             )
         return errors
 
-    def _spawn(self, cmd: List[str]) -> subprocess.Popen:
+    def _get_tool(self, name: str, option: str) -> str:
+        path = which(name)
+        if not path:
+            raise exceptions.FFmpegError(
+                "{} binary not found, which is required by {}".format(name, option)
+            )
+        return path
+
+    def _get_limit_command(self) -> List[str]:
+        """
+        Return the command prefix, which applies the configured limits to ffmpeg.
+
+        The limits are not applied within the forked child (`preexec_fn`),
+        which is unsafe while other threads are running. Each tool executes
+        the next one, so the spawned process becomes ffmpeg in the end.
+        """
+        cmd: List[str] = []
+        rlimits = []
+        if self.memory_limit:
+            rlimits.append('--as={:d}'.format(self.memory_limit))
+        if self.cpu_time_limit:
+            rlimits.append('--cpu={:d}'.format(self.cpu_time_limit))
+        if rlimits:
+            cmd.extend(
+                [self._get_tool('prlimit', 'memory_limit and cpu_time_limit'), *rlimits]
+            )
+        if self.niceness:
+            cmd.extend([self._get_tool('nice', 'niceness'), '-n', str(self.niceness)])
+        if self.cpu_affinity:
+            cpus = ','.join(str(cpu) for cpu in sorted(self.cpu_affinity))
+            cmd.extend([self._get_tool('taskset', 'cpu_affinity'), '-c', cpus])
+        return cmd
+
+    def _spawn(self, cmd: List[str], stdout: Optional[int] = None) -> subprocess.Popen:
         try:
             return subprocess.Popen(
-                cmd,
+                [*self.limit_command, *cmd],
                 shell=False,
+                stdout=stdout,
                 stderr=subprocess.PIPE,  # ffmpeg reports live stats to stderr
                 universal_newlines=False,  # stderr will return bytes
             )
         except OSError as e:
             raise exceptions.FFmpegError('Error while running ffmpeg binary') from e
 
+    def _terminate(self, process: subprocess.Popen) -> None:
+        """
+        Stop the given process, kill it if it does not terminate in time.
+        """
+        if process.poll() is not None:
+            return
+
+        process.terminate()
+        # suspended processes only handle the signal once they are continued
+        process.send_signal(signal.SIGCONT)
+        try:
+            process.wait(TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def _start_watchdog(self, process: subprocess.Popen) -> Optional[Watchdog]:
+        """
+        Terminate the process once the configured timeout is exceeded.
+        """
+        if not self.timeout:
+            return None
+
+        watchdog = Watchdog(process, self.timeout, self._terminate)
+        watchdog.start()
+        return watchdog
+
+    def _start_watcher(
+        self,
+        process: subprocess.Popen,
+        control: Optional[EncodingControl],
+        watchdog: Optional[Watchdog] = None,
+    ) -> Optional[ProcessWatcher]:
+        """
+        Suspend, continue or terminate the process as requested by `control`.
+        """
+        if control is None:
+            return None
+
+        watcher = ProcessWatcher(process, control, self._terminate, watchdog)
+        watcher.start()
+        return watcher
+
+    def _check_output(self, cmd: List[str], message: str) -> bytes:
+        """
+        Run ffmpeg to completion, subject to the configured limits and timeout,
+        and return its output. `message` describes the failure.
+        """
+        process = self._spawn(cmd, stdout=subprocess.PIPE)
+        watchdog = self._start_watchdog(process)
+        try:
+            stdout, stderr_data = process.communicate()
+        finally:
+            if watchdog:
+                watchdog.stop()
+            self._terminate(process)
+
+        if process.returncode == 0:
+            return stdout
+
+        stderr = stderr_data.decode('utf-8', errors='replace').splitlines()
+        stderr = _redact_lines(stderr[-STDERR_TAIL_LENGTH:])
+        if watchdog is not None and watchdog.expired:
+            raise exceptions.FFmpegTimeoutError(
+                '{} exceeded the timeout of {}s'.format(message, self.timeout),
+                stderr=stderr,
+            )
+        raise exceptions.FFmpegError(message, stderr=stderr)
+
+    def get_threads(self, params: List[str]) -> int:
+        """
+        Return the number of threads used to encode with the given `params`.
+
+        If `VIDEO_ENCODING_THREADS` is set to `'auto'`, the available cpus
+        are shared between all concurrent encodings. The number of threads
+        is limited depending on how well the video codec scales.
+        """
+        threads = settings.VIDEO_ENCODING_THREADS
+        if threads != 'auto':
+            return int(threads)
+
+        if self.cpu_affinity:
+            cpus = len(self.cpu_affinity)
+        else:
+            cpus = get_available_cpus()
+        threads = cpus // max(settings.VIDEO_ENCODING_CONCURRENCY, 1)
+
+        codec = _get_option(params, VIDEO_CODEC_OPTIONS)
+        max_threads = CODEC_MAX_THREADS.get(codec, DEFAULT_MAX_THREADS)
+        return max(min(threads, max_threads), 1)
+
     def encode(
-        self, source_path: str, target_path: str, params: List[str]
-    ) -> Generator[float, None, None]:
+        self,
+        source_path: str,
+        target_path: str,
+        params: List[str],
+        audio_path: Optional[str] = None,
+        control: Optional[EncodingControl] = None,
+    ) -> Generator[EncodingProgress, None, None]:
         """
-        Encode a video.
+        Encode a video and continuously yield the progress.
 
-        All encoder specific options are passed in using `params`.
+        All encoder specific options are passed in using `params`. If
+        `audio_path` is given, its first audio stream is copied into the
+        encoding instead of encoding the audio of the source. The encoding
+        is suspended or cancelled as requested by `control`.
         """
         total_time = self.get_media_info(source_path)['duration']
 
-        cmd = [self.ffmpeg_path, '-i', source_path, *self.params, *params, target_path]
+        cmd = self._get_command(source_path, params, target_path, audio_path)
+        yield from self._run(cmd, total_time, target_path, control)
+
+        yield EncodingProgress(percent=100, time=total_time, eta=0)
+
+    def analyse(self, source_path: str, passlogfile: str, params: List[str]) -> None:
+        """
+        Run the first pass of a two-pass encoding.
+
+        The statistics are written to `passlogfile`, which can be used
+        by the second pass of all encodings sharing the same `params`.
+        """
+        params = [
+            *params,
+            '-pass',
+            '1',
+            '-passlogfile',
+            passlogfile,
+            '-an',
+            '-f',
+            'null',
+        ]
+        cmd = self._get_command(source_path, params, os.devnull)
+        for _ in self._run(cmd, total_time=0, target_path=None):
+            pass
+
+    def _get_command(
+        self,
+        source_path: str,
+        params: List[str],
+        target_path: str,
+        audio_path: Optional[str] = None,
+    ) -> List[str]:
+        inputs = ['-i', source_path]
+        if audio_path:
+            inputs.extend(['-i', audio_path])
+            params = ['-map', '0:v:0', '-map', '1:a:0', *params, '-codec:a', 'copy']
+
+        return [
+            self.ffmpeg_path,
+            *inputs,
+            '-threads',
+            str(self.get_threads(params)),
+            *self.params,
+            *params,
+            target_path,
+        ]
+
+    def _run(
+        self,
+        cmd: List[str],
+        total_time: float,
+        target_path: Optional[str],
+        control: Optional[EncodingControl] = None,
+    ) -> Generator[EncodingProgress, None, None]:
         process = self._spawn(cmd)
+        watchdog = self._start_watchdog(process)
+        watcher = self._start_watcher(process, control, watchdog)
+        try:
+            yield from self._read_progress(process, total_time, target_path, watchdog)
+        except exceptions.FFmpegError as e:
+            if watcher and watcher.cancelled:
+                raise exceptions.EncodingCancelledError(
+                    "`{}` has been cancelled".format(_format_command(process.args))
+                ) from e
+            raise
+        finally:
+            if watchdog:
+                watchdog.stop()
+            if watcher:
+                watcher.stop()
+            # make sure ffmpeg is not left running, e.g. if the encoding is aborted
+            self._terminate(process)
+
+    def _read_progress(
+        self,
+        process: subprocess.Popen,
+        total_time: float,
+        target_path: Optional[str],
+        watchdog: Optional[Watchdog] = None,
+    ) -> Generator[EncodingProgress, None, None]:
         # ffmpeg write the progress to stderr
         # each line is either terminated by \n or \r
-        reader = io.TextIOWrapper(process.stderr, newline=None)  # type: ignore
+        reader = io.TextIOWrapper(
+            process.stderr, newline=None, errors='replace'  # type: ignore
+        )
+        # keep the last lines for error reports
+        stderr: Deque[str] = collections.deque(maxlen=STDERR_TAIL_LENGTH)
 
         # update progress
-        while process.poll() is None:  # is process terminated yet?
-            line = reader.readline()
+        for line in reader:
+            stderr.append(line.rstrip())
 
-            try:
-                # format 00:00:00.00
-                time_str = RE_TIMECODE.findall(line)[0]
-            except IndexError:
+            progress = self._parse_progress(line, total_time)
+            if progress is None:
                 continue
 
-            # convert time to seconds
-            time: float = 0
-            for part in time_str.split(':'):
-                time = 60 * time + float(part)
-
-            percent = round(time / total_time, 2)
-            logger.debug('yield {}%'.format(percent))
-            yield percent
-
-        if os.path.getsize(target_path) == 0:
-            raise exceptions.FFmpegError("File size of generated file is 0")
+            logger.debug('yield {}%'.format(progress.percent))
+            yield progress
+        process.wait()
+
+        timed_out = watchdog is not None and watchdog.expired
+        if process.returncode != 0 and timed_out:
+            raise exceptions.FFmpegTimeoutError(
+                "`{}` exceeded the timeout of {}s".format(
+                    _format_command(process.args), self.timeout
+                ),
+                stderr=_redact_lines(stderr),
+            )
 
         if process.returncode != 0:
             raise exceptions.FFmpegError(
                 "`{}` exited with code {:d}".format(
-                    ' '.join(map(str, process.args)), process.returncode
-                )
+                    _format_command(process.args), process.returncode
+                ),
+                stderr=_redact_lines(stderr),
             )
 
-        yield 100
+        if target_path and os.path.getsize(target_path) == 0:
+            raise exceptions.FFmpegError(
+                "File size of generated file is 0", stderr=_redact_lines(stderr)
+            )
+
+    def _parse_progress(
+        self, line: str, total_time: float
+    ) -> Optional[EncodingProgress]:
+        """
+        Parse a line of live stats reported by ffmpeg, e.g.
+
+        frame=  48 fps=0.0 q=28.0 size=0kB time=00:00:01.50 bitrate=0.3kbits/s speed=2.97x
+        """
+        stats = dict(RE_STATS.findall(line))
+        try:
+            # format 00:00:00.00
+            time_str = stats['time']
+            # convert time to seconds
+            time: float = 0
+            for part in time_str.split(':'):
+                time = 60 * time + float(part)
+        except (KeyError, ValueError):
+            return None
+
+        frame = _parse_number(stats.get('frame', ''), int)
+        fps = _parse_number(stats.get('fps', ''), float)
+        bitrate = _parse_number(stats.get('bitrate', '').replace('kbits/s', ''), float)
+        speed = _parse_number(stats.get('speed', '').rstrip('x'), float)
+
+        eta = None
+        if speed:
+            eta = max(total_time - time, 0) / speed
+
+        percent = round(100 * time / total_time, 2) if total_time else 0
+        return EncodingProgress(
+            percent=max(min(percent, 100), 0),
+            time=time,
+            frame=frame,  # type: ignore
+            fps=fps,
+            bitrate=bitrate,
+            speed=speed,
+            eta=eta,
+        )
 
     def _parse_media_info(self, data: bytes) -> Dict:
         media_info = json.loads(data)
+        # cover art of audio files is reported as video stream
         media_info['video'] = [
             stream
             for stream in media_info['streams']
             if stream['codec_type'] == 'video'
+            and not stream.get('disposition', {}).get('attached_pic')
         ]
         media_info['audio'] = [
             stream
@@ -146,19 +636,26 @@ class FFmpegBackend(BaseEncodingBackend):
     def get_media_info(self, video_path: str) -> Dict[str, Union[int, float]]:
         """
         Return information about the given video.
+
+        `video` and `audio` tell whether the file contains video and audio
+        streams, the width and height of audio files are `0`.
         """
         cmd = [self.ffprobe_path, '-i', video_path]
-        cmd.extend(['-hide_banner',  '-loglevel', 'warning'])
+        cmd.extend(['-hide_banner', '-loglevel', 'warning'])
         cmd.extend(['-print_format', 'json'])
         cmd.extend(['-show_format', '-show_streams'])
 
         stdout = subprocess.check_output(cmd)
         media_info = self._parse_media_info(stdout)
 
+        # the duration and size of some formats (e.g. animated webp) are unknown
+        video_stream = media_info['video'][0] if media_info['video'] else {}
         return {
-            'duration': float(media_info['format']['duration']),
-            'width': int(media_info['video'][0]['width']),
-            'height': int(media_info['video'][0]['height']),
+            'duration': float(media_info['format'].get('duration', 0)),
+            'width': int(video_stream.get('width', 0)),
+            'height': int(video_stream.get('height', 0)),
+            'video': bool(media_info['video']),
+            'audio': bool(media_info['audio']),
         }
 
     def get_thumbnail(self, video_path: str, at_time: float = 0.5) -> str:
@@ -170,17 +667,21 @@ class FFmpegBackend(BaseEncodingBackend):
         """
         filename = os.path.basename(video_path)
         filename, __ = os.path.splitext(filename)
-        _, image_path = tempfile.mkstemp(suffix='_{}.jpg'.format(filename))
 
         video_duration = self.get_media_info(video_path)['duration']
         if at_time > video_duration:
             raise exceptions.InvalidTimeError()
         thumbnail_time = at_time
 
+        image_path = scratch.mkstemp(suffix='_{}.jpg'.format(filename))
         cmd = [self.ffmpeg_path, '-i', video_path, '-vframes', '1']
         cmd.extend(['-ss', str(thumbnail_time), '-y', image_path])
 
-        subprocess.check_call(cmd)
+        try:
+            self._check_output(cmd, 'Error while extracting thumbnail')
+        except BaseException:
+            os.unlink(image_path)
+            raise
 
         if not os.path.getsize(image_path):
             # we somehow failed to generate thumbnail
@@ -188,3 +689,184 @@ class FFmpegBackend(BaseEncodingBackend):
             raise exceptions.InvalidTimeError()
 
         return image_path
+
+    def get_best_thumbnails(
+        self,
+        video_path: str,
+        count: int = 3,
+        samples: int = 100,
+        min_distance: Optional[float] = None,
+    ) -> List[ThumbnailCandidate]:
+        """
+        Select the `count` best thumbnails of the video, best first.
+
+        `samples` low resolution frames, evenly distributed over the video, are
+        decoded using a single ffmpeg process and scored based on brightness,
+        contrast, sharpness and the distance to scene changes (see
+        `video_encoding.thumbnails`). Only the selected frames, which are at
+        least `min_distance` seconds apart (default: a `2 * count`-th of the
+        duration), are extracted in full resolution.
+        """
+        video_duration = self.get_media_info(video_path)['duration']
+        if video_duration <= 0:
+            raise exceptions.InvalidTimeError()
+        if min_distance is None:
+            min_distance = video_duration / (2 * count)
+
+        rate = samples / video_duration
+        frames = self._get_sample_frames(video_path, rate)
+        scores = thumbnails.score_frames(frames)
+
+        candidates = []
+        for index in thumbnails.select_frames(
+            scores, count, max(int(min_distance * rate), 1)
+        ):
+            at_time = index / rate
+            try:
+                image_path = self.get_thumbnail(video_path, at_time=at_time)
+            except exceptions.InvalidTimeError:
+                continue
+            candidates.append(
+                ThumbnailCandidate(image_path, at_time, float(scores[index]))
+            )
+        return candidates
+
+    def _get_sample_frames(self, video_path: str, rate: float):
+        """
+        Decode low resolution grayscale frames at the given `rate` (per second).
+        """
+        video_filter = 'fps={},scale={:d}:{:d},format=gray'.format(
+            rate, thumbnails.SAMPLE_WIDTH, thumbnails.SAMPLE_HEIGHT
+        )
+        cmd = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error']
+        cmd.extend(['-i', video_path, '-an', '-vf', video_filter])
+        cmd.extend(['-f', 'rawvideo', '-pix_fmt', 'gray', 'pipe:1'])
+
+        stdout = self._check_output(cmd, 'Error while sampling frames')
+        return thumbnails.frames_from_bytes(stdout)
+
+    def _get_segment_inputs(
+        self,
+        video_path: str,
+        video_duration: float,
+        segments: int,
+        segment_duration: float,
+        segment_filter: str,
+        output_filter: str,
+    ) -> List[str]:
+        """
+        Return the arguments to read `segments` evenly distributed clips of
+        the video, which are filtered and concatenated using `output_filter`.
+
+        Each clip is seeked on the input side, therefore only the selected
+        parts of the video are decoded.
+        """
+        args = []
+        filters = []
+        for index in range(segments):
+            # seek the input to the center of each part of the video
+            start_time = video_duration * (index + 0.5) / segments
+            start_time = max(start_time - segment_duration / 2, 0)
+            args.extend(['-ss', str(start_time), '-t', str(segment_duration)])
+            args.extend(['-i', video_path])
+            filters.append(
+                '[{:d}:v]{},setpts=PTS-STARTPTS[v{:d}]'.format(
+                    index, segment_filter, index
+                )
+            )
+        filters.append(
+            '{}concat=n={:d}:v=1:a=0{}'.format(
+                ''.join('[v{:d}]'.format(index) for index in range(segments)),
+                segments,
+                output_filter,
+            )
+        )
+        return [*args, '-filter_complex', ';'.join(filters)]
+
+    def get_complexity(
+        self, video_path: str, segments: int = 3, segment_duration: float = 2.0
+    ) -> float:
+        """
+        Estimate the complexity of the content of the video.
+
+        Encodes `segments` evenly distributed clips at low resolution using a
+        fast constant quality encoding and returns the resulting bitrate
+        (bit/s). Static content (e.g. slides) results in low bitrates.
+        """
+        video_duration = self.get_media_info(video_path)['duration']
+        segment_duration = min(segment_duration, video_duration / segments)
+        if segment_duration <= 0:
+            raise exceptions.InvalidTimeError()
+
+        cmd = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error']
+        cmd.extend(
+            self._get_segment_inputs(
+                video_path,
+                video_duration,
+                segments,
+                segment_duration,
+                segment_filter=COMPLEXITY_FILTER,
+                output_filter='[probe]',
+            )
+        )
+        cmd.extend(['-map', '[probe]', *COMPLEXITY_PARAMS, 'pipe:1'])
+
+        stdout = self._check_output(cmd, 'Error while analysing complexity')
+        return len(stdout) * 8 / (segments * segment_duration)
+
+    def get_preview(
+        self,
+        video_path: str,
+        extension: str = 'webp',
+        segments: int = 4,
+        segment_duration: float = 1.0,
+        width: int = 320,
+        fps: int = 10,
+    ) -> str:
+        """
+        Create a short preview of the video and return its path.
+
+        The preview consists of `segments` evenly distributed clips of the video,
+        which are extracted using a single ffmpeg process. Supported extensions
+        are `mp4`, `webp` and `gif` (the latter two are animated images).
+
+        The clips are shortened to fit into videos shorter than `segments *
+        segment_duration`. An `InvalidTimeError` is raised for videos without
+        a duration.
+        """
+        if extension not in PREVIEW_PARAMS:
+            raise ValueError("Unsupported preview format '{}'.".format(extension))
+
+        filename = os.path.basename(video_path)
+        filename, __ = os.path.splitext(filename)
+        preview_path = scratch.mkstemp(
+            suffix='_{}_preview.{}'.format(filename, extension)
+        )
+
+        video_duration = self.get_media_info(video_path)['duration']
+        segment_duration = min(segment_duration, video_duration / segments)
+        if segment_duration <= 0:
+            os.unlink(preview_path)
+            raise exceptions.InvalidTimeError()
+
+        cmd = [self.ffmpeg_path, '-hide_banner', '-loglevel', 'error']
+        cmd.extend(
+            self._get_segment_inputs(
+                video_path,
+                video_duration,
+                segments,
+                segment_duration,
+                segment_filter='scale={:d}:-2,fps={:d}'.format(width, fps),
+                output_filter=PREVIEW_FILTERS[extension],
+            )
+        )
+        cmd.extend(['-map', '[preview]'])
+        cmd.extend(['-r', str(fps), *PREVIEW_PARAMS[extension], '-y', preview_path])
+
+        try:
+            self._check_output(cmd, 'Error while creating preview')
+        except BaseException:
+            os.unlink(preview_path)
+            raise
+
+        return preview_path
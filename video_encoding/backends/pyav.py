@@ -0,0 +1,142 @@
+import contextlib
+import os
+from typing import Any, Dict, Generator, List, Union
+
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+
+from .. import exceptions, scratch
+from .ffmpeg import FFmpegBackend
+
+try:
+    import av
+except ImportError:  # pragma: no cover
+    av = None
+
+if av is not None:
+    # renamed in PyAV 14
+    AV_ERROR = getattr(av, 'FFmpegError', None) or getattr(av, 'AVError')
+    # dispositions are not available before PyAV 12
+    ATTACHED_PIC = getattr(getattr(av.stream, 'Disposition', None), 'attached_pic', 0)
+
+
+class PyAVBackend(FFmpegBackend):
+    """
+    Retrieve information about videos and extract thumbnails in-process
+    using PyAV, which avoids spawning `ffprobe` and `ffmpeg` for each call.
+
+    Encodings and previews are still created using `ffmpeg`.
+
+    Requires `av`.
+    """
+
+    ffprobe_required = False
+
+    def __init__(self, **params: Any) -> None:
+        if av is None:
+            raise ImproperlyConfigured(_("The PyAV backend requires 'av'."))
+        super().__init__(**params)
+
+    @classmethod
+    def check(cls) -> List[checks.Error]:
+        if av is None:
+            return [
+                checks.Error(
+                    "PyAV is not installed.",
+                    hint="Please install av.",
+                    obj=cls,
+                    id='video_conversion.E002',
+                )
+            ]
+        return super().check()
+
+    @contextlib.contextmanager
+    def _open(self, video_path: str) -> Generator[Any, None, None]:
+        try:
+            container = av.open(video_path)
+        except AV_ERROR as e:
+            raise exceptions.FFmpegError(
+                "Cannot open video '{}': {}".format(video_path, e)
+            ) from e
+
+        try:
+            yield container
+        except AV_ERROR as e:
+            raise exceptions.FFmpegError(
+                "Cannot read video '{}': {}".format(video_path, e)
+            ) from e
+        finally:
+            container.close()
+
+    def _get_duration(self, container: Any) -> float:
+        if not container.duration:
+            return 0
+        return container.duration / av.time_base
+
+    def _get_video_streams(self, container: Any) -> List[Any]:
+        # cover art of audio files is reported as video stream
+        return [
+            stream
+            for stream in container.streams.video
+            if not getattr(stream, 'disposition', 0) & ATTACHED_PIC
+        ]
+
+    def get_media_info(self, video_path: str) -> Dict[str, Union[int, float]]:
+        """
+        Return information about the given video.
+
+        Only the headers of the container are read.
+        """
+        with self._open(video_path) as container:
+            video_streams = self._get_video_streams(container)
+            media_info = {
+                'duration': self._get_duration(container),
+                'width': 0,
+                'height': 0,
+                'video': bool(video_streams),
+                'audio': bool(container.streams.audio),
+            }
+            if video_streams:
+                codec_context = video_streams[0].codec_context
+                media_info['width'] = codec_context.width
+                media_info['height'] = codec_context.height
+            return media_info
+
+    def get_thumbnail(self, video_path: str, at_time: float = 0.5) -> str:
+        """
+        Extract an image from a video and return its path.
+
+        Seeks to the preceding keyframe and decodes the frames up to the
+        requested time. If the requested thumbnail is not within the duration
+        of the video an `InvalidTimeError` is thrown.
+        """
+        filename = os.path.basename(video_path)
+        filename, __ = os.path.splitext(filename)
+
+        with self._open(video_path) as container:
+            video_streams = self._get_video_streams(container)
+            if at_time > self._get_duration(container) or not video_streams:
+                raise exceptions.InvalidTimeError()
+
+            stream = video_streams[0]
+            start_time = (container.start_time or 0) / av.time_base
+            target_time = start_time + at_time
+
+            # seek to the last keyframe before the requested time
+            container.seek(int(target_time * av.time_base))
+            frame = next(
+                (
+                    frame
+                    for frame in container.decode(stream)
+                    if frame.time is not None and frame.time >= target_time
+                ),
+                None,
+            )
+            if frame is None:
+                raise exceptions.InvalidTimeError()
+
+            image_path = scratch.mkstemp(suffix='_{}.jpg'.format(filename))
+            frame.to_image().save(image_path, format='JPEG')
+
+        return image_path
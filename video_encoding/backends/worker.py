@@ -0,0 +1,245 @@
+import contextlib
+import json
+import socket
+import threading
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
+
+from django.core import checks
+from django.utils.module_loading import import_string
+
+from .. import exceptions
+from ..config import settings
+from ..control import EncodingControl
+from .base import (
+    BaseEncodingBackend,
+    EncodingProgress,
+    ThumbnailCandidate,
+    get_encode_options,
+)
+
+DEFAULT_ENCODE_BACKEND = 'video_encoding.backends.ffmpeg.FFmpegBackend'
+
+
+class WorkerConnection:
+    """
+    Connection to a worker, which exchanges newline delimited json.
+    """
+
+    def __init__(self, socket_path: str, timeout: Optional[float]) -> None:
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        try:
+            self.socket.connect(socket_path)
+        except OSError:
+            self.socket.close()
+            raise
+        self.file = self.socket.makefile('rwb')
+
+    def send(self, data: bytes) -> bytes:
+        self.file.write(data)
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionResetError("Connection closed by worker.")
+        return line
+
+    def close(self) -> None:
+        # closing flushes pending data, which fails on broken connections
+        with contextlib.suppress(OSError):
+            self.file.close()
+        self.socket.close()
+
+
+class ConnectionPool:
+    """
+    Connections to a worker, which are shared by all `WorkerBackend` instances
+    of the process. At most `max_idle` unused connections are kept open.
+    """
+
+    def __init__(
+        self, socket_path: str, timeout: Optional[float], max_idle: int = 8
+    ) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle: List[WorkerConnection] = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self) -> Generator[WorkerConnection, None, None]:
+        """
+        Borrow a connection, which is closed if the block fails.
+        """
+        with self.lock:
+            connection = self.idle.pop() if self.idle else None
+        if connection is None:
+            connection = self._connect()
+
+        try:
+            yield connection
+        except BaseException:
+            connection.close()
+            raise
+
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def close(self) -> None:
+        """
+        Close all unused connections, e.g. of a restarted worker.
+        """
+        with self.lock:
+            connections, self.idle = self.idle, []
+        for connection in connections:
+            connection.close()
+
+    def _connect(self) -> WorkerConnection:
+        try:
+            return WorkerConnection(self.socket_path, self.timeout)
+        except OSError as e:
+            raise exceptions.VideoEncodingError(
+                "Cannot connect to worker at '{}': {}".format(self.socket_path, e)
+            ) from e
+
+
+_pools: Dict[Tuple[str, Optional[float]], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(socket_path: str, timeout: Optional[float]) -> ConnectionPool:
+    with _pools_lock:
+        key = (socket_path, timeout)
+        if key not in _pools:
+            _pools[key] = ConnectionPool(socket_path, timeout)
+        return _pools[key]
+
+
+class WorkerBackend(BaseEncodingBackend):
+    """
+    Delegate probing, thumbnails and previews to a long-lived worker
+    (see management command `run_encoding_worker`) using a unix socket,
+    which avoids spawning processes within the calling process.
+
+    Encodings are run within the calling process using `encode_backend`,
+    all remaining params are passed on to it. Connections to the worker are
+    shared by all instances.
+    """
+
+    name = 'FFmpeg'
+
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        encode_backend: str = DEFAULT_ENCODE_BACKEND,
+        timeout: Optional[float] = 60,
+        **params: Any,
+    ) -> None:
+        from ..worker import get_socket_path
+
+        self.socket_path = socket_path or get_socket_path()
+        self.timeout = timeout
+        self.encode_backend_class = import_string(encode_backend)
+        self.encode_backend_params = params
+        self.name = self.encode_backend_class.name
+
+        self._encode_backend: Optional[BaseEncodingBackend] = None
+
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(self.socket_path, self.timeout)
+
+    @classmethod
+    def check(cls) -> List[checks.Error]:
+        encode_backend = settings.VIDEO_ENCODING_BACKEND_PARAMS.get(
+            'encode_backend', DEFAULT_ENCODE_BACKEND
+        )
+        return import_string(encode_backend).check()
+
+    @property
+    def encode_backend(self) -> BaseEncodingBackend:
+        if self._encode_backend is None:
+            self._encode_backend = self.encode_backend_class(
+                **self.encode_backend_params
+            )
+        return self._encode_backend
+
+    def encode(
+        self,
+        source_path: str,
+        target_path: str,
+        params: List[str],
+        audio_path: Optional[str] = None,
+        control: Optional[EncodingControl] = None,
+    ) -> Generator[EncodingProgress, None, None]:
+        return self.encode_backend.encode(
+            source_path,
+            target_path,
+            params,
+            **get_encode_options(audio_path, control),
+        )
+
+    def analyse(self, source_path: str, passlogfile: str, params: List[str]) -> None:
+        self.encode_backend.analyse(source_path, passlogfile, params)
+
+    def get_complexity(self, video_path: str, **kwargs: Any) -> float:
+        return self.encode_backend.get_complexity(video_path, **kwargs)
+
+    def get_media_info(self, video_path: str) -> Dict[str, Union[int, float]]:
+        return self._request('get_media_info', video_path=video_path)
+
+    def get_thumbnail(self, video_path: str, at_time: float = 0.5) -> str:
+        return self._request('get_thumbnail', video_path=video_path, at_time=at_time)
+
+    def get_best_thumbnails(
+        self, video_path: str, **kwargs: Any
+    ) -> List[ThumbnailCandidate]:
+        candidates = self._request(
+            'get_best_thumbnails', video_path=video_path, **kwargs
+        )
+        return [ThumbnailCandidate(*candidate) for candidate in candidates]
+
+    def get_preview(self, video_path: str, **kwargs: Any) -> str:
+        return self._request('get_preview', video_path=video_path, **kwargs)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def _send(self, data: bytes) -> bytes:
+        with self.pool.connection() as connection:
+            return connection.send(data)
+
+    def _request(self, method: str, **kwargs: Any) -> Any:
+        data = json.dumps({'method': method, 'kwargs': kwargs}).encode('utf-8') + b'\n'
+
+        try:
+            try:
+                line = self._send(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # the connections have been closed, e.g. by a restarted worker
+                self.pool.close()
+                line = self._send(data)
+        except OSError as e:
+            raise exceptions.VideoEncodingError(
+                "Request to worker failed: {}".format(e)
+            ) from e
+
+        response = json.loads(line.decode('utf-8'))
+        if 'error' in response:
+            raise _get_exception_class(response['error'])(response['message'])
+        return response['result']
+
+
+def _get_exception_class(name: str) -> type:
+    if name == 'ValueError':
+        # e.g. invalid arguments
+        return ValueError
+
+    exception_class = getattr(exceptions, name, None)
+    if isinstance(exception_class, type) and issubclass(
+        exception_class, exceptions.VideoEncodingError
+    ):
+        return exception_class
+    return exceptions.VideoEncodingError
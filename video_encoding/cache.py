@@ -0,0 +1,194 @@
+import abc
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import List, Optional, Tuple
+
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from . import scratch
+from .utils import get_instance
+
+# bump to invalidate all cached encodings
+CACHE_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """
+    Return the sha256 hash of the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, mode='rb') as file_handler:
+        for chunk in iter(lambda: file_handler.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BaseEncodeCache(metaclass=abc.ABCMeta):
+    """
+    Stores encoded files by the content of the source and the format.
+
+    `namespace` is part of all keys, e.g. to separate encoders, which produce
+    different results.
+    """
+
+    def __init__(self, namespace: str = '') -> None:
+        self.namespace = namespace
+
+    def get_key(self, source_hash: str, backend_name: str, options: dict) -> str:
+        data = [
+            CACHE_VERSION,
+            self.namespace,
+            source_hash,
+            backend_name,
+            options['extension'],
+            options['params'],
+            options.get('first_pass'),
+            options.get('audio_params'),
+        ]
+        return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+    @abc.abstractmethod
+    def get(self, key: str, target_path: str) -> bool:  # pragma: no cover
+        """
+        Copy the cached file to `target_path` and return whether it was cached.
+        """
+
+    @abc.abstractmethod
+    def put(self, key: str, path: str) -> None:  # pragma: no cover
+        """
+        Store the file at `path`.
+        """
+
+
+class LocalEncodeCache(BaseEncodeCache):
+    """
+    Store encoded files within a local directory.
+
+    If the size of all files exceeds `max_size` (bytes), the least recently
+    used files are evicted.
+    """
+
+    def __init__(
+        self, directory: str, max_size: Optional[int] = None, namespace: str = ''
+    ) -> None:
+        super().__init__(namespace=namespace)
+        self.directory = directory
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str, target_path: str) -> bool:
+        path = self._get_path(key)
+        try:
+            shutil.copyfile(path, target_path)
+            # mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key: str, path: str) -> None:
+        cache_path = self._get_path(key)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+        # copy to a temporary file first, as the cache may be shared
+        temp_path = '{}.{}{}'.format(cache_path, scratch.TEMP_PREFIX, os.getpid())
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, cache_path)
+
+        if self.max_size is not None:
+            self.evict()
+
+    def _get_entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for root, _directories, files in os.walk(self.directory):
+            for name in files:
+                if scratch.TEMP_PREFIX in name:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> None:
+        """
+        Delete the least recently used files until `max_size` is satisfied.
+        """
+        with self.lock:
+            entries = sorted(self._get_entries())
+            size = sum(entry_size for _mtime, entry_size, _path in entries)
+            for _mtime, entry_size, path in entries:
+                if size <= self.max_size:  # type: ignore
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+
+
+class StorageEncodeCache(BaseEncodeCache):
+    """
+    Store encoded files using a django storage, e.g. an S3 bucket shared
+    between environments.
+
+    Files are never evicted, use the lifecycle rules of your object storage.
+    """
+
+    def __init__(
+        self,
+        storage: Optional[str] = None,
+        location: str = 'video_encoding/cache',
+        namespace: str = '',
+    ) -> None:
+        super().__init__(namespace=namespace)
+        self.storage: Storage = import_string(storage)() if storage else default_storage
+        self.location = location
+
+    def _get_name(self, key: str) -> str:
+        return '{}/{}/{}'.format(self.location, key[:2], key)
+
+    def get(self, key: str, target_path: str) -> bool:
+        name = self._get_name(key)
+        if not self.storage.exists(name):
+            return False
+
+        with self.storage.open(name, 'rb') as cached_file, open(
+            target_path, mode='wb'
+        ) as target_file:
+            shutil.copyfileobj(cached_file, target_file)
+        return True
+
+    def put(self, key: str, path: str) -> None:
+        name = self._get_name(key)
+        if self.storage.exists(name):
+            return
+
+        with open(path, mode='rb') as file_handler:
+            self.storage.save(name, File(file_handler))
+
+
+def get_encode_cache() -> Optional[BaseEncodeCache]:
+    from .config import settings
+
+    path = settings.VIDEO_ENCODING_ENCODE_CACHE
+    if not path:
+        return None
+
+    return get_instance(
+        path,
+        settings.VIDEO_ENCODING_ENCODE_CACHE_PARAMS,
+        _("Cannot retrieve encode cache '{}'. Error: '{}'."),
+    )
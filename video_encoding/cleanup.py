@@ -0,0 +1,173 @@
+import datetime
+import os
+import shutil
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.core.files.storage import Storage
+from django.utils import timezone
+
+from .models import Format
+from .scratch import TEMP_PREFIX, get_scratch_dir
+
+# directory of the storage containing all encoded formats (see `upload_format_to`)
+FORMATS_DIRECTORY = 'formats'
+
+
+def get_format_storage() -> Storage:
+    return Format._meta.get_field('file').storage  # type: ignore
+
+
+def _iter_files(storage: Storage, directory: str) -> Iterator[str]:
+    """
+    Recursively yield the names of all files within `directory`.
+    """
+    try:
+        directories, files = storage.listdir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+
+    for name in files:
+        yield '{}/{}'.format(directory, name)
+    for name in directories:
+        yield from _iter_files(storage, '{}/{}'.format(directory, name))
+
+
+def _batch(iterable: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def find_orphaned_files(
+    storage: Optional[Storage] = None,
+    min_age: float = 3600,
+    batch_size: int = 1000,
+) -> Iterator[str]:
+    """
+    Yield all files of formats, which are not referenced by any `Format`.
+
+    The storage is listed lazily and compared against the database in batches.
+    Files modified within the last `min_age` seconds are skipped, as they may
+    belong to a running encoding. Set `min_age` to `0` for storages, which
+    do not support `get_modified_time()`.
+    """
+    if storage is None:
+        storage = get_format_storage()
+    threshold = timezone.now() - datetime.timedelta(seconds=min_age)
+
+    for names in _batch(_iter_files(storage, FORMATS_DIRECTORY), batch_size):
+        referenced = set(
+            Format.objects.filter(file__in=names).values_list('file', flat=True)
+        )
+        for name in names:
+            if name in referenced:
+                continue
+            if min_age and not _is_older(storage, name, threshold):
+                continue
+            yield name
+
+
+def _is_older(storage: Storage, name: str, threshold: datetime.datetime) -> bool:
+    try:
+        return storage.get_modified_time(name) < threshold
+    except NotImplementedError:
+        # the age cannot be determined, keep the file to be on the safe side
+        return False
+
+
+def delete_files(
+    names: Iterable[str], storage: Optional[Storage] = None, batch_size: int = 1000
+) -> int:
+    """
+    Delete the given files in batches and return the number of deleted files.
+
+    Storages may implement `delete_many(names)` to delete a whole batch using a
+    single request (e.g. `DeleteObjects` of S3), otherwise each file is deleted
+    on its own.
+    """
+    if storage is None:
+        storage = get_format_storage()
+    delete_many = getattr(storage, 'delete_many', None)
+
+    count = 0
+    for names in _batch(names, batch_size):
+        if delete_many is not None:
+            delete_many(names)
+        else:
+            for name in names:
+                storage.delete(name)
+        count += len(names)
+    return count
+
+
+def find_stale_temp_files(
+    directory: Optional[str] = None, max_age: float = 86400
+) -> Iterator[str]:
+    """
+    Yield all temporary files and directories created by django-video-encoding,
+    which have not been modified within the last `max_age` seconds, e.g. because
+    the worker has been killed while encoding.
+    """
+    if directory is None:
+        directory = get_scratch_dir()
+    threshold = time.time() - max_age
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.startswith(TEMP_PREFIX):
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < threshold:
+                    yield entry.path
+            except FileNotFoundError:
+                # removed in the meantime
+                continue
+
+
+def delete_temp_files(paths: Iterable[str]) -> int:
+    """
+    Delete the given temporary files and directories.
+    """
+    count = 0
+    for path in paths:
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        except FileNotFoundError:
+            continue
+        count += 1
+    return count
+
+
+def collect_garbage(
+    dry_run: bool = False,
+    min_age: float = 3600,
+    temp_max_age: float = 86400,
+    batch_size: int = 1000,
+) -> Dict[str, int]:
+    """
+    Delete orphaned files of formats and stale temporary files.
+
+    Return the number of (with `dry_run`: deletable) files per kind.
+    """
+    orphaned_files = find_orphaned_files(min_age=min_age, batch_size=batch_size)
+    temp_files = find_stale_temp_files(max_age=temp_max_age)
+
+    if dry_run:
+        return {
+            'orphaned_files': sum(1 for _ in orphaned_files),
+            'temp_files': sum(1 for _ in temp_files),
+        }
+
+    return {
+        'orphaned_files': delete_files(orphaned_files, batch_size=batch_size),
+        'temp_files': delete_temp_files(temp_files),
+    }
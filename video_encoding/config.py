@@ -4,9 +4,37 @@ from django.conf import settings  # NOQA
 
 class VideoEncodingAppConf(AppConf):
     THREADS = 1
+    CONCURRENCY = 1
     PROGRESS_UPDATE = 30
+    PROGRESS_CHANNEL = None
+    PROGRESS_CHANNEL_PARAMS = {}  # type: ignore
+    STREAM_SOURCE = False
+    SCRATCH_DIR = None
+    SCRATCH_MIN_FREE = 0
+    SCRATCH_WAIT = 0
+    WORKER_SOCKET = None
+    WORKER_SOCKET_MODE = 0o600
+    PRIORITIES = {}  # type: ignore
+    TENANT_SHARES = {}  # type: ignore
+    PREVIEWS = []  # type: ignore
+    COMPLEXITY_ANALYSIS = False
+    COMPLEXITY_ANALYSIS_PARAMS = {}  # type: ignore
+    SHARED_AUDIO = False
+    CONTROL_CACHE = None
+    CONTROL_INTERVAL = 1
+    CONTROL_TIMEOUT = 86400
+    LOCK_CACHE = None
+    LOCK_TIMEOUT = 300
+    LOCK_WAIT = 60
+    TRIGGER_ENQUEUE = None
+    TRIGGER_CACHE = 'default'
+    TRIGGER_WINDOW = 600
     BACKEND = 'video_encoding.backends.ffmpeg.FFmpegBackend'
     BACKEND_PARAMS = {}  # type: ignore
+    METRICS_SINK = None
+    METRICS_SINK_PARAMS = {}  # type: ignore
+    ENCODE_CACHE = None
+    ENCODE_CACHE_PARAMS = {}  # type: ignore
     FORMATS = {
         'FFmpeg': [
             {
@@ -29,13 +57,10 @@ class VideoEncodingAppConf(AppConf):
                     '10',
                     '-qmax',
                     '42',
-                    '-codec:a',
-                    'libvorbis',
-                    '-b:a',
-                    '128k',
                     '-f',
                     'webm',
                 ],
+                'audio_params': ['-codec:a', 'libvorbis', '-b:a', '128k'],
             },
             {
                 'name': 'webm_hd',
@@ -55,13 +80,10 @@ class VideoEncodingAppConf(AppConf):
                     '11',
                     '-qmax',
                     '51',
-                    '-acodec',
-                    'libvorbis',
-                    '-b:a',
-                    '128k',
                     '-f',
                     'webm',
                 ],
+                'audio_params': ['-codec:a', 'libvorbis', '-b:a', '128k'],
             },
             {
                 'name': 'mp4_sd',
@@ -81,13 +103,8 @@ class VideoEncodingAppConf(AppConf):
                     '2000k',
                     '-vf',
                     'scale=-2:480',  # http://superuser.com/a/776254
-                    '-codec:a',
-                    'aac',
-                    '-b:a',
-                    '128k',
-                    '-strict',
-                    '-2',
                 ],
+                'audio_params': ['-codec:a', 'aac', '-b:a', '128k', '-strict', '-2'],
             },
             {
                 'name': 'mp4_hd',
@@ -107,13 +124,8 @@ class VideoEncodingAppConf(AppConf):
                     '6000k',
                     '-vf',
                     'scale=-2:720',
-                    '-codec:a',
-                    'aac',
-                    '-b:a',
-                    '128k',
-                    '-strict',
-                    '-2',
                 ],
+                'audio_params': ['-codec:a', 'aac', '-b:a', '128k', '-strict', '-2'],
             },
         ]
     }
@@ -0,0 +1,199 @@
+import contextlib
+import enum
+import time
+from typing import TYPE_CHECKING, Generator, List, Optional
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from .config import settings
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .locks import BaseLock
+
+# value of suspend flags set by `preempt`, other suspensions are kept
+PREEMPTED = 'preempted'
+
+
+class ControlState(enum.Enum):
+    RUNNING = 'running'
+    SUSPENDED = 'suspended'
+    CANCELLED = 'cancelled'
+
+
+def _get_cache():
+    if not settings.VIDEO_ENCODING_CONTROL_CACHE:
+        raise ImproperlyConfigured(
+            _("Controlling encodings requires 'VIDEO_ENCODING_CONTROL_CACHE'.")
+        )
+    return caches[settings.VIDEO_ENCODING_CONTROL_CACHE]
+
+
+def _get_key(action: str, obj: models.Model) -> str:
+    """
+    Return the key of a flag of a format or of all formats of an instance.
+    """
+    from .models import Format
+
+    if isinstance(obj, Format):
+        return 'video_encoding:{}:format:{}'.format(action, obj.pk)
+    return 'video_encoding:{}:{}:{}'.format(action, obj._meta.label_lower, obj.pk)
+
+
+def _get_instance_key(action: str, video_format: models.Model) -> str:
+    content_type = video_format.content_type  # type: ignore
+    return 'video_encoding:{}:{}.{}:{}'.format(
+        action, content_type.app_label, content_type.model, video_format.object_id
+    )
+
+
+def cancel(obj: models.Model) -> None:
+    """
+    Cancel the running encoding of a `Format` or all running encodings of
+    the videos of an instance.
+
+    Only encodings, which have been started before, are cancelled.
+    """
+    _get_cache().set(
+        _get_key('cancel', obj), time.time(), settings.VIDEO_ENCODING_CONTROL_TIMEOUT
+    )
+
+
+def suspend(obj: models.Model) -> None:
+    """
+    Suspend the encoding of a `Format` or all encodings of the videos of
+    an instance until they are resumed.
+    """
+    _get_cache().set(
+        _get_key('suspend', obj), True, settings.VIDEO_ENCODING_CONTROL_TIMEOUT
+    )
+
+
+def resume(obj: models.Model) -> None:
+    """
+    Resume suspended encodings.
+    """
+    _get_cache().delete(_get_key('suspend', obj))
+
+
+def preempt(priority: int) -> List[models.Model]:
+    """
+    Suspend all formats in progress of models with a lower priority than
+    `priority` (see `VIDEO_ENCODING_PRIORITIES`).
+
+    The suspended formats are returned and have to be resumed by the caller
+    using `resume_preempted`. Formats, which have already been suspended, are
+    skipped.
+    """
+    from .models import Format
+
+    priorities = {
+        key.lower(): value for key, value in settings.VIDEO_ENCODING_PRIORITIES.items()
+    }
+    formats = []
+    for video_format in Format.objects.in_progress().select_related('content_type'):
+        label = '{0.app_label}.{0.model}'.format(video_format.content_type)
+        if priorities.get(label, 0) < priority and _get_cache().add(
+            _get_key('suspend', video_format),
+            PREEMPTED,
+            settings.VIDEO_ENCODING_CONTROL_TIMEOUT,
+        ):
+            formats.append(video_format)
+    return formats
+
+
+def resume_preempted(video_format: models.Model) -> None:
+    """
+    Resume a format suspended by `preempt`, unless it has been suspended
+    explicitly in the meantime.
+    """
+    cache = _get_cache()
+    key = _get_key('suspend', video_format)
+    if cache.get(key) == PREEMPTED:
+        cache.delete(key)
+
+
+@contextlib.contextmanager
+def preempting(priority: int) -> Generator[None, None, None]:
+    """
+    Suspend encodings with a lower priority while the block is executed.
+    """
+    formats = preempt(priority)
+    try:
+        yield
+    finally:
+        for video_format in formats:
+            resume_preempted(video_format)
+
+
+class EncodingControl:
+    """
+    Cancellation and suspension of the encoding of a format, which has been
+    started at `started_at`. The encoding is stopped as well once its `lease`
+    has been lost (see `locks.lease`), which is reported by `lease_lost`.
+
+    The state is polled by the encoding backend every `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        video_format: models.Model,
+        started_at: float,
+        interval: float = 1,
+        lease: Optional['BaseLock'] = None,
+    ) -> None:
+        self.started_at = started_at
+        self.interval = interval
+        self.lease = lease
+        self.keys = {
+            action: (
+                _get_key(action, video_format),
+                _get_instance_key(action, video_format),
+            )
+            for action in ('cancel', 'suspend')
+        }
+
+    @property
+    def lease_lost(self) -> bool:
+        return self.lease is not None and self.lease.lost.is_set()
+
+    def get_state(self) -> ControlState:
+        if self.lease_lost:
+            # another worker may convert the format by now
+            return ControlState.CANCELLED
+        if not settings.VIDEO_ENCODING_CONTROL_CACHE:
+            return ControlState.RUNNING
+
+        flags = _get_cache().get_many([*self.keys['cancel'], *self.keys['suspend']])
+        cancelled_at = max(
+            (flags[key] for key in self.keys['cancel'] if key in flags), default=None
+        )
+        if cancelled_at is not None and cancelled_at >= self.started_at:
+            return ControlState.CANCELLED
+        if any(key in flags for key in self.keys['suspend']):
+            return ControlState.SUSPENDED
+        return ControlState.RUNNING
+
+
+def get_control(
+    video_format: models.Model,
+    started_at: float,
+    lease: Optional['BaseLock'] = None,
+) -> Optional[EncodingControl]:
+    """
+    Return the control of the encoding of a format, if enabled using
+    `VIDEO_ENCODING_CONTROL_CACHE` or if the `lease` of the format may expire.
+    """
+    if lease is not None and not lease.timeout:
+        # e.g. held within the current process
+        lease = None
+    if not settings.VIDEO_ENCODING_CONTROL_CACHE and lease is None:
+        return None
+    return EncodingControl(
+        video_format,
+        started_at,
+        interval=settings.VIDEO_ENCODING_CONTROL_INTERVAL,
+        lease=lease,
+    )
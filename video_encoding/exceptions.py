@@ -3,10 +3,28 @@ class VideoEncodingError(Exception):
 
 
 class FFmpegError(VideoEncodingError):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, stderr=None, **kwargs):
         self.msg = args[0]
+        self.stderr = stderr or []  # last lines written to stderr by ffmpeg
         super(VideoEncodingError, self).__init__(*args, **kwargs)
 
+    def __str__(self):
+        if not self.stderr:
+            return super().__str__()
+        return '{}\n{}'.format(super().__str__(), '\n'.join(self.stderr))
+
+
+class FFmpegTimeoutError(FFmpegError):
+    pass
+
+
+class EncodingCancelledError(VideoEncodingError):
+    pass
+
 
 class InvalidTimeError(VideoEncodingError):
     pass
+
+
+class InsufficientScratchSpaceError(VideoEncodingError):
+    pass
@@ -1,4 +1,5 @@
 from django.db.models.fields.files import FieldFile, ImageField, ImageFileDescriptor
+from django.db.models.signals import post_init
 from django.utils.translation import gettext as _
 
 from .backends import get_backend_class
@@ -6,7 +7,24 @@ from .files import VideoFile
 
 
 class VideoFileDescriptor(ImageFileDescriptor):
-    pass
+    def __set__(self, instance, value):
+        previous_file = instance.__dict__.get(self.field.attname)
+        info_cache = getattr(previous_file, '_info_cache', None)
+
+        if not (
+            isinstance(value, str)
+            and info_cache is not None
+            and previous_file.name == value
+        ):
+            super().__set__(instance, value)
+            return
+
+        # The previous file has just been saved to the storage (see
+        # `FieldFile.save()`). It has already been probed, so there is
+        # no need to retrieve it from the storage to probe it again.
+        instance.__dict__[self.field.attname] = value
+        getattr(instance, self.field.attname)._info_cache = info_cache
+        self.field.update_dimension_fields(instance, force=True)
 
 
 class VideoFieldFile(VideoFile, FieldFile):
@@ -42,8 +60,10 @@ class VideoField(ImageField):
     def update_dimension_fields(self, instance, force=False, *args, **kwargs):
         _file = getattr(instance, self.attname)
 
-        # we need a real file
-        if not _file._committed:
+        # Don't probe stored files while loading instances from the database,
+        # e.g. listing videos. The information has been stored when the file
+        # has been assigned.
+        if kwargs.get('signal') is post_init and _file._committed:
             return
 
         # write `width` and `height`
@@ -0,0 +1,75 @@
+from typing import List
+
+from .backends.base import BaseEncodingBackend
+from .scratch import parse_bitrate
+
+# bitrate (bit/s) of the complexity probe of content, which the configured
+# bitrates of the formats are meant for
+REFERENCE_BITRATE = 400000
+
+# options of ffmpeg, which are scaled according to the complexity
+BITRATE_OPTIONS = ('-b', '-b:v', '-maxrate', '-maxrate:v', '-bufsize', '-bufsize:v')
+
+
+def get_complexity_factor(
+    probe_bitrate: float,
+    reference_bitrate: float = REFERENCE_BITRATE,
+    min_factor: float = 0.25,
+    max_factor: float = 1.0,
+) -> float:
+    """
+    Return the factor to scale the bitrates of the formats by.
+
+    By default, bitrates are only reduced for content, which is less complex
+    than the reference.
+    """
+    return min(max(probe_bitrate / reference_bitrate, min_factor), max_factor)
+
+
+def scale_params(params: List[str], factor: float) -> List[str]:
+    """
+    Scale all video bitrates within `params` by `factor`.
+    """
+    params = list(params)
+    for index, option in enumerate(params[:-1]):
+        if option not in BITRATE_OPTIONS:
+            continue
+
+        bitrate = parse_bitrate(params[index + 1])
+        if bitrate is not None:
+            params[index + 1] = '{:d}k'.format(max(round(bitrate * factor / 1000), 1))
+    return params
+
+
+def adapt_format(options: dict, factor: float) -> dict:
+    """
+    Return the format with bitrates scaled by `factor`.
+
+    Formats can opt out using `'adapt_bitrate': False`.
+    """
+    if factor == 1 or not options.get('adapt_bitrate', True):
+        return options
+
+    options = {**options, 'params': scale_params(options['params'], factor)}
+    if options.get('first_pass'):
+        options['first_pass'] = scale_params(options['first_pass'], factor)
+    return options
+
+
+def analyse(
+    encoding_backend: BaseEncodingBackend,
+    source_path: str,
+    segments: int = 3,
+    segment_duration: float = 2.0,
+    **kwargs,
+) -> float:
+    """
+    Analyse the complexity of the video and return the factor to scale
+    the bitrates of the formats by.
+
+    Remaining `kwargs` are passed to `get_complexity_factor`.
+    """
+    probe_bitrate = encoding_backend.get_complexity(
+        source_path, segments=segments, segment_duration=segment_duration
+    )
+    return get_complexity_factor(probe_bitrate, **kwargs)
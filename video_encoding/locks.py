@@ -0,0 +1,247 @@
+import abc
+import contextlib
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Generator, Optional, Set
+
+from django.core.cache import caches
+from django.db import models
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# seconds between attempts to acquire a lease, which is held
+POLL_INTERVAL = 1
+
+
+class BaseLock(metaclass=abc.ABCMeta):
+    """
+    Lease on a key, which is held by at most one encoding at a time.
+    """
+
+    # seconds after which the lease expires unless it is refreshed
+    timeout: Optional[int] = None
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # set once the lease has expired while it was held
+        self.lost = threading.Event()
+
+    @abc.abstractmethod
+    def acquire(self) -> bool:  # pragma: no cover
+        """
+        Acquire the lease and return whether it has been acquired.
+        """
+
+    def refresh(self) -> bool:
+        """
+        Extend the lease and return whether it is still held.
+        """
+        return True
+
+    @abc.abstractmethod
+    def release(self) -> None:  # pragma: no cover
+        """
+        Release the lease, if it is still held.
+        """
+
+    @abc.abstractmethod
+    def mark_stale(self) -> None:  # pragma: no cover
+        """
+        Mark the work done by the current holder as stale.
+        """
+
+    @abc.abstractmethod
+    def pop_stale(self) -> bool:  # pragma: no cover
+        """
+        Remove the stale mark and return whether it has been set.
+        """
+
+
+class LocalLock(BaseLock):
+    """
+    Lease held within the current process, used if no lock cache is
+    configured. Encodings of other processes are not excluded.
+    """
+
+    _held: Set[str] = set()
+    _stale: Set[str] = set()
+    _lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.key in self._held:
+                return False
+            self._held.add(self.key)
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._held.discard(self.key)
+
+    def mark_stale(self) -> None:
+        with self._lock:
+            self._stale.add(self.key)
+
+    def pop_stale(self) -> bool:
+        with self._lock:
+            stale = self.key in self._stale
+            self._stale.discard(self.key)
+            return stale
+
+
+class CacheLock(BaseLock):
+    """
+    Lease stored in a django cache shared by all workers.
+
+    The lease expires after `timeout` seconds unless it is refreshed, e.g.
+    if the worker has been killed.
+    """
+
+    def __init__(
+        self, key: str, cache_alias: str = 'default', timeout: int = 300
+    ) -> None:
+        super().__init__(key)
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return self.cache.add(self.key, self.token, self.timeout)
+
+    def refresh(self) -> bool:
+        # not atomic, but the lease is refreshed long before it expires
+        if self.cache.get(self.key) != self.token:
+            return False
+        return self.cache.touch(self.key, self.timeout)
+
+    def release(self) -> None:
+        if self.cache.get(self.key) == self.token:
+            self.cache.delete(self.key)
+
+    @property
+    def stale_key(self) -> str:
+        return '{}:stale'.format(self.key)
+
+    def mark_stale(self) -> None:
+        # kept until the lease is released, which may take longer than `timeout`
+        self.cache.set(self.stale_key, True, None)
+
+    def pop_stale(self) -> bool:
+        # not atomic, at worst the work is done once more
+        stale = bool(self.cache.get(self.stale_key))
+        if stale:
+            self.cache.delete(self.stale_key)
+        return stale
+
+
+def get_lock(key: str) -> BaseLock:
+    """
+    Return the lock of `key` using `VIDEO_ENCODING_LOCK_CACHE`.
+    """
+    if not settings.VIDEO_ENCODING_LOCK_CACHE:
+        return LocalLock(key)
+    return CacheLock(
+        key,
+        cache_alias=settings.VIDEO_ENCODING_LOCK_CACHE,
+        timeout=settings.VIDEO_ENCODING_LOCK_TIMEOUT,
+    )
+
+
+def get_format_key(instance: models.Model, field_name: str, format_name: str) -> str:
+    return 'video_encoding:lock:{}:{}:{}:{}'.format(
+        instance._meta.label_lower, instance.pk, field_name, format_name
+    )
+
+
+class Heartbeat(threading.Thread):
+    """
+    Refresh a lease every `interval` seconds until it is stopped.
+    """
+
+    def __init__(self, lock: BaseLock, interval: float) -> None:
+        super().__init__(daemon=True)
+        self.lock = lock
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            try:
+                held = self.lock.refresh()
+            except Exception:
+                logger.warning('Cannot refresh lease %s.', self.lock.key, exc_info=True)
+                continue
+
+            if not held:
+                logger.warning('Lease %s has expired.', self.lock.key)
+                self.lock.lost.set()
+                return
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def _acquire(lock: BaseLock, wait: float) -> bool:
+    """
+    Acquire the lease of `lock`, waiting up to `wait` seconds.
+    """
+    deadline = time.monotonic() + wait
+    while not lock.acquire():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+@contextlib.contextmanager
+def lease(
+    key: str,
+    wait: float = 0,
+    mark_stale: bool = False,
+    on_stale: Optional[Callable[[], None]] = None,
+) -> Generator[Optional[BaseLock], None, None]:
+    """
+    Hold the lease of `key` while the block is executed, if it is available
+    within `wait` seconds.
+
+    Yields the lock, if the lease has been acquired, otherwise `None`. The
+    lease is refreshed regularly until the block is left, `lock.lost` is set
+    if it expires nevertheless.
+
+    If the lease is not acquired and `mark_stale` is set, the work of the
+    holder is marked as stale. The holder runs its `on_stale` callback once
+    it has released the lease, e.g. to convert a replaced video again.
+    """
+    lock = get_lock(key)
+    if not _acquire(lock, wait):
+        if not mark_stale:
+            yield None
+            return
+
+        lock.mark_stale()
+        # the lease may have been released before it has been marked
+        if not lock.acquire():
+            yield None
+            return
+        lock.pop_stale()
+
+    heartbeat: Optional[Heartbeat] = None
+    if lock.timeout:
+        heartbeat = Heartbeat(lock, interval=lock.timeout / 3)
+        heartbeat.start()
+    try:
+        yield lock
+    finally:
+        if heartbeat:
+            heartbeat.stop()
+        lock.release()
+
+    if lock.lost.is_set():
+        # the stale mark belongs to the current holder
+        return
+    if lock.pop_stale() and on_stale is not None:
+        on_stale()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from ... import cleanup
+
+
+class Command(BaseCommand):
+    help = "Delete orphaned files of formats and stale temporary files."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only count the files, which would be deleted.",
+        )
+        parser.add_argument(
+            '--min-age',
+            type=float,
+            default=3600,
+            help="Minimum age (in seconds) of orphaned files of formats.",
+        )
+        parser.add_argument(
+            '--temp-max-age',
+            type=float,
+            default=86400,
+            help="Age (in seconds) after which temporary files are stale.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of files checked and deleted at once.",
+        )
+
+    def handle(self, *args, **options):
+        result = cleanup.collect_garbage(
+            dry_run=options['dry_run'],
+            min_age=options['min_age'],
+            temp_max_age=options['temp_max_age'],
+            batch_size=options['batch_size'],
+        )
+
+        verb = "Found" if options['dry_run'] else "Deleted"
+        self.stdout.write(
+            "{} {:d} orphaned files of formats and {:d} stale temporary files.".format(
+                verb, result['orphaned_files'], result['temp_files']
+            )
+        )
@@ -0,0 +1,56 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import planner
+
+
+class Command(BaseCommand):
+    help = "Convert videos into formats, which are missing."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            metavar='app_label.ModelName',
+            help="Models to check, defaults to all models containing videos.",
+        )
+        parser.add_argument(
+            '--format',
+            action='append',
+            dest='formats',
+            help="Only check the given format, can be passed multiple times.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only list the missing formats.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            models = [apps.get_model(label) for label in options['models']]
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+
+        count = 0
+        for model in models or planner.get_video_models():
+            queryset = model._default_manager.all()
+            if options['dry_run']:
+                for missing in planner.find_missing_formats(
+                    queryset, options['formats']
+                ):
+                    self.stdout.write(
+                        "{}.{} {} {}: {}".format(
+                            missing.app_label,
+                            missing.model_name,
+                            missing.object_pk,
+                            missing.field_name,
+                            ', '.join(missing.formats),
+                        )
+                    )
+                    count += 1
+            else:
+                count += planner.schedule_missing_formats(queryset, options['formats'])
+
+        verb = "Found" if options['dry_run'] else "Scheduled"
+        self.stdout.write("{} {:d} videos with missing formats.".format(verb, count))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from ...worker import WorkerServer, get_default_backend, get_socket_path
+
+
+class Command(BaseCommand):
+    help = "Serve probe, thumbnail and preview requests on a unix socket."  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=None,
+            help="Path of the unix socket (default: VIDEO_ENCODING_WORKER_SOCKET).",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help="Number of requests processed concurrently.",
+        )
+        parser.add_argument(
+            '--backend',
+            default=None,
+            help="Dotted path of the backend processing the requests "
+            "(default: PyAV if available, else FFmpeg).",
+        )
+        parser.add_argument(
+            '--mode',
+            type=lambda value: int(value, 8),
+            default=None,
+            help="Permissions of the socket (default: VIDEO_ENCODING_WORKER_SOCKET_MODE).",
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options['socket'] or get_socket_path()
+        if options['backend']:
+            backend = import_string(options['backend'])()
+        else:
+            backend = get_default_backend()
+
+        server = WorkerServer(
+            socket_path, backend, workers=options['workers'], mode=options['mode']
+        )
+        self.stdout.write("Encoding worker listening on '{}'.".format(socket_path))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
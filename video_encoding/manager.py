@@ -1,13 +1,92 @@
-from django.db.models import Manager
+from typing import Dict, Optional
+
+from django.db.models import Count, Manager, Min, Prefetch, Q
 from django.db.models.query import QuerySet
 
 
 class FormatQuerySet(QuerySet):
     def in_progress(self):
-        return self.filter(progress__lt=100)
+        return self.filter(progress__lt=100, unsupported=False, is_preview=False)
 
     def complete(self):
-        return self.filter(progress=100)
+        return self.filter(progress=100, unsupported=False, is_preview=False)
+
+    def previews(self):
+        return self.filter(is_preview=True)
+
+    def live_progress(self) -> Dict[int, float]:
+        """
+        Return the current progress of all formats, keyed by their primary key.
+
+        The progress of running encodings is read from the configured
+        progress channel, which is more recent than the database.
+        """
+        from .progress import get_progress_channel
+
+        progress = dict(self.values_list('pk', 'progress'))
+        progress_channel = get_progress_channel()
+        if progress_channel is None:
+            return progress
+
+        in_progress = [pk for pk, percent in progress.items() if percent < 100]
+        progress.update(progress_channel.get_many(in_progress))
+        return progress
+
+    def annotate_status(
+        self, queryset: QuerySet, related_name: str = 'format_set'
+    ) -> QuerySet:
+        """
+        Annotate the objects of `queryset` with the status of their formats.
+
+        `related_name` is the name of the `GenericRelation` to `Format`.
+        Only formats contained in this queryset are considered, unsupported
+        formats and previews are ignored. The following annotations are added, using a
+        single query:
+
+        * `formats_count`: number of formats
+        * `formats_complete`: number of completely encoded formats
+        * `formats_min_progress`: progress of the least advanced format
+        """
+        formats = Q(
+            **{
+                '{}__unsupported'.format(related_name): False,
+                '{}__is_preview'.format(related_name): False,
+            }
+        )
+        if self.query.has_filters():
+            formats &= Q(**{'{}__pk__in'.format(related_name): self.values('pk')})
+        complete = formats & Q(**{'{}__progress'.format(related_name): 100})
+        return queryset.annotate(
+            formats_count=Count(related_name, filter=formats),
+            formats_complete=Count(related_name, filter=complete),
+            formats_min_progress=Min(
+                '{}__progress'.format(related_name), filter=formats
+            ),
+        )
+
+    def prefetch_for(
+        self,
+        queryset: QuerySet,
+        field_name: str,
+        related_name: str = 'format_set',
+        to_attr: Optional[str] = None,
+    ) -> QuerySet:
+        """
+        Prefetch the supported formats, excluding previews, of the given
+        `VideoField` for all objects of `queryset`.
+
+        The formats are accessible as list using `to_attr`, which defaults to
+        `<field_name>_formats`.
+        """
+        return queryset.prefetch_related(
+            Prefetch(
+                related_name,
+                queryset=self.filter(
+                    field_name=field_name, unsupported=False, is_preview=False
+                ),
+                to_attr=to_attr or '{}_formats'.format(field_name),
+            )
+        )
 
 
 class FormatManager(Manager.from_queryset(FormatQuerySet)):  # type: ignore
@@ -0,0 +1,179 @@
+import abc
+import contextlib
+import socket
+import threading
+import time
+from typing import Dict, Generator, List, Optional, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+
+from .utils import best_effort, get_instance
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+Tags = Dict[str, str]
+
+
+class BaseMetricsSink(metaclass=abc.ABCMeta):
+    """
+    Receives all metrics collected while converting videos.
+    """
+
+    @abc.abstractmethod
+    def emit(
+        self, name: str, value: float, tags: Optional[Tags] = None
+    ) -> None:  # pragma: no cover
+        """
+        Record a single measurement.
+        """
+
+
+class InMemoryMetricsSink(BaseMetricsSink):
+    """
+    Keep all metrics in memory, e.g. for testing.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: List[Tuple[str, float, Tags]] = []
+
+    def emit(self, name: str, value: float, tags: Optional[Tags] = None) -> None:
+        self.metrics.append((name, value, tags or {}))
+
+    def values(self, name: str) -> List[float]:
+        return [value for metric, value, _ in self.metrics if metric == name]
+
+    def clear(self) -> None:
+        self.metrics = []
+
+
+class StatsdMetricsSink(BaseMetricsSink):
+    """
+    Send all metrics as gauges to a statsd server using the DogStatsD tag format.
+    """
+
+    def __init__(
+        self, host: str = 'localhost', port: int = 8125, prefix: str = 'video_encoding'
+    ) -> None:
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def emit(self, name: str, value: float, tags: Optional[Tags] = None) -> None:
+        line = '{}.{}:{}|g'.format(self.prefix, name, value)
+        if tags:
+            line += '|#' + ','.join(
+                '{}:{}'.format(key, tag) for key, tag in sorted(tags.items())
+            )
+
+        with best_effort('Cannot emit metric {}.'.format(name), (OSError,)):
+            self.socket.sendto(line.encode('utf-8'), self.address)
+
+
+class PrometheusMetricsSink(BaseMetricsSink):
+    """
+    Export all metrics as prometheus summaries.
+
+    Requires `prometheus_client`.
+    """
+
+    def __init__(self, namespace: str = 'video_encoding', registry=None) -> None:
+        try:
+            import prometheus_client
+        except ImportError as e:
+            raise ImproperlyConfigured(
+                _("The prometheus metrics sink requires 'prometheus_client'.")
+            ) from e
+
+        self.prometheus_client = prometheus_client
+        self.namespace = namespace
+        self.registry = registry or prometheus_client.REGISTRY
+        self.summaries: Dict[Tuple[str, Tuple[str, ...]], object] = {}
+        self.lock = threading.Lock()
+
+    def emit(self, name: str, value: float, tags: Optional[Tags] = None) -> None:
+        tags = tags or {}
+        labelnames = tuple(sorted(tags))
+
+        with self.lock:
+            key = (name, labelnames)
+            if key not in self.summaries:
+                self.summaries[key] = self.prometheus_client.Summary(
+                    name,
+                    'django-video-encoding metric {}'.format(name),
+                    labelnames=labelnames,
+                    namespace=self.namespace,
+                    registry=self.registry,
+                )
+            summary = self.summaries[key]
+
+        if labelnames:
+            summary = summary.labels(**tags)  # type: ignore
+        summary.observe(value)  # type: ignore
+
+
+def get_metrics_sink() -> Optional[BaseMetricsSink]:
+    from .config import settings
+
+    path = settings.VIDEO_ENCODING_METRICS_SINK
+    if not path:
+        return None
+
+    return get_instance(
+        path,
+        settings.VIDEO_ENCODING_METRICS_SINK_PARAMS,
+        _("Cannot retrieve metrics sink '{}'. Error: '{}'."),
+    )
+
+
+def _get_children_cpu_time() -> float:
+    if resource is None:  # pragma: no cover
+        return 0.0
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextlib.contextmanager
+def measure() -> Generator[Dict[str, float], None, None]:
+    """
+    Measure the wall time and the cpu time of all child processes
+    (e.g. ffmpeg) which terminated within the block.
+    """
+    metrics: Dict[str, float] = {}
+    start_time = time.monotonic()
+    start_cpu_time = _get_children_cpu_time()
+    try:
+        yield metrics
+    finally:
+        metrics['wall_time'] = time.monotonic() - start_time
+        metrics['cpu_time'] = _get_children_cpu_time() - start_cpu_time
+
+
+def get_output_metrics(
+    wall_time: float, duration: Optional[float], size: Optional[int]
+) -> Dict[str, float]:
+    """
+    Derive speed (x realtime) and bitrate (bit/s) of an encoded file.
+    """
+    metrics: Dict[str, float] = {}
+    if duration and wall_time:
+        metrics['speed'] = duration / wall_time
+    if size is not None:
+        metrics['size'] = size
+        if duration:
+            metrics['bitrate'] = size * 8 / duration
+    return metrics
+
+
+def report(
+    sink: Optional[BaseMetricsSink], metrics: Dict[str, float], tags: Tags
+) -> None:
+    if sink is None:
+        return
+
+    for name, value in metrics.items():
+        sink.emit(name, value, tags)
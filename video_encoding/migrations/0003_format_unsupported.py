@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_encoding', '0002_update_field_definitions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='format',
+            name='unsupported',
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name='Unsupported'
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def flag_previews(apps, schema_editor):
+    """
+    Flag previews created before, identified by the configured preview names.
+    """
+    names = [
+        options['name'] for options in getattr(settings, 'VIDEO_ENCODING_PREVIEWS', [])
+    ]
+    if names:
+        Format = apps.get_model('video_encoding', 'Format')
+        Format.objects.filter(format__in=names).update(is_preview=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video_encoding', '0003_format_unsupported'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='format',
+            name='is_preview',
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name='Preview'
+            ),
+        ),
+        migrations.RunPython(flag_previews, migrations.RunPython.noop),
+    ]
@@ -63,6 +63,18 @@ class Format(models.Model):
         null=True,
         verbose_name=_("Duration (s)"),
     )
+    # the video lacks the streams required by the format, e.g. audio files
+    unsupported = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name=_("Unsupported"),
+    )
+    # created by `create_previews`, not counted as format of the video
+    is_preview = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name=_("Preview"),
+    )
 
     objects = FormatManager()
 
@@ -85,6 +97,6 @@ class Format(models.Model):
             self.save()
 
     def reset_progress(self, commit=True):
-        self.percent = 0
+        self.progress = 0
         if commit:
             self.save()
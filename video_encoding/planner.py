@@ -0,0 +1,128 @@
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Type
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.query import QuerySet
+
+from .backends import get_backend
+from .config import settings
+from .fields import VideoField
+from .models import Format
+from .tasks import convert_field
+from .triggers import get_enqueue
+
+
+class MissingFormats(NamedTuple):
+    app_label: str
+    model_name: str
+    object_pk: Any
+    field_name: str
+    formats: List[str]
+
+
+def get_format_names(names: Optional[List[str]] = None) -> List[str]:
+    """
+    Return the names of the formats configured for the current backend,
+    optionally restricted to `names`.
+    """
+    formats = settings.VIDEO_ENCODING_FORMATS[get_backend().name]
+    return [
+        options['name']
+        for options in formats
+        if names is None or options['name'] in names
+    ]
+
+
+def get_video_models() -> List[Type[models.Model]]:
+    """
+    Return all models containing a `VideoField`, except `Format`.
+    """
+    return [
+        model
+        for model in apps.get_models()
+        if model is not Format
+        and any(isinstance(field, VideoField) for field in model._meta.fields)
+    ]
+
+
+def _find_missing(
+    queryset: QuerySet, field: VideoField, names: List[str]
+) -> Iterator[MissingFormats]:
+    opts = queryset.model._meta
+    # unsupported formats are never converted, e.g. video formats of audio files
+    converted = Format.objects.filter(
+        Q(progress=100) | Q(unsupported=True),
+        content_type=ContentType.objects.get_for_model(queryset.model),
+        object_id=OuterRef('pk'),
+        field_name=field.name,
+    )
+    # a boolean annotation per format, `format_0`, `format_1`, ...
+    aliases = ['format_{:d}'.format(index) for index in range(len(names))]
+    missing = Q()
+    for alias in aliases:
+        missing |= Q(**{alias: False})
+
+    rows = (
+        queryset.exclude(**{'{}__isnull'.format(field.name): True})
+        .exclude(**{field.name: ''})
+        .annotate(
+            **{
+                alias: Exists(converted.filter(format=name))
+                for alias, name in zip(aliases, names)
+            }
+        )
+        .filter(missing)
+        .order_by('pk')
+        .values_list('pk', *aliases)
+    )
+    for pk, *exists in rows.iterator():
+        yield MissingFormats(
+            app_label=opts.app_label,
+            model_name=opts.model_name,
+            object_pk=pk,
+            field_name=field.name,
+            formats=[name for name, found in zip(names, exists) if not found],
+        )
+
+
+def find_missing_formats(
+    queryset: QuerySet, formats: Optional[List[str]] = None
+) -> Iterator[MissingFormats]:
+    """
+    Yield the formats, which have not been converted yet, of all videos of
+    `queryset`.
+
+    The configured formats (optionally restricted to `formats`) are compared
+    against completely encoded and unsupported `Format` objects using a single
+    query per `VideoField`. Empty fields are skipped.
+    """
+    names = get_format_names(formats)
+    if not names:
+        return
+
+    for field in queryset.model._meta.fields:
+        if isinstance(field, VideoField):
+            yield from _find_missing(queryset, field, names)
+
+
+def schedule_missing_formats(
+    queryset: QuerySet,
+    formats: Optional[List[str]] = None,
+    enqueue: Optional[Callable] = None,
+) -> int:
+    """
+    Enqueue the conversion of all missing formats of the videos of `queryset`
+    and return the number of videos.
+
+    `enqueue` defaults to `VIDEO_ENCODING_TRIGGER_ENQUEUE`.
+    """
+    if enqueue is None:
+        enqueue = get_enqueue()
+
+    count = 0
+    for missing in find_missing_formats(queryset, formats):
+        enqueue(convert_field, *missing)
+        count += 1
+    return count
@@ -0,0 +1,132 @@
+import abc
+import json
+import threading
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+
+from .utils import get_instance
+
+
+class BaseProgressChannel(metaclass=abc.ABCMeta):
+    """
+    Distributes the live progress of running encodings.
+    """
+
+    @abc.abstractmethod
+    def publish(self, format_pk: int, percent: float) -> None:  # pragma: no cover
+        """
+        Publish the current progress of a format.
+        """
+
+    @abc.abstractmethod
+    def get_many(
+        self, format_pks: Iterable[int]
+    ) -> Dict[int, float]:  # pragma: no cover
+        """
+        Return the last published progress of the given formats.
+
+        Formats without any published progress are omitted.
+        """
+
+
+class InMemoryProgressChannel(BaseProgressChannel):
+    """
+    Keep the progress in memory of the current process, e.g. for testing.
+    """
+
+    def __init__(self) -> None:
+        self.progress: Dict[int, float] = {}
+        self.lock = threading.Lock()
+
+    def publish(self, format_pk: int, percent: float) -> None:
+        with self.lock:
+            self.progress[format_pk] = percent
+
+    def get_many(self, format_pks: Iterable[int]) -> Dict[int, float]:
+        with self.lock:
+            return {pk: self.progress[pk] for pk in format_pks if pk in self.progress}
+
+
+class CacheProgressChannel(BaseProgressChannel):
+    """
+    Store the progress using the django cache framework.
+    """
+
+    def __init__(self, cache_alias: str = 'default', timeout: int = 3600) -> None:
+        self.cache = caches[cache_alias]
+        self.timeout = timeout
+
+    def _get_key(self, format_pk: int) -> str:
+        return 'video_encoding:progress:{}'.format(format_pk)
+
+    def publish(self, format_pk: int, percent: float) -> None:
+        self.cache.set(self._get_key(format_pk), percent, self.timeout)
+
+    def get_many(self, format_pks: Iterable[int]) -> Dict[int, float]:
+        keys = {self._get_key(pk): pk for pk in format_pks}
+        return {keys[key]: value for key, value in self.cache.get_many(keys).items()}
+
+
+class RedisProgressChannel(BaseProgressChannel):
+    """
+    Store the progress in redis and publish all updates to a pub/sub channel.
+
+    Requires `redis`.
+    """
+
+    def __init__(
+        self,
+        url: str = 'redis://localhost:6379/0',
+        channel: str = 'video_encoding:progress',
+        timeout: int = 3600,
+    ) -> None:
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured(
+                _("The redis progress channel requires 'redis'.")
+            ) from e
+
+        self.redis = redis.Redis.from_url(url)
+        self.channel = channel
+        self.timeout = timeout
+
+    def _get_key(self, format_pk: int) -> str:
+        return '{}:{}'.format(self.channel, format_pk)
+
+    def publish(self, format_pk: int, percent: float) -> None:
+        pipeline = self.redis.pipeline()
+        pipeline.set(self._get_key(format_pk), percent, ex=self.timeout)
+        pipeline.publish(
+            self.channel, json.dumps({'format': format_pk, 'progress': percent})
+        )
+        pipeline.execute()
+
+    def get_many(self, format_pks: Iterable[int]) -> Dict[int, float]:
+        format_pks = list(format_pks)
+        if not format_pks:
+            return {}
+
+        values = self.redis.mget([self._get_key(pk) for pk in format_pks])
+        return {
+            pk: float(value)
+            for pk, value in zip(format_pks, values)
+            if value is not None
+        }
+
+
+def get_progress_channel() -> Optional[BaseProgressChannel]:
+    from .config import settings
+
+    path = settings.VIDEO_ENCODING_PROGRESS_CHANNEL
+    if not path:
+        return None
+
+    return get_instance(
+        path,
+        settings.VIDEO_ENCODING_PROGRESS_CHANNEL_PARAMS,
+        _("Cannot retrieve progress channel '{}'. Error: '{}'."),
+    )
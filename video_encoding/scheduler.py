@@ -0,0 +1,162 @@
+import heapq
+import itertools
+import threading
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from . import control
+from .config import settings
+from .fields import VideoField
+
+
+class ConversionJob(NamedTuple):
+    app_label: str
+    model_name: str
+    object_pk: int
+    tenant: Hashable = None
+    priority: int = 0
+    duration: float = float('inf')  # seconds, unknown durations are scheduled last
+
+
+class ConversionScheduler:
+    """
+    Decide in which order submitted videos are converted.
+
+    Jobs are ordered by
+
+    1. priority (higher first), defined per job or per model using
+       `VIDEO_ENCODING_PRIORITIES`
+    2. fair share between tenants, weighted by `VIDEO_ENCODING_TENANT_SHARES`
+    3. duration of the video (shortest first)
+
+    The share of a tenant is based on the duration of all videos, which have
+    been scheduled for this tenant.
+    """
+
+    def __init__(
+        self,
+        priorities: Optional[Dict[str, int]] = None,
+        shares: Optional[Dict[Hashable, float]] = None,
+    ) -> None:
+        if priorities is None:
+            priorities = settings.VIDEO_ENCODING_PRIORITIES
+        if shares is None:
+            shares = settings.VIDEO_ENCODING_TENANT_SHARES
+
+        self.priorities = {key.lower(): value for key, value in priorities.items()}
+        self.shares = shares
+        # pending jobs of each tenant
+        self.queues: Dict[Hashable, List[Tuple[int, float, int, ConversionJob]]] = {}
+        # seconds of video scheduled per tenant, weighted by its share
+        self.usage: Dict[Hashable, float] = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def submit(
+        self,
+        instance: models.Model,
+        tenant: Hashable = None,
+        priority: Optional[int] = None,
+    ) -> ConversionJob:
+        """
+        Add the conversion of all videos of `instance`.
+        """
+        opts = instance._meta
+        if priority is None:
+            priority = self.priorities.get(opts.label_lower, 0)
+
+        job = ConversionJob(
+            app_label=opts.app_label,
+            model_name=opts.model_name,
+            object_pk=instance.pk,
+            tenant=tenant,
+            priority=priority,
+            duration=_get_duration(instance),
+        )
+
+        with self.lock:
+            if not self.queues.get(tenant):
+                # a tenant becoming active must not be preferred because
+                # of its inactivity
+                active_usage = [
+                    self.usage[key] for key, queue in self.queues.items() if queue
+                ]
+                self.usage[tenant] = max(
+                    self.usage.get(tenant, 0), min(active_usage, default=0)
+                )
+
+            heapq.heappush(
+                self.queues.setdefault(tenant, []),
+                (-priority, job.duration, next(self.counter), job),
+            )
+        return job
+
+    def pop(self) -> Optional[ConversionJob]:
+        """
+        Remove and return the next job, which should be converted.
+        """
+        with self.lock:
+            candidates = [
+                (queue[0][0], self.usage[tenant], queue[0][1], queue[0][2], tenant)
+                for tenant, queue in self.queues.items()
+                if queue
+            ]
+            if not candidates:
+                return None
+
+            tenant = min(candidates)[-1]
+            *_, job = heapq.heappop(self.queues[tenant])
+
+            if job.duration != float('inf'):
+                self.usage[tenant] += job.duration / self.shares.get(tenant, 1)
+            return job
+
+    def run(self, max_jobs: Optional[int] = None, preempt: bool = False) -> int:
+        """
+        Convert the submitted videos in order and return the number of jobs run.
+
+        If `preempt` is set, encodings of models with a lower priority (e.g. run
+        by other workers) are suspended while a job is converted, which requires
+        `VIDEO_ENCODING_CONTROL_CACHE`.
+        """
+        from .tasks import convert_all_videos
+
+        if preempt and not settings.VIDEO_ENCODING_CONTROL_CACHE:
+            raise ImproperlyConfigured(
+                _("Preempting encodings requires 'VIDEO_ENCODING_CONTROL_CACHE'.")
+            )
+
+        count = 0
+        while max_jobs is None or count < max_jobs:
+            job = self.pop()
+            if job is None:
+                break
+
+            if preempt:
+                with control.preempting(job.priority):
+                    convert_all_videos(job.app_label, job.model_name, job.object_pk)
+            else:
+                convert_all_videos(job.app_label, job.model_name, job.object_pk)
+            count += 1
+        return count
+
+
+def _get_duration(instance: models.Model) -> float:
+    """
+    Return the stored duration of all videos of `instance`.
+    """
+    durations = [
+        getattr(instance, field.duration_field)
+        for field in instance._meta.fields
+        if isinstance(field, VideoField) and field.duration_field
+    ]
+    if not durations or None in durations:
+        return float('inf')
+    return float(sum(durations))
@@ -0,0 +1,159 @@
+import contextlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Generator, Iterable, List, Optional
+
+from . import exceptions
+
+# prefix of all temporary files and directories, used to find stale ones
+TEMP_PREFIX = 'video_encoding_'
+# seconds between checks of the free space while waiting for scratch space
+POLL_INTERVAL = 1
+# estimated sizes are increased by this factor, as bitrates are no hard limits
+SIZE_MARGIN = 1.2
+
+RE_BITRATE = re.compile(r'^(\d+(?:\.\d+)?)([kKmMgG]?)$')
+BITRATE_UNITS = {'': 1, 'k': 10**3, 'm': 10**6, 'g': 10**9}
+
+_lock = threading.Lock()
+# bytes reserved by running encodings of this process
+_reserved = 0
+
+
+def get_scratch_dir() -> str:
+    """
+    Return the directory for working files, `VIDEO_ENCODING_SCRATCH_DIR`
+    or the default directory for temporary files.
+    """
+    from .config import settings
+
+    return settings.VIDEO_ENCODING_SCRATCH_DIR or tempfile.gettempdir()
+
+
+def get_free_space(directory: str) -> int:
+    return shutil.disk_usage(directory).free
+
+
+def parse_bitrate(value: str) -> Optional[float]:
+    """
+    Parse a bitrate as used by ffmpeg (e.g. `1000k`) into bit/s.
+    """
+    match = RE_BITRATE.match(value)
+    if not match:
+        return None
+    number, unit = match.groups()
+    return float(number) * BITRATE_UNITS[unit.lower()]
+
+
+def _get_bitrate(params: List[str], options: Iterable[str]) -> Optional[float]:
+    for option in options:
+        if option in params[:-1]:
+            return parse_bitrate(params[params.index(option) + 1])
+    return None
+
+
+def estimate_size(
+    duration: Optional[float], params: List[str], default: int = 0
+) -> int:
+    """
+    Estimate the size (in bytes) of an encoding using the bitrates defined
+    in `params`.
+
+    Returns `default` (e.g. the size of the source) if no video bitrate is
+    defined, e.g. for quality based encodings.
+    """
+    video_bitrate = _get_bitrate(params, ('-maxrate', '-maxrate:v')) or _get_bitrate(
+        params, ('-b:v', '-b')
+    )
+    if not video_bitrate or not duration:
+        return default
+
+    audio_bitrate = _get_bitrate(params, ('-b:a', '-ab')) or 0
+    return int((video_bitrate + audio_bitrate) * duration / 8 * SIZE_MARGIN)
+
+
+def _try_reserve(directory: str, size: int) -> bool:
+    from .config import settings
+
+    global _reserved
+    with _lock:
+        # space reserved by other encodings of this process is not yet in use
+        available = (
+            get_free_space(directory)
+            - _reserved
+            - settings.VIDEO_ENCODING_SCRATCH_MIN_FREE
+        )
+        if size > available:
+            return False
+        _reserved += size
+        return True
+
+
+@contextlib.contextmanager
+def reserve(size: int, directory: Optional[str] = None) -> Generator[None, None, None]:
+    """
+    Reserve `size` bytes of scratch space for the duration of the block.
+
+    Waits up to `VIDEO_ENCODING_SCRATCH_WAIT` seconds for free space and raises
+    `InsufficientScratchSpaceError` afterwards.
+    """
+    from .config import settings
+
+    global _reserved
+    if directory is None:
+        directory = get_scratch_dir()
+
+    deadline = time.monotonic() + settings.VIDEO_ENCODING_SCRATCH_WAIT
+    while not _try_reserve(directory, size):
+        if time.monotonic() >= deadline:
+            raise exceptions.InsufficientScratchSpaceError(
+                "Insufficient scratch space in '{}' for {:d} bytes.".format(
+                    directory, size
+                )
+            )
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _reserved -= size
+
+
+@contextlib.contextmanager
+def scratch_file(suffix: str = '', size: int = 0) -> Generator[str, None, None]:
+    """
+    Reserve scratch space and return the path of a new, empty working file,
+    which is deleted when leaving the block.
+    """
+    directory = get_scratch_dir()
+    with reserve(size, directory):
+        fd, path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=suffix, dir=directory)
+        os.close(fd)
+        try:
+            yield path
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+
+def mkstemp(suffix: str = '') -> str:
+    """
+    Create a working file, which must be deleted by the caller.
+    """
+    fd, path = tempfile.mkstemp(
+        prefix=TEMP_PREFIX, suffix=suffix, dir=get_scratch_dir()
+    )
+    os.close(fd)
+    return path
+
+
+def scratch_directory() -> tempfile.TemporaryDirectory:
+    """
+    Create a working directory, which is deleted using `cleanup()`.
+    """
+    return tempfile.TemporaryDirectory(prefix=TEMP_PREFIX, dir=get_scratch_dir())
@@ -7,6 +7,8 @@ class ConversionResult(enum.Enum):
     SUCCEEDED = "success"
     FAILED = "failed"
     SKIPPED = "skipped"
+    CANCELLED = "cancelled"
+    LEASE_LOST = "lease_lost"
 
 
 encoding_started = Signal()
@@ -14,3 +16,5 @@ encoding_finished = Signal()
 
 format_started = Signal()
 format_finished = Signal()
+
+video_playable = Signal()
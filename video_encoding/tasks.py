@@ -1,23 +1,40 @@
+import functools
+import logging
 import os
-import tempfile
+import time
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional, Tuple, Union
 
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
 from django.core.files import File
+from django.db import models
 
-from . import signals
+from . import cleanup, control, ladder, locks, metrics, scratch, signals
 from .backends import get_backend
-from .backends.base import BaseEncodingBackend
+from .backends.base import BaseEncodingBackend, get_encode_options
+from .cache import get_encode_cache, hash_file
 from .config import settings
-from .exceptions import VideoEncodingError
+from .exceptions import EncodingCancelledError, VideoEncodingError
 from .fields import VideoField
 from .models import Format
-from .utils import get_local_path
+from .progress import get_progress_channel
+from .triggers import get_enqueue
+from .utils import best_effort, get_filename, get_source, refresh_source
 
+logger = logging.getLogger(__name__)
 
-def convert_all_videos(app_label, model_name, object_pk):
+# optional options of previews passed to the backend
+PREVIEW_OPTIONS = ('segments', 'segment_duration', 'width', 'fps')
+# ffmpeg options determining the frames of an encoding, e.g. its resolution
+FRAME_OPTIONS = ('-vf', '-filter:v', '-s', '-r')
+
+
+def convert_all_videos(app_label, model_name, object_pk, formats=None, force=False):
     """
     Automatically converts all videos of a given instance.
+
+    `formats` optionally restricts the conversion to the given format names.
     """
     # get instance
     model_class = apps.get_model(app_label=app_label, model_name=model_name)
@@ -33,58 +50,529 @@ def convert_all_videos(app_label, model_name, object_pk):
 
             # trigger conversion
             fieldfile = getattr(instance, field.name)
-            convert_video(fieldfile)
+            convert_video(fieldfile, force=force, formats=formats)
+
+
+def convert_field(
+    app_label, model_name, object_pk, field_name, formats=None, force=False
+):
+    """
+    Converts the video of a single `VideoField` of a given instance.
 
+    `formats` optionally restricts the conversion to the given format names.
+    Instances, which have been deleted in the meantime, are skipped.
+    """
+    model_class = apps.get_model(app_label=app_label, model_name=model_name)
+    try:
+        instance = model_class.objects.get(pk=object_pk)
+    except model_class.DoesNotExist:
+        return
+
+    fieldfile = getattr(instance, field_name)
+    if fieldfile:
+        convert_video(fieldfile, force=force, formats=formats)
 
-def convert_video(fieldfile, force=False):
+
+def _enqueue_conversion(
+    instance: models.Model, field_name: str, format_name: str
+) -> None:
+    """
+    Enqueue the forced conversion of a format, which has been requested by
+    a forced conversion while the format has been converted.
+    """
+    opts = instance._meta
+    get_enqueue()(
+        convert_field,
+        opts.app_label,
+        opts.model_name,
+        instance.pk,
+        field_name,
+        [format_name],
+        True,
+    )
+
+
+def convert_video(fieldfile, force=False, formats=None):
     """
     Converts a given video file into all defined formats.
+
+    `formats` optionally restricts the conversion to the given format names.
+    Formats marked as `fast_start` are converted first. Formats are marked as
+    `unsupported` if the file does not contain the required streams, e.g. video
+    formats of audio files. Cancelled formats are deleted (see `control.cancel`).
+    Formats, whose lease has been lost, are abandoned without being touched.
+    Formats, which are converted by another worker at the same time, are
+    skipped (see `VIDEO_ENCODING_LOCK_CACHE`). Forced conversions wait for
+    them and have them convert the format again, if they do not finish in time.
+    The urls of streamed videos are generated again for each format.
     """
     instance = fieldfile.instance
     field = fieldfile.field
+    metrics_sink = metrics.get_metrics_sink()
+    started_at = time.time()
 
-    with get_local_path(fieldfile) as source_path:
+    start_time = time.monotonic()
+    with get_source(
+        fieldfile
+    ) as source_path, PassLogs() as passlogs, AudioTracks() as audio_tracks:
+        source_metrics = {'download_time': time.monotonic() - start_time}
         encoding_backend = get_backend()
 
+        start_time = time.monotonic()
+        media_info = encoding_backend.get_media_info(source_path)
+        duration = media_info['duration']
+        source_metrics['probe_time'] = time.monotonic() - start_time
+        factor = _analyse_complexity(encoding_backend, source_path, source_metrics)
+        source_hash = _hash_source(source_path, source_metrics)
+        metrics.report(metrics_sink, source_metrics, {'field': field.name})
+        # there is no audio to share, e.g. of screen recordings
+        shared_audio = audio_tracks if media_info.get('audio', True) else None
+
         signals.encoding_started.send(instance.__class__, instance=instance)
-        for options in settings.VIDEO_ENCODING_FORMATS[encoding_backend.name]:
-            video_format, created = Format.objects.get_or_create(
-                object_id=instance.pk,
-                content_type=ContentType.objects.get_for_model(instance),
-                field_name=field.name,
-                format=options['name'],
+        playable = False
+        for options in _get_formats(encoding_backend, formats, factor):
+            if not _has_streams(options, media_info):
+                _mark_unsupported(instance, field.name, options['name'])
+                continue
+
+            lock_key = locks.get_format_key(instance, field.name, options['name'])
+            # forced conversions wait for running ones, e.g. of a replaced video,
+            # which convert the format again if they do not finish in time
+            wait = settings.VIDEO_ENCODING_LOCK_WAIT if force else 0
+            on_stale = functools.partial(
+                _enqueue_conversion, instance, field.name, options['name']
             )
-            signals.format_started.send(Format, instance=instance, format=video_format)
+            with locks.lease(
+                lock_key, wait=wait, mark_stale=force, on_stale=on_stale
+            ) as lock:
+                if lock is None:
+                    # converted by another worker right now
+                    logger.info('Skipping %s, which is locked.', lock_key)
+                    continue
 
-            # do not reencode if not requested
-            if video_format.file and not force:
+                video_format, created = Format.objects.get_or_create(
+                    object_id=instance.pk,
+                    content_type=ContentType.objects.get_for_model(instance),
+                    field_name=field.name,
+                    format=options['name'],
+                )
+                if video_format.unsupported:
+                    # e.g. the video has been replaced
+                    video_format.unsupported = False
+                    video_format.save(update_fields=['unsupported'])
+                signals.format_started.send(
+                    Format, instance=instance, format=video_format
+                )
+
+                # do not reencode if not requested
+                if video_format.file and not force:
+                    signals.format_finished.send(
+                        Format,
+                        instance=instance,
+                        format=video_format,
+                        result=signals.ConversionResult.SKIPPED,
+                        metrics=source_metrics,
+                    )
+                    continue
+
+                # e.g. the presigned url of a streamed video has expired
+                source_path = refresh_source(fieldfile, source_path)
+                result, format_metrics = _convert_format(
+                    source_path,
+                    duration,
+                    video_format,
+                    encoding_backend,
+                    options,
+                    passlogs,
+                    source_hash,
+                    shared_audio,
+                    control.get_control(video_format, started_at, lock),
+                )
+                metrics.report(
+                    metrics_sink,
+                    format_metrics,
+                    {
+                        'field': field.name,
+                        'format': options['name'],
+                        'result': result.value,
+                    },
+                )
                 signals.format_finished.send(
                     Format,
                     instance=instance,
                     format=video_format,
-                    result=signals.ConversionResult.SKIPPED,
+                    result=result,
+                    metrics={**source_metrics, **format_metrics},
                 )
+
+                if result in (
+                    signals.ConversionResult.FAILED,
+                    signals.ConversionResult.CANCELLED,
+                ):
+                    # TODO handle failures with more care
+                    _delete_format(video_format)
+                elif result == signals.ConversionResult.LEASE_LOST:
+                    logger.warning('Abandoning %s, its lease has been lost.', lock_key)
+                elif options.get('fast_start') and not playable:
+                    playable = True
+                    signals.video_playable.send(
+                        instance.__class__, instance=instance, format=video_format
+                    )
+        signals.encoding_finished.send(instance.__class__, instance=instance)
+
+
+def collect_garbage(dry_run=False):
+    """
+    Deletes orphaned files of formats and stale temporary files.
+
+    Meant to be run periodically, e.g. once a day.
+    """
+    return cleanup.collect_garbage(dry_run=dry_run)
+
+
+def create_previews(fieldfile, force=False):
+    """
+    Creates all previews defined in `VIDEO_ENCODING_PREVIEWS`.
+
+    Previews are stored as `Format` of the video, flagged by `is_preview`.
+    """
+    instance = fieldfile.instance
+    field = fieldfile.field
+
+    with get_source(fieldfile) as source_path:
+        encoding_backend = get_backend()
+
+        for options in settings.VIDEO_ENCODING_PREVIEWS:
+            preview, created = Format.objects.get_or_create(
+                object_id=instance.pk,
+                content_type=ContentType.objects.get_for_model(instance),
+                field_name=field.name,
+                format=options['name'],
+                defaults={'is_preview': True},
+            )
+            if preview.file and not force:
                 continue
 
+            source_path = refresh_source(fieldfile, source_path)
             try:
-                _encode(source_path, video_format, encoding_backend, options)
+                _create_preview(source_path, preview, encoding_backend, options)
             except VideoEncodingError:
-                signals.format_finished.send(
-                    Format,
-                    instance=instance,
-                    format=video_format,
-                    result=signals.ConversionResult.FAILED,
+                if not preview.file:
+                    _delete_format(preview)
+
+
+def _create_preview(
+    source_path: str,
+    preview: Format,
+    encoding_backend: BaseEncodingBackend,
+    options: dict,
+) -> None:
+    preview_path = encoding_backend.get_preview(
+        source_path,
+        extension=options['extension'],
+        **{key: options[key] for key in PREVIEW_OPTIONS if key in options},
+    )
+    try:
+        _replace_file(preview, _get_format_filename(source_path, options), preview_path)
+    finally:
+        os.unlink(preview_path)
+
+    preview.update_progress(100)
+
+
+def _get_formats(
+    encoding_backend: BaseEncodingBackend,
+    names: Optional[List[str]] = None,
+    factor: float = 1.0,
+) -> List[dict]:
+    """
+    Return the formats to convert to, `fast_start` formats first.
+
+    The bitrates of the formats are scaled by `factor`.
+    """
+    formats = settings.VIDEO_ENCODING_FORMATS[encoding_backend.name]
+    if names is not None:
+        formats = [options for options in formats if options['name'] in names]
+    formats = [ladder.adapt_format(options, factor) for options in formats]
+    return sorted(formats, key=lambda options: not options.get('fast_start', False))
+
+
+def _mark_unsupported(
+    instance: models.Model, field_name: str, format_name: str
+) -> None:
+    """
+    Record that the video lacks the streams required by a format, e.g. video
+    formats of audio files, so the format is not planned again.
+
+    Files of the format, e.g. of a replaced video, are deleted.
+    """
+    video_format, created = Format.objects.get_or_create(
+        object_id=instance.pk,
+        content_type=ContentType.objects.get_for_model(instance),
+        field_name=field_name,
+        format=format_name,
+        defaults={'unsupported': True},
+    )
+    if created or video_format.unsupported:
+        return
+
+    if video_format.file:
+        video_format.file.delete(save=False)
+    video_format.unsupported = True
+    video_format.progress = 0
+    video_format.save()
+
+
+def _has_streams(options: dict, media_info: Dict[str, Union[int, float]]) -> bool:
+    """
+    Return whether the file contains the streams required by the format.
+
+    Backends, which do not report the streams, are assumed to return videos
+    with audio.
+    """
+    if options.get('audio_only'):
+        return bool(media_info.get('audio', True))
+    return bool(media_info.get('video', True))
+
+
+def _analyse_complexity(
+    encoding_backend: BaseEncodingBackend,
+    source_path: str,
+    source_metrics: Dict[str, float],
+) -> float:
+    """
+    Return the factor to scale the bitrates of all formats by, based
+    on the complexity of the video.
+    """
+    if not settings.VIDEO_ENCODING_COMPLEXITY_ANALYSIS:
+        return 1.0
+
+    start_time = time.monotonic()
+    try:
+        factor = ladder.analyse(
+            encoding_backend,
+            source_path,
+            **settings.VIDEO_ENCODING_COMPLEXITY_ANALYSIS_PARAMS,
+        )
+    except (NotImplementedError, VideoEncodingError):
+        # e.g. the video is too short, keep the configured bitrates
+        return 1.0
+
+    source_metrics['analysis_time'] = time.monotonic() - start_time
+    source_metrics['complexity'] = factor
+    return factor
+
+
+def _convert_format(
+    source_path: str,
+    duration: float,
+    video_format: Format,
+    encoding_backend: BaseEncodingBackend,
+    options: dict,
+    passlogs: 'PassLogs',
+    source_hash: Optional[str] = None,
+    audio_tracks: Optional['AudioTracks'] = None,
+    encoding_control: Optional[control.EncodingControl] = None,
+) -> Tuple[signals.ConversionResult, Dict[str, float]]:
+    """
+    Encode a single format and collect metrics about the encoding.
+
+    If an encode cache is configured, cached encodings are reused. The audio
+    of the format is taken from `audio_tracks`, if given. The encoding is
+    suspended and cancelled as requested using `encoding_control`.
+    """
+    if options.get('backend_params'):
+        # format specific configuration, e.g. process limits
+        encoding_backend = get_backend(**options['backend_params'])
+    cache_key = _get_cache_key(source_hash, encoding_backend, options)
+
+    result = signals.ConversionResult.SUCCEEDED
+    try:
+        with metrics.measure() as format_metrics:
+            if encoding_control is not None:
+                # e.g. all formats of a video are cancelled
+                _check_cancelled(encoding_control)
+            format_metrics['cache_hit'] = float(
+                _restore_cached(cache_key, source_path, video_format, options)
+            )
+            if not format_metrics['cache_hit']:
+                params, audio_path = _get_params(
+                    source_path, encoding_backend, options, passlogs, audio_tracks
                 )
-                # TODO handle with more care
-                video_format.delete()
-                continue
-            signals.format_finished.send(
-                Format,
-                instance=instance,
-                format=video_format,
-                result=signals.ConversionResult.SUCCEEDED,
+                _encode(
+                    source_path,
+                    video_format,
+                    encoding_backend,
+                    {**options, 'params': params},
+                    duration,
+                    cache_key=cache_key,
+                    audio_path=audio_path,
+                    encoding_control=encoding_control,
+                )
+    except EncodingCancelledError:
+        if encoding_control is not None and encoding_control.lease_lost:
+            # the format belongs to the worker holding the lease by now
+            result = signals.ConversionResult.LEASE_LOST
+        else:
+            result = signals.ConversionResult.CANCELLED
+    except VideoEncodingError:
+        result = signals.ConversionResult.FAILED
+
+    size = video_format.file.size if video_format.file else None
+    format_metrics.update(
+        metrics.get_output_metrics(format_metrics['wall_time'], duration, size)
+    )
+    return result, format_metrics
+
+
+def _check_cancelled(encoding_control: control.EncodingControl) -> None:
+    if encoding_control.get_state() == control.ControlState.CANCELLED:
+        raise EncodingCancelledError('The encoding has been cancelled.')
+
+
+def _get_params(
+    source_path: str,
+    encoding_backend: BaseEncodingBackend,
+    options: dict,
+    passlogs: 'PassLogs',
+    audio_tracks: Optional['AudioTracks'] = None,
+) -> Tuple[List[str], Optional[str]]:
+    """
+    Return the params of the encoding of a format and the path of the
+    audio track to copy into the encoding, if any.
+    """
+    if options.get('audio_only'):
+        return ['-vn', *options['params'], *options.get('audio_params', [])], None
+
+    params = options['params']
+    if options.get('first_pass'):
+        params = passlogs.get_params(source_path, encoding_backend, options)
+
+    if not options.get('audio_params'):
+        return params, None
+    if audio_tracks is None or not settings.VIDEO_ENCODING_SHARED_AUDIO:
+        return [*params, *options['audio_params']], None
+    return params, audio_tracks.get_path(source_path, encoding_backend, options)
+
+
+def _split_frame_params(params: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split `params` into the options determining the frames of an encoding
+    (see `FRAME_OPTIONS`) and all other params.
+    """
+    frame_params: List[str] = []
+    other_params: List[str] = []
+    values = iter(params)
+    for param in values:
+        if param in FRAME_OPTIONS:
+            frame_params.extend([param, next(values, '')])
+        else:
+            other_params.append(param)
+    return frame_params, other_params
+
+
+class PassLogs:
+    """
+    Statistics of the first pass of two-pass encodings.
+
+    The analysis pass is run only once for all formats sharing the same
+    `first_pass` params and frames. The options determining the frames are
+    taken from the params of the format, as the statistics are only valid
+    for the same resolution and frame rate.
+    """
+
+    def __init__(self) -> None:
+        self.directory: Optional[TemporaryDirectory] = None
+        self.passlogfiles: Dict[Tuple[str, ...], str] = {}
+        # failed analyses are not run again for other formats
+        self.errors: Dict[Tuple[str, ...], VideoEncodingError] = {}
+
+    def __enter__(self) -> 'PassLogs':
+        self.directory = scratch.scratch_directory()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.directory:
+            self.directory.cleanup()
+
+    def get_params(
+        self,
+        source_path: str,
+        encoding_backend: BaseEncodingBackend,
+        options: dict,
+    ) -> List[str]:
+        """
+        Return the params of the second pass for the given format.
+        """
+        frame_params, _ = _split_frame_params(options['params'])
+        _, first_pass = _split_frame_params(options['first_pass'])
+        first_pass = [*first_pass, *frame_params]
+
+        key = tuple(first_pass)
+        if key in self.errors:
+            raise self.errors[key]
+        if key not in self.passlogfiles:
+            passlogfile = os.path.join(
+                self.directory.name,  # type: ignore
+                'pass{:d}'.format(len(self.passlogfiles) + len(self.errors)),
             )
-        signals.encoding_finished.send(instance.__class__, instance=instance)
+            try:
+                encoding_backend.analyse(source_path, passlogfile, first_pass)
+            except VideoEncodingError as e:
+                self.errors[key] = e
+                raise
+            self.passlogfiles[key] = passlogfile
+
+        return [
+            *options['params'],
+            '-pass',
+            '2',
+            '-passlogfile',
+            self.passlogfiles[key],
+        ]
+
+
+class AudioTracks:
+    """
+    Audio tracks shared between formats (see `VIDEO_ENCODING_SHARED_AUDIO`).
+
+    The audio is encoded only once for all formats sharing the same
+    `audio_params` and copied into each of them.
+    """
+
+    def __init__(self) -> None:
+        self.directory: Optional[TemporaryDirectory] = None
+        self.tracks: Dict[Tuple[str, ...], str] = {}
+
+    def __enter__(self) -> 'AudioTracks':
+        self.directory = scratch.scratch_directory()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.directory:
+            self.directory.cleanup()
+
+    def get_path(
+        self,
+        source_path: str,
+        encoding_backend: BaseEncodingBackend,
+        options: dict,
+    ) -> str:
+        """
+        Return the path of the audio track of the given format.
+        """
+        key = tuple(options['audio_params'])
+        if key not in self.tracks:
+            track_path = os.path.join(
+                self.directory.name,  # type: ignore
+                'audio{:d}.mka'.format(len(self.tracks)),
+            )
+            params = ['-vn', *options['audio_params'], '-f', 'matroska']
+            for _ in encoding_backend.encode(source_path, track_path, params):
+                pass
+            self.tracks[key] = track_path
+
+        return self.tracks[key]
 
 
 def _encode(
@@ -92,35 +580,152 @@ def _encode(
     video_format: Format,
     encoding_backend: BaseEncodingBackend,
     options: dict,
+    duration: Optional[float] = None,
+    cache_key: Optional[str] = None,
+    audio_path: Optional[str] = None,
+    encoding_control: Optional[control.EncodingControl] = None,
 ) -> None:
     """
     Encode video and continously report encoding progress.
+
+    Scratch space for the encoded file is reserved upfront, based on the
+    bitrate of the format and the `duration` of the video. The encoded file
+    is stored in the encode cache using `cache_key`. The audio track at
+    `audio_path` is copied into the encoding, if given.
+
+    Cancelled encodings are not saved, even if they are complete.
     """
     # TODO do not upscale videos
     # TODO move logic to Format model
 
-    with tempfile.NamedTemporaryFile(
-        suffix='_{name}.{extension}'.format(**options)
-    ) as file_handler:
-        target_path = file_handler.name
-
+    source_size = os.path.getsize(source_path) if os.path.isfile(source_path) else 0
+    size = scratch.estimate_size(
+        duration,
+        [*options['params'], *options.get('audio_params', [])],
+        default=source_size,
+    )
+    with scratch.scratch_file(
+        suffix='_{name}.{extension}'.format(**options), size=size
+    ) as target_path:
         # set progress to 0
         video_format.reset_progress()
 
-        encoding = encoding_backend.encode(source_path, target_path, options['params'])
-        while encoding:
-            try:
-                progress = next(encoding)
-            except StopIteration:
-                break
-            video_format.update_progress(progress)
+        progress_channel = get_progress_channel()
+        if progress_channel is not None:
+            # e.g. the progress of a previous encoding is still published
+            progress_channel.publish(video_format.pk, 0)
+        milestone = 0
+        encoding = encoding_backend.encode(
+            source_path,
+            target_path,
+            options['params'],
+            **get_encode_options(audio_path, encoding_control),
+        )
+        for progress in encoding:
+            if progress_channel is None:
+                video_format.update_progress(progress.percent)
+                continue
+
+            progress_channel.publish(video_format.pk, progress.percent)
+            # only update the database at coarse milestones
+            if progress.percent >= milestone + settings.VIDEO_ENCODING_PROGRESS_UPDATE:
+                milestone = progress.percent
+                video_format.update_progress(progress.percent)
+
+        if encoding_control is not None:
+            # the video may have been deleted or replaced in the meantime
+            _check_cancelled(encoding_control)
+
+        if cache_key is not None:
+            _store_cached(cache_key, target_path)
 
         # save encoded file
-        filename = os.path.basename(source_path)
-        # TODO remove existing file?
-        video_format.file.save(
-            '{filename}_{name}.{extension}'.format(filename=filename, **options),
-            File(open(target_path, mode='rb')),
+        _replace_file(
+            video_format, _get_format_filename(source_path, options), target_path
         )
 
         video_format.update_progress(100)  # now we are ready
+
+
+def _get_format_filename(source_path: str, options: dict) -> str:
+    return '{filename}_{name}.{extension}'.format(
+        filename=get_filename(source_path), **options
+    )
+
+
+def _hash_source(source_path: str, source_metrics: Dict[str, float]) -> Optional[str]:
+    """
+    Return the hash of the video, if an encode cache is configured.
+
+    Streamed videos are not hashed, as they would need to be downloaded.
+    """
+    if get_encode_cache() is None or not os.path.isfile(source_path):
+        return None
+
+    start_time = time.monotonic()
+    source_hash = hash_file(source_path)
+    source_metrics['hash_time'] = time.monotonic() - start_time
+    return source_hash
+
+
+def _get_cache_key(
+    source_hash: Optional[str], encoding_backend: BaseEncodingBackend, options: dict
+) -> Optional[str]:
+    encode_cache = get_encode_cache()
+    if encode_cache is None or source_hash is None:
+        return None
+    return encode_cache.get_key(source_hash, encoding_backend.name, options)
+
+
+def _restore_cached(
+    cache_key: Optional[str], source_path: str, video_format: Format, options: dict
+) -> bool:
+    """
+    Save the cached encoding as file of the format, if available.
+
+    If the cache is not available, the format is encoded instead.
+    """
+    if cache_key is None:
+        return False
+
+    with scratch.scratch_file(
+        suffix='_{name}.{extension}'.format(**options)
+    ) as cached_path:
+        hit = False
+        with best_effort('Cannot restore encoding from cache.', (OSError,)):
+            hit = get_encode_cache().get(cache_key, cached_path)  # type: ignore
+        if not hit:
+            return False
+        _replace_file(
+            video_format, _get_format_filename(source_path, options), cached_path
+        )
+
+    video_format.update_progress(100)
+    return True
+
+
+def _store_cached(cache_key: str, path: str) -> None:
+    with best_effort('Cannot store encoding in cache.', (OSError,)):
+        get_encode_cache().put(cache_key, path)  # type: ignore
+
+
+def _replace_file(video_format: Format, name: str, path: str) -> None:
+    """
+    Save the file at `path` as file of the format and delete the
+    previous file of the format (e.g. of forced re-encodes).
+    """
+    old_name = video_format.file.name
+    with open(path, mode='rb') as file_handler:
+        video_format.file.save(name, File(file_handler))
+
+    if old_name and old_name != video_format.file.name:
+        video_format.file.storage.delete(old_name)
+
+
+def _delete_format(video_format: Format) -> None:
+    """
+    Delete a format including its file.
+    """
+    if video_format.file:
+        video_format.file.delete(save=False)
+    video_format.delete()
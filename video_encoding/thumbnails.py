@@ -0,0 +1,132 @@
+from typing import Dict, List
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# size of the grayscale frames, which are sampled to score thumbnails
+SAMPLE_WIDTH = 96
+SAMPLE_HEIGHT = 54
+
+# weight of each metric within the score of a frame
+WEIGHTS = {
+    'brightness': 1.0,
+    'contrast': 1.0,
+    'sharpness': 1.0,
+    'stability': 1.0,
+}
+# frames which are (almost) black, white or blank are never selected
+MIN_BRIGHTNESS = 0.08
+MAX_BRIGHTNESS = 0.95
+MIN_CONTRAST = 0.04
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImproperlyConfigured(_("Selecting thumbnails requires 'numpy'."))
+
+
+def _normalize(values: 'np.ndarray') -> 'np.ndarray':
+    maximum = values.max() if values.size else 0
+    if maximum <= 0:
+        return np.zeros_like(values)
+    return values / maximum
+
+
+def get_metrics(frames: 'np.ndarray') -> Dict[str, 'np.ndarray']:
+    """
+    Compute all metrics of a batch of grayscale frames (`n x height x width`).
+
+    All metrics are within `[0, 1]`, higher is better except for the
+    absolute `brightness` and `contrast`.
+    """
+    _require_numpy()
+    frames = frames.astype(np.float32) / 255
+
+    brightness = frames.mean(axis=(1, 2))
+    contrast = frames.std(axis=(1, 2))
+
+    # variance of the laplacian
+    laplacian = (
+        4 * frames[:, 1:-1, 1:-1]
+        - frames[:, :-2, 1:-1]
+        - frames[:, 2:, 1:-1]
+        - frames[:, 1:-1, :-2]
+        - frames[:, 1:-1, 2:]
+    )
+    sharpness = _normalize(laplacian.var(axis=(1, 2)))
+
+    # frames differing from their neighbours are likely part of a transition
+    if len(frames) > 1:
+        changes = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2))
+        changes = np.concatenate([changes[:1], changes, changes[-1:]])
+        stability = 1 - _normalize((changes[:-1] + changes[1:]) / 2)
+    else:
+        stability = np.ones(len(frames), dtype=np.float32)
+
+    return {
+        'brightness': brightness,
+        'contrast': contrast,
+        'sharpness': sharpness,
+        'stability': stability,
+    }
+
+
+def score_frames(frames: 'np.ndarray') -> 'np.ndarray':
+    """
+    Score a batch of grayscale frames (`n x height x width`).
+
+    The score is the weighted mean of all metrics (see `WEIGHTS`) and `0` for
+    frames, which are too dark, too bright or blank.
+    """
+    metrics = get_metrics(frames)
+    brightness = metrics['brightness']
+    contrast = metrics['contrast']
+
+    weighted = {
+        # prefer medium brightness
+        'brightness': 1 - np.abs(brightness - 0.5) * 2,
+        'contrast': np.minimum(contrast * 4, 1),
+        'sharpness': metrics['sharpness'],
+        'stability': metrics['stability'],
+    }
+    scores = sum(WEIGHTS[name] * weighted[name] for name in WEIGHTS) / sum(
+        WEIGHTS.values()
+    )
+
+    usable = (
+        (brightness >= MIN_BRIGHTNESS)
+        & (brightness <= MAX_BRIGHTNESS)
+        & (contrast >= MIN_CONTRAST)
+    )
+    return np.where(usable, scores, 0)
+
+
+def select_frames(scores: 'np.ndarray', count: int, min_distance: int = 1) -> List[int]:
+    """
+    Return the indices of the `count` best scored frames, which are at least
+    `min_distance` frames apart, best first.
+    """
+    selected: List[int] = []
+    for index in np.argsort(-scores, kind='stable'):
+        if scores[index] <= 0 or len(selected) >= count:
+            break
+        if all(abs(index - other) >= min_distance for other in selected):
+            selected.append(int(index))
+    return selected
+
+
+def frames_from_bytes(data: bytes) -> 'np.ndarray':
+    """
+    Convert raw grayscale frames of `SAMPLE_WIDTH` x `SAMPLE_HEIGHT` pixels.
+    """
+    _require_numpy()
+    frame_size = SAMPLE_WIDTH * SAMPLE_HEIGHT
+    count = len(data) // frame_size
+    return np.frombuffer(data[: count * frame_size], dtype=np.uint8).reshape(
+        count, SAMPLE_HEIGHT, SAMPLE_WIDTH
+    )
@@ -0,0 +1,209 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models.signals import post_init, post_save
+from django.utils.module_loading import import_string
+
+from . import control
+from .config import settings
+from .fields import VideoField
+
+# attribute of instances storing the names of their files when loaded
+ORIGINAL_NAMES = '_video_encoding_original_names'
+
+# conversions registered within the current transaction, per database
+_scheduled = threading.local()
+
+
+def _get_cache():
+    return caches[settings.VIDEO_ENCODING_TRIGGER_CACHE]
+
+
+def _get_key(app_label: str, model_name: str, object_pk: Any) -> str:
+    return 'video_encoding:trigger:{}.{}:{}'.format(app_label, model_name, object_pk)
+
+
+def _get_names(instance: models.Model) -> Dict[str, Optional[str]]:
+    """
+    Return the names of the files of all loaded `VideoFields`.
+
+    Deferred fields are omitted, as loading them would require a query.
+    """
+    names = {}
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, VideoField) and field.attname in instance.__dict__:
+            value = instance.__dict__[field.attname]
+            names[field.attname] = getattr(value, 'name', value) or None
+    return names
+
+
+def _run(func: Callable, *args: Any) -> None:
+    func(*args)
+
+
+def get_enqueue() -> Callable:
+    """
+    Return the callable, which enqueues conversions, see
+    `VIDEO_ENCODING_TRIGGER_ENQUEUE`. By default, videos are converted
+    right away.
+    """
+    path = settings.VIDEO_ENCODING_TRIGGER_ENQUEUE
+    if not path:
+        return _run
+    return import_string(path)
+
+
+def _get_scheduled(using: str) -> Dict[str, 'ConversionCallback']:
+    return _scheduled.__dict__.setdefault(using, {})
+
+
+def _merge(fields: Dict[str, bool], other: Dict[str, bool]) -> Dict[str, bool]:
+    """
+    Merge the changed fields and whether their previous videos have been
+    replaced.
+    """
+    merged = dict(fields)
+    for name, replaced in other.items():
+        merged[name] = merged.get(name, False) or replaced
+    return merged
+
+
+def convert(
+    app_label: str,
+    model_name: str,
+    object_pk: Any,
+    fields: Optional[Dict[str, bool]] = None,
+) -> None:
+    """
+    Convert the changed videos of an instance, enqueued by the trigger.
+
+    `fields` maps the names of the changed fields to whether a previous video
+    has been replaced, formats of replaced videos are re-encoded. Changes
+    coalesced into this conversion while it has been pending are included.
+    """
+    from .tasks import convert_video
+
+    cache = _get_cache()
+    key = _get_key(app_label, model_name, object_pk)
+    pending = cache.get(key)
+    # further changes require another conversion from now on
+    cache.delete(key)
+    if isinstance(pending, dict):
+        fields = _merge(fields or {}, pending)
+
+    model_class = apps.get_model(app_label=app_label, model_name=model_name)
+    try:
+        instance = model_class.objects.get(pk=object_pk)
+    except model_class.DoesNotExist:
+        # deleted in the meantime
+        return
+
+    for name, replaced in sorted((fields or {}).items()):
+        fieldfile = getattr(instance, name)
+        if fieldfile:
+            convert_video(fieldfile, force=replaced)
+
+
+class ConversionCallback:
+    """
+    Enqueue the conversion of the changed fields of an instance, once the
+    transaction is committed.
+    """
+
+    def __init__(self, instance: models.Model, using: str, created: bool) -> None:
+        opts = instance._meta
+        self.args = (opts.app_label, opts.model_name, instance.pk)
+        self.key = _get_key(*self.args)
+        self.instance = instance
+        self.using = using
+        self.created = created
+        self.fields: Dict[str, bool] = {}
+
+    def update(self, changed: Iterable[str], replaced: List[str]) -> None:
+        if self.created:
+            # no formats have been converted yet
+            replaced = []
+        self.fields = _merge(self.fields, {name: name in replaced for name in changed})
+
+    def __call__(self) -> None:
+        scheduled = _get_scheduled(self.using)
+        if scheduled.get(self.key) is not self:
+            # already enqueued by a previous save of the transaction
+            return
+        del scheduled[self.key]
+
+        if any(self.fields.values()) and settings.VIDEO_ENCODING_CONTROL_CACHE:
+            # conversions of the previous video are obsolete
+            control.cancel(self.instance)
+
+        # only a single conversion is pending at a time, it converts
+        # the current video once it is started
+        cache = _get_cache()
+        window = settings.VIDEO_ENCODING_TRIGGER_WINDOW
+        if cache.add(self.key, self.fields, window):
+            get_enqueue()(convert, *self.args, self.fields)
+        else:
+            # include the changes in the pending conversion
+            pending = cache.get(self.key)
+            if isinstance(pending, dict):
+                cache.set(self.key, _merge(pending, self.fields), window)
+
+
+def _store_names(sender: Type[models.Model], instance: models.Model, **kwargs) -> None:
+    setattr(instance, ORIGINAL_NAMES, _get_names(instance))
+
+
+def _schedule_conversion(
+    sender: Type[models.Model],
+    instance: models.Model,
+    created: bool,
+    raw: bool = False,
+    using: str = 'default',
+    **kwargs,
+) -> None:
+    if raw:
+        # e.g. loading fixtures
+        return
+
+    original_names = getattr(instance, ORIGINAL_NAMES, {})
+    names = _get_names(instance)
+    setattr(instance, ORIGINAL_NAMES, names)
+
+    changed = [
+        attname
+        for attname, name in names.items()
+        if name and (created or name != original_names.get(attname))
+    ]
+    if not changed:
+        return
+
+    replaced = [] if created else [name for name in changed if original_names.get(name)]
+    scheduled = _get_scheduled(using)
+    opts = instance._meta
+    key = _get_key(opts.app_label, opts.model_name, instance.pk)
+    if not transaction.get_connection(using).in_atomic_block:
+        # left behind by a rolled back transaction
+        scheduled.pop(key, None)
+
+    # changes within a transaction are merged into a single conversion
+    callback = scheduled.get(key)
+    if callback is None:
+        callback = scheduled[key] = ConversionCallback(instance, using, created)
+    callback.update(changed, replaced)
+    transaction.on_commit(callback, using=using)
+
+
+def register(model: Type[models.Model]) -> None:
+    """
+    Convert the videos of instances of `model` after they have been changed.
+
+    Conversions are registered once the transaction is committed and only if
+    the file of a `VideoField` has changed. Multiple changes are coalesced
+    into a single conversion as long as it is pending.
+    """
+    uid = 'video_encoding.triggers.{}'.format(model._meta.label_lower)
+    post_init.connect(_store_names, sender=model, dispatch_uid=uid)
+    post_save.connect(_schedule_conversion, sender=model, dispatch_uid=uid)
@@ -1,9 +1,21 @@
 import contextlib
+import logging
 import os
-import tempfile
-from typing import Generator
+import re
+import shutil
+from typing import Any, Dict, Generator, Optional, Tuple, Type
+from urllib.parse import urlparse
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.files import File
+from django.utils.module_loading import import_string
+
+from . import scratch
+
+logger = logging.getLogger(__name__)
+
+# query strings of urls, e.g. the signatures of presigned urls
+URL_QUERY_PATTERN = re.compile(r'(https?://[^\s?#\'"`]*)\?[^\s#\'"`]*')
 
 
 @contextlib.contextmanager
@@ -11,7 +23,11 @@ def get_local_path(fieldfile: File) -> Generator[str, None, None]:
     """
     Get a local file to work with from a file retrieved from a FileField.
     """
-    if not hasattr(fieldfile, 'storage'):
+    if not getattr(fieldfile, '_committed', True):
+        # The file has not been saved to the storage yet, e.g. a fresh upload
+        with _get_uncommitted_path(fieldfile.file) as path:
+            yield path
+    elif not hasattr(fieldfile, 'storage'):
         # Its a local file with no storage abstraction
         try:
             yield os.path.abspath(fieldfile.path)
@@ -25,9 +41,190 @@ def get_local_path(fieldfile: File) -> Generator[str, None, None]:
         except (NotImplementedError, AttributeError):
             # Storage doesnt support absolute paths,
             # download file to a temp local dir
-            with tempfile.NamedTemporaryFile(mode="wb", delete=False) as temp_file:
-                storage_file = storage.open(fieldfile.name, 'rb')
+            suffix = os.path.splitext(fieldfile.name)[1]
+            with scratch.scratch_file(suffix, size=_get_size(fieldfile)) as path:
+                with open(path, mode='wb') as temp_file, storage.open(
+                    fieldfile.name, 'rb'
+                ) as storage_file:
+                    shutil.copyfileobj(storage_file, temp_file)
+
+                yield path
+
+
+def _get_size(fieldfile: File) -> int:
+    """
+    Return the size of a file to reserve scratch space for, if the storage
+    supports retrieving it.
+    """
+    try:
+        return fieldfile.size or 0
+    except (NotImplementedError, AttributeError):
+        # e.g. storages implementing `size()` using `path()`
+        return 0
+
+
+@contextlib.contextmanager
+def get_source(fieldfile: File) -> Generator[str, None, None]:
+    """
+    Get a path or an url, which can be used as input for the encoder.
+
+    If `VIDEO_ENCODING_STREAM_SOURCE` is enabled, files of storages which
+    provide absolute http(s) urls (e.g. presigned urls) are streamed by the
+    encoder instead of being downloaded first.
+    """
+    from .config import settings
+
+    url = None
+    if settings.VIDEO_ENCODING_STREAM_SOURCE and _is_remote(fieldfile):
+        url = fieldfile.url  # type: ignore
+
+    if url and _is_url(url):
+        yield url
+    else:
+        with get_local_path(fieldfile) as local_path:
+            yield local_path
+
+
+def _is_remote(fieldfile: File) -> bool:
+    """
+    Return whether the file is stored in a storage without local paths.
+    """
+    if not getattr(fieldfile, '_committed', True) or not hasattr(fieldfile, 'storage'):
+        return False
+
+    try:
+        fieldfile.storage.path(fieldfile.name)  # type: ignore
+    except (NotImplementedError, AttributeError):
+        return True
+    return False
+
+
+def refresh_source(fieldfile: File, source: str) -> str:
+    """
+    Return the source to pass to the next run of the encoder.
+
+    The urls of streamed files are generated again, as presigned urls expire.
+    Local paths are returned unchanged.
+    """
+    if not _is_url(source):
+        return source
+    return fieldfile.url  # type: ignore
+
+
+def redact_urls(text: str) -> str:
+    """
+    Remove the query strings of all urls in `text`, e.g. the signatures of
+    presigned urls in error messages.
+    """
+    return URL_QUERY_PATTERN.sub(r'\1?<redacted>', text)
+
+
+def get_filename(source: str) -> str:
+    """
+    Return the filename of a path or an url.
+    """
+    if _is_url(source):
+        source = urlparse(source).path
+    return os.path.basename(source)
+
+
+def _is_url(source: str) -> bool:
+    return urlparse(source).scheme in ('http', 'https')
+
+
+@contextlib.contextmanager
+def _get_uncommitted_path(file: File) -> Generator[str, None, None]:
+    """
+    Get a local file for a file, which has not been saved to a storage.
+    """
+    if hasattr(file, 'temporary_file_path'):
+        # large uploads are already stored on disk (`TemporaryUploadedFile`)
+        yield file.temporary_file_path()  # type: ignore
+        return
+
+    # e.g. `InMemoryUploadedFile`
+    suffix = os.path.splitext(file.name or '')[1]
+    with scratch.scratch_file(suffix, size=file.size or 0) as path:
+        with open(path, mode='wb') as temp_file:
+            for chunk in file.chunks():
+                temp_file.write(chunk)
+        file.seek(0)
+        yield path
+
+
+def _get_cgroup_cpu_quota() -> Optional[float]:
+    """
+    Return the number of cpus available according to the cgroup cpu quota.
+    """
+    try:
+        # cgroup v2, e.g. "200000 100000" or "max 100000"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+
+    if quota in ('max', '-1'):
+        return None
+    try:
+        return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def get_available_cpus() -> int:
+    """
+    Return the number of cpus usable by this process.
+
+    Respects the cpu affinity of the process as well as cgroup cpu quotas.
+    """
+    try:
+        cpus: float = len(os.sched_getaffinity(0))  # type: ignore
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = _get_cgroup_cpu_quota()
+    if quota:
+        cpus = min(cpus, quota)
+
+    return max(int(cpus), 1)
 
-                temp_file.write(storage_file.read())
-                temp_file.flush()
-                yield temp_file.name
+
+@contextlib.contextmanager
+def best_effort(
+    message: str, errors: Tuple[Type[BaseException], ...] = (Exception,)
+) -> Generator[None, None, None]:
+    """
+    Log and suppress `errors` of optional integrations, e.g. caches, metrics
+    sinks and controls, which must never break the encoding.
+    """
+    try:
+        yield
+    except errors:
+        logger.warning(message, exc_info=True)
+
+
+# integrations, e.g. metrics sinks holding sockets, are created only once
+_instances: Dict[str, Any] = {}
+
+
+def get_instance(path: str, params: Dict[str, Any], error_message: str) -> Any:
+    """
+    Return the shared instance of the class at the dotted `path`.
+
+    `error_message` is formatted with the path and the error, if the class
+    cannot be imported.
+    """
+    if path not in _instances:
+        try:
+            cls = import_string(path)
+        except ImportError as e:
+            raise ImproperlyConfigured(error_message.format(path, e))
+        _instances[path] = cls(**params)
+    return _instances[path]
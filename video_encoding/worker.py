@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from .backends.base import BaseEncodingBackend
+
+logger = logging.getLogger(__name__)
+
+# methods of the backend, which are served by the worker
+METHODS = ('get_media_info', 'get_thumbnail', 'get_best_thumbnails', 'get_preview')
+
+
+def get_default_backend() -> BaseEncodingBackend:
+    """
+    Return the backend of the worker, which probes in-process using PyAV if
+    available instead of spawning `ffprobe` for each request.
+    """
+    from .backends import pyav
+    from .backends.ffmpeg import FFmpegBackend
+
+    if pyav.av is not None:
+        return pyav.PyAVBackend()
+    return FFmpegBackend()
+
+
+def get_socket_path() -> str:
+    from .config import settings
+
+    return settings.VIDEO_ENCODING_WORKER_SOCKET or os.path.join(
+        tempfile.gettempdir(), 'video-encoding-worker.sock'
+    )
+
+
+class WorkerRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle newline delimited json requests of a single connection.
+
+    A request looks like `{"method": "get_media_info", "kwargs": {...}}`, the
+    response contains either the `result` or the `error` and its `message`.
+    """
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line.decode('utf-8'))
+            except ValueError:
+                response = {'error': 'ValueError', 'message': 'Invalid request.'}
+            else:
+                response = self.server.dispatch(request)  # type: ignore
+
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived worker, which serves probe, thumbnail and preview requests
+    of other processes on the same host using a unix socket.
+
+    At most `workers` requests are processed concurrently by `backend`. The
+    permissions of the socket are set to `mode`, which defaults to
+    `VIDEO_ENCODING_WORKER_SOCKET_MODE`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        socket_path: str,
+        backend: BaseEncodingBackend,
+        workers: int = 4,
+        mode: Optional[int] = None,
+    ) -> None:
+        from .config import settings
+
+        self.backend = backend
+        self.semaphore = threading.BoundedSemaphore(workers)
+        self.mode = settings.VIDEO_ENCODING_WORKER_SOCKET_MODE if mode is None else mode
+
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, WorkerRequestHandler)
+
+    def server_bind(self) -> None:
+        # prevent other users from connecting before the mode has been set
+        umask = os.umask(0o777 & ~self.mode)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, self.mode)  # type: ignore
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)  # type: ignore
+        except FileNotFoundError:
+            pass
+
+    def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get('method')
+        if method not in METHODS:
+            return {
+                'error': 'ValueError',
+                'message': "Unknown method '{}'.".format(method),
+            }
+
+        with self.semaphore:
+            try:
+                result = getattr(self.backend, method)(**request.get('kwargs', {}))
+            except Exception as e:
+                logger.debug('Request %s failed.', request, exc_info=True)
+                return {'error': e.__class__.__name__, 'message': str(e)}
+        return {'result': result}
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """
+    Remove the socket of a worker, which has not been shut down properly.
+    """
+    if not os.path.exists(socket_path):
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+        else:
+            raise OSError("Worker already running at '{}'.".format(socket_path))